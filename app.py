@@ -5,7 +5,7 @@ import os
 from dotenv import load_dotenv
 import sys
 import io
-from supabase_client import db
+import threading
 
 # Load environment variables
 load_dotenv()
@@ -38,55 +38,16 @@ logging.getLogger('auth_manager').setLevel(logging.DEBUG)
 logging.getLogger('auth_manager_routes').setLevel(logging.DEBUG)
 logging.getLogger('modify_DB').setLevel(logging.DEBUG)
 
-# Configuración de la aplicación
-app = Flask(__name__)
-app.secret_key = os.getenv('SECRET_KEY', 'meliapp-secret-key-change-in-production')
-
-# Configuración CRÍTICA para persistencia de sesión
-app.config.update(
-    SESSION_COOKIE_SECURE=False,  # Cambiar a True en producción HTTPS
-    SESSION_COOKIE_HTTPONLY=True,
-    SESSION_COOKIE_SAMESITE='Lax',  # Permite cookies en navegación normal
-    SESSION_COOKIE_NAME='meliapp_session',
-    PERMANENT_SESSION_LIFETIME=3600 * 1,  # 1 hora
-)
-
 # Configuración
 DEBUG = True  # Habilitado para debug del registro
 PORT = int(os.environ.get('PORT', 3000))
 
-# Log de inicio
-logger.info("=" * 70)
-logger.info("  🍯 MELIAPP v3.0 - API REST")
-logger.info("=" * 70)
-logger.info(f"  📍 Puerto: {PORT}")
-logger.info(f"  🔧 Debug: {DEBUG}")
-logger.info(f"  🌐 Base URL: http://localhost:{PORT}")
-logger.info(f"  📱 API REST: Listo para apps móviles (Flutter, React Native)")
-logger.info(f"  ✅ Autenticación: Email + OAuth Google")
-logger.info(f"  📧 Verificación: Activada (Resend)")
-logger.info(f"  🔐 Sesión: Cookies HTTP-only")
-logger.info("=" * 70)
-logger.info("  Endpoints principales:")
-logger.info("    • POST /api/auth/register - Registro con verificación")
-logger.info("    • POST /api/auth/login - Login")
-logger.info("    • GET  /api/auth/session - Verificar sesión")
-logger.info("    • POST /api/auth/google - OAuth Google")
-logger.info("    • GET  /api/profile/me - Perfil completo")
-logger.info("    • POST /api/edit/usuarios - Editar usuario")
-logger.info("    • GET  /api/lotes/{uuid} - Obtener lotes")
-logger.info("=" * 70)
-logger.info("  📚 Documentación: /docs/API_REST_VERIFICACION.md")
-logger.info("  🧪 Testing: Ver ejemplos con curl en documentación")
-logger.info("=" * 70)
-
-# Configuración para producción
-app.config['JSONIFY_PRETTYPRINT_REGULAR'] = False
-app.json.sort_keys = False
-
-# Filtro para formatear fechas en las plantillas
-@app.template_filter('datetimeformat')
+# Endpoints que no necesitan usuario: archivos estáticos y chequeos de salud
+SKIP_USER_LOADING_ENDPOINTS = {'static', 'supabase.health', 'supabase.warmup_instance', 'supabase.test_connection', 'supabase.test_db'}
+
+
 def datetimeformat(value, format='%d/%m/%Y %H:%M'):
+    """Filtro para formatear fechas en las plantillas."""
     if value is None:
         return ""
     if isinstance(value, str):
@@ -97,40 +58,141 @@ def datetimeformat(value, format='%d/%m/%Y %H:%M'):
             return value
     return value.strftime(format)
 
-# Cargar información del usuario actual en cada request
-from auth_manager import AuthManager
-
-@app.before_request
-def load_user():
-    """Carga la información del usuario actual en g.user para todas las peticiones."""
-    AuthManager.load_current_user()
-# ====================
-# Configuración de Blueprints
-# ====================
-
-from auth_manager_routes import auth_bp
-from edit_user_data import edit_bp
-from botanical_chart import botanical_bp
-from supabase_client_routes import supabase_bp
-from searcher_routes import search_bp, search_web_bp
-from data_tables_routes import data_tables_bp
-from lotes_routes import lotes_api_bp, lotes_web_bp, lotes_debug_bp
-from web_routes import web_bp  # Contiene TODAS las rutas web (home, login, register, logout)
-from profile_routes import profile_bp
-
-# Registrar blueprints
-app.register_blueprint(web_bp)  # Rutas web (HTML): /, /login, /register, /logout
-app.register_blueprint(auth_bp)  # API REST de autenticación: /api/auth/*
-app.register_blueprint(botanical_bp)
-app.register_blueprint(supabase_bp)
-app.register_blueprint(search_bp)
-app.register_blueprint(search_web_bp)
-app.register_blueprint(data_tables_bp)
-app.register_blueprint(lotes_api_bp)
-app.register_blueprint(lotes_web_bp)
-app.register_blueprint(lotes_debug_bp)
-app.register_blueprint(profile_bp)
-app.register_blueprint(edit_bp)
+
+def register_blueprints(flask_app):
+    """
+    Importa y registra los blueprints.
+    
+    Los imports se hacen aquí (y no al cargar el módulo) para que las
+    dependencias pesadas de cada blueprint solo se paguen al construir la app.
+    """
+    from auth_manager_routes import auth_bp
+    from edit_user_data import edit_bp
+    from botanical_chart import botanical_bp
+    from supabase_client_routes import supabase_bp
+    from searcher_routes import search_bp, search_web_bp
+    from data_tables_routes import data_tables_bp
+    from lotes_routes import lotes_api_bp, lotes_web_bp, lotes_debug_bp
+    from web_routes import web_bp  # Contiene TODAS las rutas web (home, login, register, logout)
+    from profile_routes import profile_bp
+    
+    # Registrar blueprints
+    flask_app.register_blueprint(web_bp)  # Rutas web (HTML): /, /login, /register, /logout
+    flask_app.register_blueprint(auth_bp)  # API REST de autenticación: /api/auth/*
+    flask_app.register_blueprint(botanical_bp)
+    flask_app.register_blueprint(supabase_bp)
+    flask_app.register_blueprint(search_bp)
+    flask_app.register_blueprint(search_web_bp)
+    flask_app.register_blueprint(data_tables_bp)
+    flask_app.register_blueprint(lotes_api_bp)
+    flask_app.register_blueprint(lotes_web_bp)
+    flask_app.register_blueprint(lotes_debug_bp)
+    flask_app.register_blueprint(profile_bp)
+    flask_app.register_blueprint(edit_bp)
+
+
+def create_app():
+    """
+    Construye y configura la aplicación Flask.
+    
+    Returns:
+        Flask: Aplicación con configuración, filtros, hooks y blueprints registrados
+    """
+    flask_app = Flask(__name__)
+    flask_app.secret_key = os.getenv('SECRET_KEY', 'meliapp-secret-key-change-in-production')
+    
+    # Configuración CRÍTICA para persistencia de sesión
+    flask_app.config.update(
+        SESSION_COOKIE_SECURE=False,  # Cambiar a True en producción HTTPS
+        SESSION_COOKIE_HTTPONLY=True,
+        SESSION_COOKIE_SAMESITE='Lax',  # Permite cookies en navegación normal
+        SESSION_COOKIE_NAME='meliapp_session',
+        PERMANENT_SESSION_LIFETIME=3600 * 1,  # 1 hora
+    )
+    
+    # Configuración para producción
+    flask_app.config['JSONIFY_PRETTYPRINT_REGULAR'] = False
+    flask_app.json.sort_keys = False
+    
+    flask_app.add_template_filter(datetimeformat, 'datetimeformat')
+    
+    # Cargar información del usuario actual en cada request
+    from auth_manager import AuthManager
+    
+    @flask_app.before_request
+    def load_user():
+        """Carga la información del usuario actual en g.user para todas las peticiones."""
+        if request.endpoint in SKIP_USER_LOADING_ENDPOINTS or request.path.startswith('/static/'):
+            return
+        AuthManager.load_current_user()
+    
+    register_blueprints(flask_app)
+    return flask_app
+
+
+def log_startup_banner():
+    """Escribe en el log el resumen de inicio (solo al arrancar el servidor local)."""
+    logger.info("=" * 70)
+    logger.info("  🍯 MELIAPP v3.0 - API REST")
+    logger.info("=" * 70)
+    logger.info(f"  📍 Puerto: {PORT}")
+    logger.info(f"  🔧 Debug: {DEBUG}")
+    logger.info(f"  🌐 Base URL: http://localhost:{PORT}")
+    logger.info(f"  📱 API REST: Listo para apps móviles (Flutter, React Native)")
+    logger.info(f"  ✅ Autenticación: Email + OAuth Google")
+    logger.info(f"  📧 Verificación: Activada (Resend)")
+    logger.info(f"  🔐 Sesión: Cookies HTTP-only")
+    logger.info("=" * 70)
+    logger.info("  Endpoints principales:")
+    logger.info("    • POST /api/auth/register - Registro con verificación")
+    logger.info("    • POST /api/auth/login - Login")
+    logger.info("    • GET  /api/auth/session - Verificar sesión")
+    logger.info("    • POST /api/auth/google - OAuth Google")
+    logger.info("    • GET  /api/profile/me - Perfil completo")
+    logger.info("    • POST /api/edit/usuarios - Editar usuario")
+    logger.info("    • GET  /api/lotes/{uuid} - Obtener lotes")
+    logger.info("=" * 70)
+    logger.info("  📚 Documentación: /docs/API_REST_VERIFICACION.md")
+    logger.info("  🧪 Testing: Ver ejemplos con curl en documentación")
+    logger.info("=" * 70)
+
+
+class LazyApp:
+    """
+    WSGI callable que construye la aplicación con `create_app` en el primer uso.
+    
+    Importar este módulo no importa blueprints, rutas ni el cliente Supabase:
+    todo eso (searcher e índices, lotes/QR, data_tables...) se paga en el primer
+    request (normalmente /api/warmup) o al acceder a un atributo de la app
+    (`app.url_map`, `app.run`, `app.test_client`...).
+    """
+    
+    def __init__(self, factory):
+        self._factory = factory
+        self._app = None
+        self._lock = threading.Lock()
+    
+    @property
+    def loaded(self) -> bool:
+        return self._app is not None
+    
+    def get_app(self) -> Flask:
+        """Aplicación Flask real, creada una sola vez por proceso."""
+        if self._app is None:
+            with self._lock:
+                if self._app is None:
+                    self._app = self._factory()
+        return self._app
+    
+    def __call__(self, environ, start_response):
+        return self.get_app()(environ, start_response)
+    
+    def __getattr__(self, name):
+        return getattr(self.get_app(), name)
+
+
+# Para Vercel, exponemos la app a nivel de módulo (se construye en el primer request)
+app = LazyApp(create_app)
 
 def list_routes():
     """
@@ -320,15 +382,13 @@ def test_database_connection():
     Returns:
         tuple: (success: bool, message: str)
     """
-    try:
-        # Intentar una consulta simple para verificar la conexión
-        response = db.client.table('usuarios').select('auth_user_id').limit(1).execute()
-        if response.data is not None:
-            return True, "Conexión exitosa con Supabase"
-        else:
-            return False, "No se pudieron obtener datos de Supabase"
-    except Exception as e:
-        return False, f"Error de conexión: {str(e)}"
+    from supabase_client import db
+    ok, details = db.check_connectivity()
+    if ok:
+        return True, f"Conexión exitosa con Supabase ({details['latency_ms']} ms)"
+    if 'error' in details:
+        return False, f"Error de conexión: {details['error']}"
+    return False, "No se pudieron obtener datos de Supabase"
 
 def init_google_oauth_flow(is_api=False):
     """Inicializa el flujo de autenticación con Google OAuth usando detección universal."""
@@ -343,6 +403,7 @@ def init_google_oauth_flow(is_api=False):
         current_app.logger.info(f"URL de redirección: {redirect_uri}")
         
         # Usar el cliente de Supabase para generar la URL de autorización
+        from supabase_client import db
         auth_response = db.auth.sign_in_with_oauth({
             'provider': 'google',
             'options': {
@@ -371,6 +432,8 @@ def main():
         if sys.stdout.encoding != 'utf-8':
             sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
         
+        log_startup_banner()
+        
         # Verificar la conexión con Supabase al inicio
         success, message = test_database_connection()
         if success:
@@ -395,7 +458,6 @@ def main():
         print(f"\n[❌] Error al iniciar la aplicación: {str(e)}")
         print("Asegúrate de que las credenciales en el archivo .env sean correctas.")
 
-# Para Vercel, exponemos la app directamente
 if __name__ == '__main__':
     main()
 
@@ -20,6 +20,7 @@ import traceback
 import json
 import re
 from supabase_client import db
+from jwt_utils import can_verify_locally, decode_jwt_claims, is_token_expired, verify_jwt
 
 logger = logging.getLogger(__name__)
 
@@ -131,7 +132,7 @@ class GoogleOAuth:
             # Verificar si el usuario ya existe en nuestras tablas
             auth_user_id = str(user.id)
             user_check = db.client.table('usuarios')\
-                .select('auth_user_id')\
+                .select('auth_user_id, username, role')\
                 .eq('auth_user_id', auth_user_id)\
                 .maybe_single()\
                 .execute()
@@ -140,6 +141,7 @@ class GoogleOAuth:
                 # Usuario existente - solo crear sesión
                 logger.info(f"👤 Usuario existente encontrado: {user.email}")
                 self._create_session(user, auth_user_id, response.session)
+                AuthManager.cache_user_info(user_check.data)
                 
                 return {
                     'success': True,
@@ -228,6 +230,7 @@ class GoogleOAuth:
                     }).execute()
                 except Exception as e:
                     logger.warning(f"Error creando info_contacto: {e}")
+                AuthManager.notify_user_created(auth_user_id)
                 
                 return auth_user_id
             else:
@@ -255,32 +258,24 @@ class GoogleOAuth:
 class AuthManager:
     """Gestor centralizado de autenticación y sesiones de usuario."""
     
-    # Cache para cliente autenticado
-    _authenticated_client = None
+    # Segundos antes de `exp` en que el access token se refresca de forma proactiva
+    TOKEN_REFRESH_MARGIN = int(os.getenv('TOKEN_REFRESH_MARGIN', 60))
     
     @classmethod
     def get_authenticated_client(cls):
         """
-        Única fuente de cliente Supabase autenticado
-        Simplificado para evitar problemas de cache y refresh
+        Única fuente de cliente Supabase autenticado.
+        Reutiliza el cliente cacheado para el token de la sesión actual
+        (ver supabase_client.get_authenticated_client_for_token).
         """
         try:
-            # Siempre crear un cliente fresco para evitar problemas de cache
             token = cls._get_auth_token()
             if not token:
                 logger.error("No hay token de autenticación disponible")
                 return None
                 
-            # Crear cliente autenticado
-            from supabase import create_client
-            auth_client = create_client(
-                os.getenv('SUPABASE_URL'),
-                os.getenv('SUPABASE_KEY')
-            )
-            auth_client.postgrest.auth(token)
-            
-            logger.info(f"Cliente autenticado creado con token: {token[:20]}...")
-            return auth_client
+            from supabase_client import get_authenticated_client_for_token
+            return get_authenticated_client_for_token(token)
             
         except Exception as e:
             logger.error(f"Error creando cliente autenticado: {e}")
@@ -289,18 +284,27 @@ class AuthManager:
     @classmethod
     def _should_refresh_token(cls):
         """
-        Determina si el token debe ser refrescado basado en errores previos
-        y en la disponibilidad de un refresh token.
+        Determina si el token debe ser refrescado: por un error de JWT previo
+        o porque expira dentro de TOKEN_REFRESH_MARGIN segundos.
         
         Returns:
             bool: True si el token debe refrescarse, False en caso contrario.
         """
+        if 'refresh_token' not in session:
+            return False
+        
         # Si hay un flag de error de JWT, intentar refrescar
-        if session.get('jwt_expired_error', False) and 'refresh_token' in session:
+        if session.get('jwt_expired_error', False):
             # Limpiar el flag de error
             session['jwt_expired_error'] = False
             logger.info("Detectado error de JWT expirado, intentando refrescar token")
             return True
+        
+        # Refresco proactivo: el token expira dentro del margen (leído localmente del claim exp)
+        access_token = session.get('access_token')
+        if access_token and is_token_expired(access_token, leeway=cls.TOKEN_REFRESH_MARGIN):
+            logger.info("Token próximo a expirar, refrescando antes de usarlo")
+            return True
         return False
     
     @classmethod
@@ -317,12 +321,15 @@ class AuthManager:
                 return False
                 
             refresh_token = session['refresh_token']
+            old_access_token = session.get('access_token')
             
             # Intentar refrescar la sesión usando la API de Supabase
             refresh_response = db.client.auth.refresh_session(refresh_token)
             
             if refresh_response and hasattr(refresh_response, 'session'):
-                # Guardar los nuevos tokens
+                # Guardar los nuevos tokens y descartar el cliente del token anterior
+                from supabase_client import evict_authenticated_client
+                evict_authenticated_client(old_access_token)
                 session['access_token'] = refresh_response.session.access_token
                 if refresh_response.session.refresh_token:
                     session['refresh_token'] = refresh_response.session.refresh_token
@@ -359,6 +366,34 @@ class AuthManager:
             
         return None
     
+    @classmethod
+    def get_token_claims(cls):
+        """
+        Claims del access token de la sesión, verificados localmente (sin base de datos).
+        
+        Usa SUPABASE_JWT_SECRET o el JWKS del proyecto según el `alg` del token
+        (ver jwt_utils.verify_jwt). Si no hay forma de verificar esa firma
+        (p. ej. HS256 sin SUPABASE_JWT_SECRET), se confía en el token guardado en la
+        sesión firmada de Flask y solo se comprueba su expiración.
+        
+        Returns:
+            dict: Claims del token (incluye `sub` y `exp`) o None si no es válido
+        """
+        token = cls._get_auth_token()
+        if not token:
+            return None
+        
+        cached = g.get('_token_claims')
+        if cached and cached[0] == token:
+            return cached[1]
+        
+        if can_verify_locally(token):
+            claims = verify_jwt(token)
+        else:
+            claims = None if is_token_expired(token) else (decode_jwt_claims(token) or None)
+        g._token_claims = (token, claims)
+        return claims
+    
     @classmethod
     def store_auth_token(cls, access_token, refresh_token=None):
         """Almacena tokens en la única ubicación necesaria"""
@@ -395,10 +430,52 @@ class AuthManager:
             return f(*args, **kwargs)
         return decorated_function
     
+    # Segundos que username/role se sirven desde la sesión antes de releer usuarios
+    USER_INFO_TTL = 300
+    
+    @staticmethod
+    def cache_user_info(usuario: dict):
+        """
+        Guarda username y role del usuario en la sesión.
+        
+        Se llama al iniciar sesión (con la fila de usuarios que ya se leyó) y
+        cuando update_user_data modifica esos campos.
+        """
+        if not usuario:
+            return
+        session['user_info'] = {
+            'username': usuario.get('username'),
+            'role': usuario.get('role'),
+            'cached_at': time.time()
+        }
+    
+    @staticmethod
+    def get_cached_user_info(user_id: str) -> dict:
+        """
+        Obtiene username y role del usuario actual.
+        
+        Se sirven desde la sesión mientras no superen USER_INFO_TTL; solo al
+        expirar (o si la sesión es anterior a este cache) se lee la tabla usuarios.
+        """
+        user_info = session.get('user_info')
+        if user_info and time.time() - user_info.get('cached_at', 0) < AuthManager.USER_INFO_TTL:
+            return user_info
+        
+        try:
+            from query_memo import memoized_select
+            usuario_rows = memoized_select(db.client, 'usuarios', '*', {'auth_user_id': user_id})
+            if usuario_rows:
+                AuthManager.cache_user_info(usuario_rows[0])
+                return session['user_info']
+        except Exception as e:
+            logger.warning(f"No se pudo obtener username para user_id {user_id}: {e}")
+        return user_info or {}
+    
     @staticmethod
     def load_current_user():
         """
-        Carga información del usuario actual usando la autenticación centralizada
+        Carga información del usuario actual usando la autenticación centralizada.
+        username y role salen del cache de sesión (ver get_cached_user_info).
         """
         g.user = None
         
@@ -406,25 +483,17 @@ class AuthManager:
         if not user_id:
             return
         
-        # Obtener username desde la tabla usuarios
-        username = None
-        try:
-            from supabase_client import SupabaseClient
-            supabase = SupabaseClient()
-            usuario_response = supabase.client.table('usuarios').select('username').eq('auth_user_id', user_id).single().execute()
-            if usuario_response.data:
-                username = usuario_response.data.get('username')
-        except Exception as e:
-            logger.warning(f"No se pudo obtener username para user_id {user_id}: {e}")
+        user_info = AuthManager.get_cached_user_info(user_id)
             
-        # Usar la información almacenada en session y username de la base de datos
+        # Usar la información almacenada en session
         g.user = {
             'id': user_id,
             'user_uuid': user_id,
             'name': session.get('user_name'),
             'email': session.get('user_email'),
             'empresa': session.get('user_empresa', ''),
-            'username': username,
+            'username': user_info.get('username'),
+            'role': user_info.get('role'),
             'access_token': AuthManager._get_auth_token()
         }
     
@@ -473,13 +542,15 @@ class AuthManager:
             
             # Buscar el usuario en la tabla usuarios por auth_user_id (PRIMARY KEY)
             user_mapping = db.client.table('usuarios')\
-                .select('auth_user_id')\
+                .select('auth_user_id, username, role')\
                 .eq('auth_user_id', user.id)\
                 .limit(1)\
                 .execute()
             
+            usuario = None
             if user_mapping.data and len(user_mapping.data) > 0:
-                auth_user_id = user_mapping.data[0]['auth_user_id']
+                usuario = user_mapping.data[0]
+                auth_user_id = usuario['auth_user_id']
             else:
                 # Si no existe en usuarios, crear uno nuevo
                 new_user = {
@@ -492,7 +563,8 @@ class AuthManager:
                 }
                 insert_result = db.client.table('usuarios').insert(new_user).execute()
                 if insert_result.data:
-                    auth_user_id = insert_result.data[0]['auth_user_id']
+                    usuario = insert_result.data[0]
+                    auth_user_id = usuario['auth_user_id']
                     
                     # Crear info de contacto básica
                     try:
@@ -503,6 +575,7 @@ class AuthManager:
                         }).execute()
                     except Exception as e:
                         logger.warning(f"Error creando info_contacto: {str(e)}")
+                    AuthManager.notify_user_created(auth_user_id)
                 else:
                     auth_user_id = str(user.id)
             
@@ -512,6 +585,7 @@ class AuthManager:
             session['user_email'] = user.email
             session['user_name'] = contact_info.get('nombre_completo') or user.user_metadata.get('full_name', user.email)
             session['user_empresa'] = contact_info.get('nombre_empresa', '')
+            AuthManager.cache_user_info(usuario)
             
             # Almacenar tokens usando la función centralizada
             if auth_response.session:
@@ -597,6 +671,8 @@ class AuthManager:
     @staticmethod
     def logout_user():
         """Cierra la sesión del usuario actual."""
+        from supabase_client import evict_authenticated_client
+        evict_authenticated_client(session.get('access_token'))
         session.clear()
         return {
             "success": True,
@@ -649,6 +725,19 @@ class AuthManager:
         
         return True, ""
     
+    @staticmethod
+    def notify_user_created(auth_user_id):
+        """
+        Avisa que se crearon las filas de usuarios e info_contacto de un usuario nuevo.
+        
+        Estas inserciones no pasan por DatabaseModifier; sin el aviso el usuario
+        no aparecería en la búsqueda, las sugerencias ni el resolver hasta la
+        siguiente reconstrucción de los índices.
+        """
+        from modify_DB import notify_write  # diferido: modify_DB importa AuthManager
+        for table in ('usuarios', 'info_contacto'):
+            notify_write(table, 'insert', str(auth_user_id))
+    
     @staticmethod
     def initialize_user_tables_on_confirmation(auth_user_id, email, user_metadata):
         """
@@ -747,6 +836,7 @@ class AuthManager:
             
             if response_data and response_data.get('success'):
                 logger.info(f"✅ Inicialización completa exitosa para: {email}")
+                AuthManager.notify_user_created(auth_user_id)
                 return True
             else:
                 error_msg = response_data.get('message', 'Error desconocido') if response_data else 'Sin respuesta'
@@ -168,7 +168,7 @@ def api_auth_logout():
         JSON: {"success": bool, "message": str}
     """
     try:
-        session.clear()
+        AuthManager.logout_user()
         return jsonify({"success": True, "message": "Sesión cerrada correctamente"})
     except Exception as e:
         logger.error(f"Error en logout: {str(e)}")
@@ -190,19 +190,18 @@ def api_auth_session():
     """
     try:
         if 'user_id' in session:
-            user_response = db.client.table('usuarios')\
-                .select('auth_user_id, username')\
-                .eq('auth_user_id', session['user_id'])\
-                .maybe_single()\
-                .execute()
+            # El token se valida localmente (firma, exp y sub); no se consulta la base de datos
+            claims = AuthManager.get_token_claims()
+            user_id = session['user_id']
             
-            if user_response.data:
+            if claims and claims.get('sub') == user_id:
+                user_info = session.get('user_info') or {}
                 return jsonify({
                     "success": True,
                     "logged_in": True,
                     "user": {
-                        "id": user_response.data['auth_user_id'],
-                        "username": user_response.data['username']
+                        "id": user_id,
+                        "username": user_info.get('username')
                     }
                 })
         
@@ -509,7 +508,7 @@ def api_oauth_tokens():
         # Verificar si usuario existe en nuestras tablas
         auth_user_id = str(user.id)
         user_check = db.client.table('usuarios')\
-            .select('auth_user_id')\
+            .select('auth_user_id, username, role')\
             .eq('auth_user_id', auth_user_id)\
             .maybe_single()\
             .execute()
@@ -547,6 +546,8 @@ def api_oauth_tokens():
         session['access_token'] = access_token
         if refresh_token:
             session['refresh_token'] = refresh_token
+        if user_check and user_check.data:
+            AuthManager.cache_user_info(user_check.data)
         
         logger.info(f"✅ Sesión creada exitosamente para: {user.email}")
         
@@ -0,0 +1,137 @@
+"""
+Carga por lotes (estilo DataLoader) para eliminar consultas N+1 en MeliAPP.
+
+Este módulo contiene:
+- BatchLoader: junta claves y las resuelve con una sola consulta `in_()` por tabla
+- get_loader(): loader del request actual (flask.g) para una tabla/columna
+
+Uso típico al hidratar una lista de resultados:
+
+    loader = get_loader(db, 'usuarios', columns='auth_user_id,tipo_usuario')
+    usuarios = loader.load_many([r['auth_user_id'] for r in resultados])  # 1 consulta
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Hashable, Iterable, List, Optional
+
+from flask import g, has_app_context
+from modify_DB import register_write_listener
+
+logger = logging.getLogger(__name__)
+
+# Máximo de claves por consulta `in_()` (mantiene la URL de PostgREST acotada)
+MAX_BATCH_SIZE = 200
+
+
+class BatchLoader:
+    """
+    Resuelve claves de una tabla en lotes y recuerda los resultados.
+
+    Las claves encoladas con `queue()` se resuelven junto con las de la
+    siguiente llamada a `load()`/`load_many()`, en una sola consulta por
+    cada MAX_BATCH_SIZE claves.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, client, table: str, key: str = 'auth_user_id', columns: str = '*', many: bool = False):
+        """
+        Args:
+            client: Cliente Supabase/PostgREST
+            table: Tabla a consultar
+            key: Columna por la que se agrupa (debe estar incluida en `columns`)
+            columns: Columnas a seleccionar
+            many: Si True, cada clave devuelve una lista de filas (tablas hijas)
+        """
+        self.client = client
+        self.table = table
+        self.key = key
+        self.columns = columns
+        self.many = many
+        self._cache: Dict[Hashable, Any] = {}
+        self._pending: List[Hashable] = []
+        self._lock = threading.Lock()
+        self.queries = 0
+
+    def queue(self, key: Hashable) -> None:
+        """Encola una clave para resolverla en el próximo lote."""
+        if key is not None:
+            with self._lock:
+                if key not in self._cache:
+                    self._pending.append(key)
+
+    def _dispatch(self, keys: Iterable[Hashable]) -> None:
+        with self._lock:
+            missing = list(dict.fromkeys(k for k in list(self._pending) + list(keys)
+                                         if k is not None and k not in self._cache))
+            self._pending.clear()
+
+        for start in range(0, len(missing), MAX_BATCH_SIZE):
+            chunk = missing[start:start + MAX_BATCH_SIZE]
+            response = self.client.table(self.table).select(self.columns).in_(self.key, chunk).execute()
+            self.queries += 1
+
+            found: Dict[str, Any] = {}
+            for row in response.data or []:
+                row_key = str(row.get(self.key))
+                if self.many:
+                    found.setdefault(row_key, []).append(row)
+                else:
+                    found.setdefault(row_key, row)
+
+            with self._lock:
+                for k in chunk:
+                    self._cache[k] = found.get(str(k), [] if self.many else None)
+
+    def load_many(self, keys: List[Hashable]) -> List[Any]:
+        """
+        Resuelve varias claves con el mínimo de consultas.
+
+        Returns:
+            list: Un resultado por clave, en el mismo orden (fila, None o lista si many=True)
+        """
+        self._dispatch(keys)
+        return [self._cache.get(k, [] if self.many else None) if k is not None else None for k in keys]
+
+    def load(self, key: Hashable) -> Any:
+        """Resuelve una clave (y las encoladas) y devuelve su resultado."""
+        return self.load_many([key])[0]
+
+    def prime(self, key: Hashable, value: Any) -> None:
+        """Guarda un valor ya conocido para no consultarlo."""
+        with self._lock:
+            self._cache[key] = value
+
+    def clear(self) -> None:
+        """Olvida los resultados guardados."""
+        with self._lock:
+            self._cache.clear()
+
+
+def get_loader(client, table: str, key: str = 'auth_user_id', columns: str = '*', many: bool = False) -> BatchLoader:
+    """
+    Devuelve el loader del request actual para (tabla, clave, columnas).
+
+    Fuera de un request devuelve un loader nuevo (sin caché compartida).
+    """
+    if not has_app_context():
+        return BatchLoader(client, table, key, columns, many)
+
+    loaders = g.get('_batch_loaders')
+    if loaders is None:
+        loaders = g._batch_loaders = {}
+    loader_key = (id(client), table, key, columns, many)
+    loader = loaders.get(loader_key)
+    if loader is None:
+        loader = loaders[loader_key] = BatchLoader(client, table, key, columns, many)
+    return loader
+
+
+@register_write_listener
+def _clear_loaders(table: str, action: str, auth_user_id: Optional[str]):
+    """Tras una escritura, los loaders del request no deben devolver datos viejos de esa tabla."""
+    if has_app_context():
+        for loader in (g.get('_batch_loaders') or {}).values():
+            if loader.table == table:
+                loader.clear()
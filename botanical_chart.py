@@ -1,68 +1,192 @@
+"""
+Gráfico de clases botánicas por comuna para MeliAPP.
+
+Este módulo contiene:
+- CLASES_BOTANICAS: iconos, colores y descripciones de cada clase
+- Respuestas precalculadas: el JSON de cada comuna se serializa una sola vez
+  (y se comprime con gzip si conviene), con un ETag fuerte por representación
+- Rutas /api/botanical-classes y /api/botanical-classes/<comuna>, que
+  responden 304 a If-None-Match y envían Cache-Control para el CDN
+"""
+
+import gzip
+import hashlib
+import json
 import os
-import csv
-from flask import Blueprint, jsonify
-from functools import lru_cache
+import threading
+from typing import Dict, Optional
+
+from flask import Blueprint, Response, jsonify, request
+from flora_catalog import flora_catalog
+from warmup import register_warmup_step
 
 botanical_bp = Blueprint('botanical', __name__)
 
-@lru_cache(maxsize=128)
-def read_botanical_classes():
-    """Lee el archivo CSV y retorna un diccionario con clases por comuna"""
-    # Intentar múltiples rutas para compatibilidad con Vercel
-    possible_paths = [
-        os.path.join(os.path.dirname(__file__), 'docs', 'clases.csv'),
-        os.path.join(os.getcwd(), 'docs', 'clases.csv'),
-        '/app/docs/clases.csv',  # Ruta típica en Vercel
-        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'docs', 'clases.csv')
-    ]
-    
-    classes_by_commune = {}
-    csv_path = None
-    
-    # Buscar el archivo en las rutas posibles
-    for path in possible_paths:
-        if os.path.exists(path):
-            csv_path = path
-            break
-    
-    if not csv_path:
-        print("❌ Archivo clases.csv no encontrado en ninguna ruta")
-        return {}
-    
-    try:
-        # Usar latin-1 para manejar caracteres españoles
-        with open(csv_path, 'r', encoding='latin-1') as f:
-            reader = csv.DictReader(f, delimiter=';')
-            
-            for row in reader:
-                comuna = row.get('Comuna', '').strip()
-                clase = row.get('Clase', '').strip()
-                especie = row.get('Nombre Comun', '').strip()
-                
-                if comuna and clase and especie:
-                    if comuna not in classes_by_commune:
-                        classes_by_commune[comuna] = {}
-                    if clase not in classes_by_commune[comuna]:
-                        classes_by_commune[comuna][clase] = []
-                    if especie not in classes_by_commune[comuna][clase]:
-                        classes_by_commune[comuna][clase].append(especie)
-                        
-        print(f"✅ CSV cargado exitosamente desde: {csv_path}")
-        print(f"📊 Total de comunas: {len(classes_by_commune)}")
-                        
-    except Exception as e:
-        print(f"❌ Error leyendo CSV desde {csv_path}: {e}")
-        return {}
-        
-    return classes_by_commune
+# El catálogo solo cambia con un deploy: el navegador revalida cada hora y el CDN guarda un día
+BOTANICAL_CACHE_CONTROL = os.getenv(
+    'BOTANICAL_CACHE_CONTROL', 'public, max-age=3600, s-maxage=86400, stale-while-revalidate=86400')
+# Cuerpos más chicos que esto no se comprimen
+GZIP_MIN_BYTES = 512
+
+# Mapeo completo de clases botánicas con iconos, colores y descripciones pedagógicas
+CLASES_BOTANICAS = {
+    'Arbol': {
+        'icono': '🌳',
+        'color': '#22c55e',
+        'titulo': 'Árboles',
+        'descripcion': 'Plantas leñosas perennes de gran tamaño',
+        'categoria': 'Leñosa',
+        'altura': 'Mayor a 5 metros'
+    },
+    'Arbol/Arbusto': {
+        'icono': '🌲',
+        'color': '#16a34a',
+        'titulo': 'Árboles/Arbustos',
+        'descripcion': 'Plantas leñosas de tamaño variable',
+        'categoria': 'Leñosa Mixta',
+        'altura': '2-5 metros'
+    },
+    'Arbusto': {
+        'icono': '🌿',
+        'color': '#84cc16',
+        'titulo': 'Arbustos',
+        'descripcion': 'Plantas leñosas de tamaño mediano',
+        'categoria': 'Leñosa',
+        'altura': '1-2 metros'
+    },
+    'Hierba': {
+        'icono': '🌱',
+        'color': '#65a30d',
+        'titulo': 'Hierbas',
+        'descripcion': 'Plantas herbáceas sin estructura leñosa',
+        'categoria': 'Herbácea',
+        'altura': 'Menor a 1 metro'
+    },
+    'Arbusto/Hierba': {
+        'icono': '🌾',
+        'color': '#a3a3a3',
+        'titulo': 'Arbustos/Hierbas',
+        'descripcion': 'Plantas con características mixtas',
+        'categoria': 'Mixta',
+        'altura': 'Variable'
+    },
+    'Arbol/Hierba': {
+        'icono': '🌴',
+        'color': '#10b981',
+        'titulo': 'Árboles/Hierbas',
+        'descripcion': 'Combinación de características arbóreas y herbáceas',
+        'categoria': 'Mixta',
+        'altura': 'Variable'
+    }
+}
+
+CLASE_DESCONOCIDA = {
+    'icono': '🌿',
+    'color': '#6b7280',
+    'descripcion': 'Clase botánica',
+    'categoria': 'Otra',
+    'altura': 'Variable'
+}
+
+
+class PrebuiltResponse:
+    """Cuerpo JSON ya serializado (y su versión gzip) con sus ETag fuertes."""
+
+    __slots__ = ('body', 'etag', 'gzip_body', 'gzip_etag')
+
+    def __init__(self, payload: dict):
+        self.body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        # mtime=0: el mismo cuerpo produce siempre los mismos bytes comprimidos
+        self.gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0) if len(self.body) >= GZIP_MIN_BYTES else None
+        self.gzip_etag = f'"{digest}-gz"' if self.gzip_body else None
+
+
+_prebuilt: Optional[Dict[str, PrebuiltResponse]] = None  # comuna -> respuesta
+_prebuilt_communes: Optional[PrebuiltResponse] = None  # listado de comunas
+_prebuilt_lock = threading.Lock()
+
+
+def _comuna_payload(comuna: str) -> dict:
+    """Respuesta de /api/botanical-classes/<comuna> con la información visual de cada clase."""
+    classes = []
+    for clase, especies in flora_catalog.clases_por_comuna(comuna).items():
+        clase_info = CLASES_BOTANICAS.get(clase, {**CLASE_DESCONOCIDA, 'titulo': clase})
+        classes.append({
+            'clase': clase,
+            'titulo': clase_info['titulo'],
+            'icono': clase_info['icono'],
+            'color': clase_info['color'],
+            'descripcion': clase_info['descripcion'],
+            'categoria': clase_info['categoria'],
+            'altura': clase_info['altura'],
+            'especies': especies,
+            'cantidad': len(especies)
+        })
+    return {
+        'success': True,
+        'classes': classes,
+        'comuna': comuna,
+        'total_classes': len(classes)
+    }
+
+
+def build_responses() -> int:
+    """
+    Serializa las respuestas de todas las comunas (una sola vez por proceso).
+
+    Returns:
+        int: Número de comunas precalculadas
+    """
+    global _prebuilt, _prebuilt_communes
+    if _prebuilt is None:
+        with _prebuilt_lock:
+            if _prebuilt is None:
+                communes = flora_catalog.comunas()
+                _prebuilt_communes = PrebuiltResponse({
+                    'success': True,
+                    'communes': communes,
+                    'total': len(communes)
+                })
+                _prebuilt = {comuna: PrebuiltResponse(_comuna_payload(comuna)) for comuna in communes}
+    return len(_prebuilt)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Compara If-None-Match con un ETag (acepta listas, W/ y *)."""
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag == '*' or (tag[2:] if tag.startswith('W/') else tag) == etag:
+            return True
+    return False
+
+
+def _serve(prebuilt: PrebuiltResponse) -> Response:
+    """Responde con los bytes precalculados: gzip si el cliente lo acepta y 304 si ya los tiene."""
+    # accept_encodings respeta q=0 (gzip rechazado) y el comodín '*'
+    use_gzip = prebuilt.gzip_body is not None and request.accept_encodings['gzip'] > 0
+    etag = prebuilt.gzip_etag if use_gzip else prebuilt.etag
+
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match and _etag_matches(if_none_match, etag):
+        response = Response(status=304)
+    else:
+        response = Response(prebuilt.gzip_body if use_gzip else prebuilt.body, mimetype='application/json')
+        if use_gzip:
+            response.headers['Content-Encoding'] = 'gzip'
+
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = BOTANICAL_CACHE_CONTROL
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
 
 @botanical_bp.route('/api/botanical-classes/<comuna>')
 def get_botanical_classes(comuna):
     """Obtener clases botánicas para una comuna específica."""
     try:
-        classes_data = read_botanical_classes()
-        
-        if not classes_data:
+        if not flora_catalog.load().especies:
             return jsonify({
                 'success': False, 
                 'message': 'No hay datos disponibles'
@@ -70,8 +194,9 @@ def get_botanical_classes(comuna):
         
         # Verificar si la comuna existe (limpiar espacios y saltos de línea)
         comuna = comuna.strip()
-        if comuna not in classes_data:
-            available_communes = sorted(classes_data.keys())
+        canonical = flora_catalog.resolve_comuna(comuna)
+        if not canonical:
+            available_communes = flora_catalog.comunas()
             print(f"❌ Comuna '{comuna}' no encontrada")
             print(f"✅ Comunas disponibles: {available_communes}")
             
@@ -82,89 +207,8 @@ def get_botanical_classes(comuna):
                 'requested_comuna': comuna
             })
 
-        # Mapeo completo de clases botánicas con iconos, colores y descripciones pedagógicas
-        CLASES_BOTANICAS = {
-            'Arbol': {
-                'icono': '🌳',
-                'color': '#22c55e',
-                'titulo': 'Árboles',
-                'descripcion': 'Plantas leñosas perennes de gran tamaño',
-                'categoria': 'Leñosa',
-                'altura': 'Mayor a 5 metros'
-            },
-            'Arbol/Arbusto': {
-                'icono': '🌲',
-                'color': '#16a34a',
-                'titulo': 'Árboles/Arbustos',
-                'descripcion': 'Plantas leñosas de tamaño variable',
-                'categoria': 'Leñosa Mixta',
-                'altura': '2-5 metros'
-            },
-            'Arbusto': {
-                'icono': '🌿',
-                'color': '#84cc16',
-                'titulo': 'Arbustos',
-                'descripcion': 'Plantas leñosas de tamaño mediano',
-                'categoria': 'Leñosa',
-                'altura': '1-2 metros'
-            },
-            'Hierba': {
-                'icono': '🌱',
-                'color': '#65a30d',
-                'titulo': 'Hierbas',
-                'descripcion': 'Plantas herbáceas sin estructura leñosa',
-                'categoria': 'Herbácea',
-                'altura': 'Menor a 1 metro'
-            },
-            'Arbusto/Hierba': {
-                'icono': '🌾',
-                'color': '#a3a3a3',
-                'titulo': 'Arbustos/Hierbas',
-                'descripcion': 'Plantas con características mixtas',
-                'categoria': 'Mixta',
-                'altura': 'Variable'
-            },
-            'Arbol/Hierba': {
-                'icono': '🌴',
-                'color': '#10b981',
-                'titulo': 'Árboles/Hierbas',
-                'descripcion': 'Combinación de características arbóreas y herbáceas',
-                'categoria': 'Mixta',
-                'altura': 'Variable'
-            }
-        }
-        
-        # Formatear respuesta con información visual completa
-        classes = []
-        for clase, especies in classes_data[comuna].items():
-            clase_info = CLASES_BOTANICAS.get(clase, {
-                'icono': '🌿',
-                'color': '#6b7280',
-                'titulo': clase,
-                'descripcion': 'Clase botánica',
-                'categoria': 'Otra',
-                'altura': 'Variable'
-            })
-            
-            classes.append({
-                'clase': clase,
-                'titulo': clase_info['titulo'],
-                'icono': clase_info['icono'],
-                'color': clase_info['color'],
-                'descripcion': clase_info['descripcion'],
-                'categoria': clase_info['categoria'],
-                'altura': clase_info['altura'],
-                'especies': especies,
-                'cantidad': len(especies)
-            })
-
-        print(f"✅ Comuna '{comuna}' encontrada con {len(classes)} clases")
-        return jsonify({
-            'success': True,
-            'classes': classes,
-            'comuna': comuna,
-            'total_classes': len(classes)
-        })
+        build_responses()
+        return _serve(_prebuilt[canonical])
 
     except Exception as e:
         print(f"❌ Error: {str(e)}")
@@ -174,13 +218,13 @@ def get_botanical_classes(comuna):
 def get_all_communes():
     """Endpoint para obtener todas las comunas disponibles"""
     try:
-        classes_data = read_botanical_classes()
-        available_communes = sorted(classes_data.keys())
-        
-        return jsonify({
-            'success': True,
-            'communes': available_communes,
-            'total': len(available_communes)
-        })
+        build_responses()
+        return _serve(_prebuilt_communes)
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
+
+
+@register_warmup_step('botanical_responses')
+def _warm_botanical_responses(flask_app):
+    """Serializa las respuestas de /api/botanical-classes antes del primer request."""
+    return {'comunas': build_responses()}
@@ -0,0 +1,120 @@
+"""
+Utilidades de cache en memoria para MeliAPP.
+
+Este módulo contiene:
+- TTLCache: cache LRU acotado con expiración por entrada y contadores de uso
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Cache LRU con tamaño máximo y expiración (TTL) por entrada.
+
+    Es seguro para uso concurrente entre threads. Cada entrada puede tener su
+    propio instante de expiración (por ejemplo el `exp` de un JWT); si no se
+    indica, se usa el TTL por defecto del cache.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, maxsize: int = 256, ttl: Optional[float] = None):
+        """
+        Args:
+            maxsize: Número máximo de entradas antes de desalojar la menos usada
+            ttl: Segundos de vida por defecto de cada entrada (None = sin expiración)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Obtiene un valor vigente o `default` si no existe o expiró."""
+        with self._lock:
+            entry = self._data.get(key, self._MISSING)
+            if entry is self._MISSING:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, expires_at: Optional[float] = None) -> None:
+        """
+        Guarda un valor.
+
+        Args:
+            key: Clave de la entrada
+            value: Valor a guardar
+            expires_at: Timestamp absoluto de expiración; por defecto ahora + ttl
+        """
+        if expires_at is None and self.ttl is not None:
+            expires_at = time.time() + self.ttl
+
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any], expires_at: Optional[float] = None) -> Any:
+        """Devuelve el valor cacheado o lo construye con `factory` y lo guarda."""
+        value = self.get(key, self._MISSING)
+        if value is self._MISSING:
+            value = factory()
+            self.set(key, value, expires_at)
+        return value
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Elimina una entrada y devuelve su valor."""
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[0] if entry else default
+
+    def evict_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Elimina todas las entradas para las que `predicate(key, value)` es verdadero."""
+        with self._lock:
+            keys = [k for k, (v, _) in self._data.items() if predicate(k, v)]
+            for k in keys:
+                del self._data[k]
+        return len(keys)
+
+    def clear(self) -> None:
+        """Vacía el cache (los contadores se mantienen)."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        """Devuelve tamaño y contadores de aciertos/fallos."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0
+            }
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._data.get(key)
+            return bool(entry) and (entry[1] is None or entry[1] > time.time())
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
@@ -8,8 +8,6 @@ Este módulo contiene las rutas relacionadas con:
 """
 
 import logging
-import os
-import pandas as pd
 from flask import Blueprint, jsonify, request
 
 logger = logging.getLogger(__name__)
@@ -23,13 +21,33 @@ def get_table_data(table_name):
     Obtiene datos de una tabla específica con paginación.
     
     GET /api/table/<table_name>?page=1&per_page=20
+    GET /api/table/<table_name>?cursor=&per_page=20&count=none
+    
+    Con `cursor` (vacío para la primera página, luego `pagination.next_cursor`)
+    la paginación es por keyset: cada página cuesta lo mismo sin importar su
+    profundidad. `count` elige el conteo: exact (por defecto con `page`),
+    planned, estimated o none (por defecto con `cursor`). `order_by` (una
+    columna de la tabla; si no, 400) y `desc=1` ordenan por otra columna.
     """
     try:
-        from data_tables_supabase import get_table_data as get_table_data_func
+        from data_tables_supabase import (get_table_data as get_table_data_func, normalize_count,
+                                          decode_cursor, validate_order_by)
         page = request.args.get('page', 1, type=int)
         per_page = min(request.args.get('per_page', 20, type=int), 100)
+        cursor = request.args.get('cursor')
+        order_by = request.args.get('order_by') or None
+        ascending = request.args.get('desc') not in ('1', 'true')
+        
+        try:
+            count = normalize_count(request.args.get('count', 'none' if cursor is not None else 'exact'))
+            order_by = validate_order_by(table_name, order_by)
+            if cursor:
+                decode_cursor(cursor)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
         
-        success, result = get_table_data_func(table_name, page, per_page)
+        success, result = get_table_data_func(table_name, page, per_page, cursor=cursor, count=count,
+                                              order_by=order_by, ascending=ascending)
         
         if success:
             return jsonify({
@@ -50,9 +68,13 @@ def list_tables():
     Lista todas las tablas disponibles en la base de datos.
     
     GET /api/tables
+    GET /api/tables?refresh=1  (vuelve a leer el catálogo, p. ej. tras una migración)
     """
     try:
         from data_tables_supabase import list_tables as list_tables_func
+        if request.args.get('refresh'):
+            from schema_catalog import schema_catalog
+            schema_catalog.refresh()
         success, result = list_tables_func()
         if success:
             return jsonify({"success": True, "tables": result})
@@ -64,20 +86,13 @@ def list_tables():
 
 @data_tables_bp.route('/regiones', methods=['GET'])
 def get_regiones():
-    """Devuelve una lista de regiones desde el archivo CSV."""
+    """Devuelve una lista de regiones desde el catálogo de flora (clases.csv en memoria)."""
     try:
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        csv_path = os.path.join(base_dir, 'docs', 'clases.csv')
-
-        if not os.path.exists(csv_path):
-            return jsonify({"success": False, "error": f"Archivo no encontrado en: {csv_path}"}), 404
-
-        df = pd.read_csv(csv_path, sep=';', header=0)
-        df.columns = [col.strip() for col in df.columns]
-        df = df.iloc[:, :-1] # Ignorar la última columna vacía por el delimitador final
+        from flora_catalog import flora_catalog
+        if not flora_catalog.load().source:
+            return jsonify({"success": False, "error": "Archivo clases.csv no encontrado"}), 404
 
-        regiones = sorted(df['Region'].dropna().unique().tolist())
-        return jsonify({"success": True, "regiones": regiones})
+        return jsonify({"success": True, "regiones": flora_catalog.regiones()})
 
     except Exception as e:
         logger.error(f"Error al cargar regiones: {e}", exc_info=True)
@@ -87,23 +102,11 @@ def get_regiones():
 def get_comunas():
     """Devuelve una lista de comunas, opcionalmente filtrada por región."""
     try:
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        csv_path = os.path.join(base_dir, 'docs', 'clases.csv')
+        from flora_catalog import flora_catalog
+        if not flora_catalog.load().source:
+            return jsonify({"success": False, "error": "Archivo clases.csv no encontrado"}), 404
 
-        if not os.path.exists(csv_path):
-            return jsonify({"success": False, "error": f"Archivo no encontrado en: {csv_path}"}), 404
-
-        df = pd.read_csv(csv_path, sep=';', header=0)
-        df.columns = [col.strip() for col in df.columns]
-        df = df.iloc[:, :-1] # Ignorar la última columna vacía
-
-        region = request.args.get('region')
-        if region:
-            comunas_df = df[df['Region'] == region]
-            comunas = sorted(comunas_df['Comuna'].dropna().unique().tolist())
-        else:
-            comunas = sorted(df['Comuna'].dropna().unique().tolist())
-        
+        comunas = flora_catalog.comunas(region=request.args.get('region'))
         return jsonify({"success": True, "comunas": comunas})
 
     except Exception as e:
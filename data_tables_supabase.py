@@ -4,10 +4,16 @@ Incluye funciones para listar tablas, obtener datos, etc.
 """
 import os
 import json
+import base64
 import uuid
 import decimal
 import datetime
 from supabase_client import db
+from schema_catalog import schema_catalog
+
+# Modos de conteo de PostgREST: 'exact' recorre la tabla completa, 'planned'
+# usa la estimación del planner y 'estimated' combina ambos según el tamaño
+COUNT_MODES = ('exact', 'planned', 'estimated')
 
 
 def ensure_json_serializable(data):
@@ -45,11 +51,9 @@ def list_tables():
                y result es una lista de nombres de tablas o un mensaje de error
     """
     try:
-        # Usar la función RPC personalizada
-        result = db.client.rpc('get_all_tables').execute()
-        
-        if hasattr(result, 'data') and result.data:
-            tables = [table['table_name'] for table in result.data]
+        # Catálogo de esquema en memoria (se lee una vez y se refresca por TTL)
+        tables = schema_catalog.tables()
+        if tables:
             return True, tables
         return False, "No se encontraron tablas"
             
@@ -59,14 +63,176 @@ def list_tables():
         return False, error_msg
 
 
-def get_table_data(table_name, page=1, per_page=20):
+def normalize_count(count):
+    """
+    Valida el modo de conteo pedido.
+    
+    Returns:
+        str o None: 'exact', 'planned', 'estimated', o None para no contar
+    
+    Raises:
+        ValueError: Si el modo no es válido
+    """
+    if count in (None, '', 'none'):
+        return None
+    if count not in COUNT_MODES:
+        raise ValueError(f"count debe ser uno de: {', '.join(COUNT_MODES)}, none")
+    return count
+
+
+def validate_order_by(table_name, order_by):
+    """
+    Valida la columna de orden contra el catálogo de esquema.
+    
+    El nombre va tal cual en `order=` y en el filtro `or=(...)` del cursor, así
+    que solo se aceptan columnas conocidas de la tabla.
+    
+    Returns:
+        str o None: La columna, o None si no se pidió orden
+    
+    Raises:
+        ValueError: Si la columna no existe en la tabla
+    """
+    if not order_by:
+        return None
+    if order_by not in schema_catalog.column_names(table_name):
+        raise ValueError(f"order_by debe ser una columna de la tabla {table_name}")
+    return order_by
+
+
+def encode_cursor(values):
+    """Codifica la posición de la última fila como cursor opaco (base64url de JSON)."""
+    raw = json.dumps(ensure_json_serializable(values), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decodifica un cursor de encode_cursor.
+    
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except Exception:
+        raise ValueError("Cursor inválido")
+    if not isinstance(values, dict) or 'k' not in values:
+        raise ValueError("Cursor inválido")
+    return values
+
+
+def _filter_value(value):
+    """Entrecomilla un valor para la sintaxis de filtros de PostgREST."""
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _after_cursor_filter(key, key_value, order_by=None, order_value=None, ascending=True):
+    """
+    Filtro `or=(...)` con las filas posteriores al cursor en el orden (order_by, key).
+    
+    Sin `order_by` se ordena solo por la clave, en el sentido `ascending`. Con
+    `order_by` la clave es el desempate (siempre ascendente) y se respeta el
+    orden por defecto de Postgres para nulos: al final en orden ascendente y
+    al principio en orden descendente.
+    """
+    if not order_by:
+        return f"{key}.{'gt' if ascending else 'lt'}.{_filter_value(key_value)}"
+    after_key = f'{key}.gt.{_filter_value(key_value)}'
+    if order_value is None:
+        same = f'and({order_by}.is.null,{after_key})'
+        return same if ascending else f'{same},{order_by}.not.is.null'
+    op = 'gt' if ascending else 'lt'
+    conditions = [f'{order_by}.{op}.{_filter_value(order_value)}',
+                  f'and({order_by}.eq.{_filter_value(order_value)},{after_key})']
+    if ascending:
+        conditions.append(f'{order_by}.is.null')
+    return ','.join(conditions)
+
+
+def paginate(query, table_name, per_page, page=1, cursor=None, order_by=None, ascending=True):
+    """
+    Ejecuta una consulta paginada por cursor (keyset) o por número de página.
+    
+    Las filas se ordenan por (order_by, clave estable de la tabla). Con
+    `cursor` la consulta filtra "después de la última fila vista", así que
+    la página 500 cuesta lo mismo que la primera; sin cursor se usa `range()`
+    con offset, por compatibilidad. Se pide una fila extra para saber si
+    hay página siguiente sin contar.
+    
+    Args:
+        query: Consulta de PostgREST ya filtrada (`.select(...)`)
+        table_name: Tabla consultada (para buscar su clave estable)
+        per_page: Filas por página
+        page: Número de página (solo sin cursor)
+        cursor: Cursor devuelto en la página anterior ('' = primera página)
+        order_by: Columna de orden opcional
+        ascending: Sentido del orden de `order_by`
+        
+    Returns:
+        tuple: (respuesta, filas, cursor siguiente o None, hay_siguiente)
+    
+    Raises:
+        ValueError: Cursor inválido, columna de orden desconocida, o cursor en
+                    una tabla sin clave estable
+    """
+    order_by = validate_order_by(table_name, order_by)
+    key = schema_catalog.primary_key(table_name)
+    if cursor is not None and not key:
+        raise ValueError(f"La tabla {table_name} no tiene una clave estable para paginar por cursor")
+    if order_by == key:
+        order_by = None
+    key_ascending = ascending if not order_by else True
+    
+    if order_by:
+        query = query.order(order_by, desc=not ascending)
+    if key:
+        query = query.order(key, desc=not key_ascending)
+    
+    if cursor:
+        position = decode_cursor(cursor)
+        if position.get('by') != order_by or position.get('asc', True) != ascending:
+            raise ValueError("El cursor corresponde a otro orden")
+        query = query.or_(_after_cursor_filter(key, position['k'], order_by, position.get('o'), ascending))
+        query = query.limit(per_page + 1)
+    elif cursor is not None:
+        query = query.limit(per_page + 1)
+    else:
+        start = (page - 1) * per_page
+        query = query.range(start, start + per_page)
+    
+    result = query.execute()
+    rows = result.data or []
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    
+    next_cursor = None
+    if has_next and key:
+        last = rows[-1]
+        position = {'k': last.get(key), 'asc': ascending}
+        if order_by:
+            position.update({'by': order_by, 'o': last.get(order_by)})
+        next_cursor = encode_cursor(position)
+    return result, rows, next_cursor, has_next
+
+
+def get_table_data(table_name, page=1, per_page=20, cursor=None, count='exact', order_by=None, ascending=True):
     """
     Obtiene datos paginados de una tabla específica.
     
+    Con `cursor` (el `next_cursor` de la página anterior, o '' para la primera)
+    se pagina por keyset y el costo no depende de la profundidad; con `page`
+    se mantiene la paginación por offset.
+    
     Args:
         table_name (str): Nombre de la tabla
-        page (int): Número de página (comienza en 1)
+        page (int): Número de página (comienza en 1); se ignora si hay cursor
         per_page (int): Cantidad de registros por página
+        cursor (str): Cursor opaco de la página anterior
+        count (str): 'exact', 'planned', 'estimated' o None/'none' para no contar
+        order_by (str): Columna de orden opcional
+        ascending (bool): Sentido del orden
         
     Returns:
         tuple: (success, result) donde success es un booleano que indica si la operación fue exitosa,
@@ -79,41 +245,36 @@ def get_table_data(table_name, page=1, per_page=20):
             per_page = min(100, max(1, int(per_page)))
         except (ValueError, TypeError):
             return False, "Parámetros de paginación inválidos"
-
-        # Calcular rango
-        start = (page - 1) * per_page
-        end = start + per_page - 1
+        count = normalize_count(count)
 
         # Realizar consulta
-        result = db.client.table(table_name)\
-                        .select('*', count='exact')\
-                        .range(start, end)\
-                        .execute()
+        query = db.client.table(table_name).select('*', count=count)
+        result, rows, next_cursor, has_next = paginate(query, table_name, per_page, page, cursor, order_by, ascending)
 
-        if not hasattr(result, 'data') or result.data is None:
+        if result.data is None:
             return False, f"No se encontraron datos en la tabla {table_name}"
             
-        # Obtener el total de registros
-        total_records = getattr(result, 'count', len(result.data))
-        
-        # Calcular total de páginas
-        total_pages = (total_records + per_page - 1) // per_page
+        # Total de registros (estimado según el modo de conteo, None si no se contó)
+        total_records = getattr(result, 'count', None) if count else None
+        total_pages = (total_records + per_page - 1) // per_page if total_records is not None else None
         
         # Asegurar que los datos sean serializables a JSON
-        json_safe_data = ensure_json_serializable(result.data)
+        json_safe_data = ensure_json_serializable(rows)
         
-        return True, {
-            'data': json_safe_data,
-            'pagination': {
-                'current_page': page,
-                'per_page': per_page,
-                'total_records': total_records,
-                'total_pages': total_pages,
-                'has_next': page < total_pages,
-                'has_previous': page > 1
-            }
+        pagination = {
+            'per_page': per_page,
+            'total_records': total_records,
+            'total_pages': total_pages,
+            'count_mode': count,
+            'has_next': has_next,
+            'next_cursor': next_cursor
         }
+        if cursor is None:
+            pagination.update({'current_page': page, 'has_previous': page > 1})
+        return True, {'data': json_safe_data, 'pagination': pagination}
             
+    except ValueError as e:
+        return False, str(e)
     except Exception as e:
         error_msg = f"Error al obtener datos de la tabla {table_name}: {str(e)}"
         print(error_msg)
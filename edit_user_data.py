@@ -1,10 +1,9 @@
 from flask import Blueprint, request, jsonify, session, g
 from auth_manager import AuthManager
-from modify_DB import DatabaseModifier, update_user_data, update_user_contact
+from modify_DB import DatabaseModifier, update_user_data, update_user_contact, notify_write
 from supabase_client import SupabaseClient
+from flora_catalog import flora_catalog
 import logging
-import os
-import csv
 
 
 logger = logging.getLogger(__name__)
@@ -94,6 +93,7 @@ def handle_ubicaciones():
                 return jsonify({"success": False, "error": "Error de autenticación"}), 401
             
             result_response = auth_client.table('ubicaciones').delete().eq('id', location_id).eq('auth_user_id', user_uuid).execute()
+            notify_write('ubicaciones', 'delete', user_uuid)
             success = bool(result_response.data)
             result = {"success": success, "message": "Ubicación eliminada exitosamente" if success else "Error al eliminar"}
             status_code = 200 if success else 400
@@ -334,30 +334,18 @@ def edit_info_contacto():
 
 @edit_bp.route('/api/suggestions/comunas', methods=['GET'])
 def get_comuna_suggestions():
-    """Obtiene sugerencias de comunas desde clases.csv."""
+    """Obtiene sugerencias de comunas desde el catálogo de flora (clases.csv en memoria)."""
     try:
         query = request.args.get('q', '').strip()
         if not query or len(query) < 2:
             return jsonify({'success': True, 'suggestions': []})
         
-        csv_path = os.path.join(os.path.dirname(__file__), 'docs', 'clases.csv')
-        comunas = set()
-        
-        try:
-            with open(csv_path, 'r', encoding='utf-8') as file:
-                reader = csv.DictReader(file, delimiter=';')
-                for row in reader:
-                    comuna = row.get('Comuna', '').strip()
-                    if comuna and query.lower() in comuna.lower():
-                        # Capitalizar primera letra de cada palabra
-                        comuna_capitalized = ' '.join(word.capitalize() for word in comuna.split())
-                        comunas.add(comuna_capitalized)
-        except FileNotFoundError:
-            logger.warning(f"Archivo clases.csv no encontrado en {csv_path}")
-            return jsonify({'success': True, 'suggestions': []})
+        # Capitalizar primera letra de cada palabra
+        comunas = {' '.join(word.capitalize() for word in comuna.split())
+                   for comuna in flora_catalog.sugerir_comunas(query, limit=None)}
         
         # Convertir a lista ordenada
-        suggestions = sorted(list(comunas))[:10]  # Limitar a 10 sugerencias
+        suggestions = sorted(comunas)[:10]  # Limitar a 10 sugerencias
         
         return jsonify({
             'success': True,
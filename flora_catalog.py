@@ -0,0 +1,286 @@
+"""
+Catálogo de flora melífera (docs/clases.csv) en memoria para MeliAPP.
+
+Este módulo contiene:
+- Especie: una fila del catálogo
+- FloraCatalog: lee el CSV una sola vez por proceso (UTF-8) y mantiene
+  índices por comuna, región, clase, nombre común y nombre científico
+- flora_catalog: instancia global usada por el gráfico botánico, las rutas
+  de regiones/comunas, las sugerencias de comuna y los lotes
+- build_artifact: precompila el catálogo ya indexado a docs/clases.pkl
+  (ver scripts/build_flora_catalog.py); al cargar se usa ese artefacto con
+  una sola lectura y se vuelve al CSV si está desactualizado
+
+Reemplaza los tres lectores anteriores del CSV (csv en latin-1, pandas en cada
+request y csv en cada pulsación de teclado).
+"""
+
+import csv
+import hashlib
+import logging
+import os
+import pickle
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Rutas donde buscar el CSV (local y Vercel)
+CSV_PATHS = (
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'docs', 'clases.csv'),
+    os.path.join(os.getcwd(), 'docs', 'clases.csv'),
+    '/app/docs/clases.csv',
+)
+
+# Versión del formato del artefacto precompilado (cambiarla invalida los existentes)
+ARTIFACT_VERSION = 2
+
+# Atributos del catálogo que se guardan en el artefacto
+_STATE_ATTRS = ('especies', 'por_comuna', 'por_region', 'por_clase',
+                'por_nombre_comun', 'por_nombre_cientifico', '_comuna_keys')
+
+
+@dataclass(frozen=True)
+class Especie:
+    """Una especie del catálogo en una comuna."""
+    comuna: str
+    region: str
+    nombre_comun: str
+    nombre_cientifico: str
+    clase: str
+    origen: str
+    floracion: str
+
+
+def _key(text: str) -> str:
+    """Clave de búsqueda: minúsculas y espacios normalizados."""
+    return ' '.join(text.lower().split())
+
+
+def find_csv_path() -> Optional[str]:
+    """Primera ruta existente del CSV, o None."""
+    return next((path for path in CSV_PATHS if os.path.exists(path)), None)
+
+
+def artifact_path_for(csv_path: str) -> str:
+    """Ruta del artefacto precompilado junto al CSV (docs/clases.pkl)."""
+    return os.path.splitext(csv_path)[0] + '.pkl'
+
+
+def csv_fingerprint(csv_path: str) -> Dict[str, Any]:
+    """Tamaño y SHA-256 del CSV, para detectar artefactos desactualizados."""
+    with open(csv_path, 'rb') as f:
+        data = f.read()
+    return {'size': len(data), 'sha256': hashlib.sha256(data).hexdigest()}
+
+
+class FloraCatalog:
+    """
+    Catálogo inmutable de especies con índices, cargado en el primer uso.
+
+    Las listas devueltas conservan el orden del CSV. Es seguro para uso
+    concurrente (la carga se hace una sola vez bajo lock).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.source: Optional[str] = None
+        self.especies: Tuple[Especie, ...] = ()
+        self.por_comuna: Dict[str, Tuple[Especie, ...]] = {}
+        self.por_region: Dict[str, Tuple[str, ...]] = {}  # región -> comunas
+        self.por_clase: Dict[str, Tuple[Especie, ...]] = {}
+        self.por_nombre_comun: Dict[str, Tuple[Especie, ...]] = {}  # clave normalizada -> especies
+        self.por_nombre_cientifico: Dict[str, Tuple[Especie, ...]] = {}
+        self._comuna_keys: Dict[str, str] = {}  # clave normalizada -> comuna
+
+    # ---- carga ----
+
+    @staticmethod
+    def parse_csv(path: str) -> List[Especie]:
+        """Lee el CSV (separado por ';', UTF-8) y devuelve las filas completas."""
+        especies = []
+        with open(path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+            for row in csv.DictReader(f, delimiter=';'):
+                especie = Especie(
+                    comuna=(row.get('Comuna') or '').strip(),
+                    region=(row.get('Region') or '').strip(),
+                    nombre_comun=(row.get('Nombre Comun') or '').strip(),
+                    nombre_cientifico=(row.get('Nombre Cientifico') or '').strip(),
+                    clase=(row.get('Clase') or '').strip(),
+                    origen=(row.get('Origen') or '').strip(),
+                    floracion=(row.get('Periodo de Floracion') or '').strip(),
+                )
+                if especie.comuna and especie.clase and especie.nombre_comun:
+                    especies.append(especie)
+        return especies
+
+    def _index(self, especies: List[Especie]):
+        """Construye los índices a partir de las filas."""
+        def group(key_func) -> Dict[str, Tuple[Especie, ...]]:
+            grouped: Dict[str, List[Especie]] = {}
+            for especie in especies:
+                key = key_func(especie)
+                if key:
+                    grouped.setdefault(key, []).append(especie)
+            return {key: tuple(values) for key, values in grouped.items()}
+
+        self.especies = tuple(especies)
+        self.por_comuna = group(lambda e: e.comuna)
+        self.por_clase = group(lambda e: e.clase)
+        self.por_nombre_comun = group(lambda e: _key(e.nombre_comun))
+        self.por_nombre_cientifico = group(lambda e: _key(e.nombre_cientifico))
+
+        regiones: Dict[str, Dict[str, None]] = {}
+        for especie in especies:
+            if especie.region:
+                regiones.setdefault(especie.region, {})[especie.comuna] = None
+        self.por_region = {region: tuple(comunas) for region, comunas in regiones.items()}
+        self._comuna_keys = {_key(comuna): comuna for comuna in self.por_comuna}
+
+    @staticmethod
+    def _read_artifact(csv_path: Optional[str]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        (estado del catálogo, ruta) desde el artefacto precompilado, o (None, None) si no sirve.
+
+        El artefacto son dos pickles seguidos: una cabecera chica (versión y
+        huella del CSV) y el estado. El estado solo se deserializa si la
+        versión coincide y el CSV no cambió: mismo tamaño y mismo SHA-256 que
+        al generarlo (el mtime no sirve, cambia en cada checkout o deploy).
+        Sin CSV se usa el artefacto tal cual.
+        """
+        candidates = [artifact_path_for(csv_path)] if csv_path else [artifact_path_for(p) for p in CSV_PATHS]
+        artifact_path = next((path for path in candidates if os.path.exists(path)), None)
+        if not artifact_path:
+            return None, None
+
+        with open(artifact_path, 'rb') as f:
+            header = pickle.load(f)
+            if not isinstance(header, dict) or header.get('version') != ARTIFACT_VERSION:
+                logger.warning(f"Artefacto de flora {artifact_path} con versión distinta, se usará el CSV")
+                return None, None
+
+            if csv_path:
+                built = header.get('csv') or {}
+                if os.path.getsize(csv_path) != built.get('size') or \
+                        csv_fingerprint(csv_path)['sha256'] != built.get('sha256'):
+                    logger.warning(f"Artefacto de flora {artifact_path} desactualizado respecto a {csv_path}, "
+                                   f"se usará el CSV (regenerar con scripts/build_flora_catalog.py)")
+                    return None, None
+
+            return pickle.load(f), artifact_path
+
+    def load(self) -> 'FloraCatalog':
+        """Carga el catálogo si aún no se cargó: artefacto precompilado o, si no sirve, el CSV."""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    path = find_csv_path()
+                    try:
+                        state, artifact_path = self._read_artifact(path)
+                    except Exception as e:
+                        logger.warning(f"No se pudo leer el artefacto de flora, se usará el CSV: {e}")
+                        state, artifact_path = None, None
+
+                    if state:
+                        self.source = artifact_path
+                        for attr in _STATE_ATTRS:
+                            setattr(self, attr, state[attr])
+                        logger.info(f"Catálogo de flora cargado desde {self.source}: {len(self.especies)} especies")
+                    else:
+                        if not path:
+                            logger.error("Archivo clases.csv no encontrado en ninguna ruta")
+                            especies = []
+                        else:
+                            especies = self.parse_csv(path)
+                            logger.info(f"Catálogo de flora cargado desde {path}: {len(especies)} especies")
+                        self._index(especies)
+                        self.source = path
+                    self._loaded = True
+        return self
+
+    # ---- consulta ----
+
+    def comunas(self, region: Optional[str] = None) -> List[str]:
+        """Comunas ordenadas, opcionalmente solo las de una región."""
+        self.load()
+        if region:
+            return sorted(self.por_region.get(region, ()))
+        return sorted(self.por_comuna)
+
+    def regiones(self) -> List[str]:
+        self.load()
+        return sorted(self.por_region)
+
+    def resolve_comuna(self, comuna: str) -> Optional[str]:
+        """Nombre de comuna tal como está en el catálogo (sin importar mayúsculas/espacios)."""
+        self.load()
+        comuna = (comuna or '').strip()
+        if comuna in self.por_comuna:
+            return comuna
+        return self._comuna_keys.get(_key(comuna))
+
+    def clases_por_comuna(self, comuna: str) -> Dict[str, List[str]]:
+        """{clase: [nombres comunes]} de una comuna, en el orden del CSV y sin repetidos."""
+        clases: Dict[str, Dict[str, None]] = {}
+        for especie in self.por_comuna.get(self.resolve_comuna(comuna) or '', ()):
+            clases.setdefault(especie.clase, {})[especie.nombre_comun] = None
+        return {clase: list(nombres) for clase, nombres in clases.items()}
+
+    def nombres_por_comuna(self, comuna: str) -> List[str]:
+        """Nombres comunes de todas las especies de una comuna, sin repetidos."""
+        return list(dict.fromkeys(e.nombre_comun for e in self.por_comuna.get(self.resolve_comuna(comuna) or '', ())))
+
+    def buscar_especie(self, nombre: str) -> List[Especie]:
+        """Especies cuyo nombre común o científico es `nombre` (sin importar mayúsculas)."""
+        self.load()
+        key = _key(nombre or '')
+        return list(dict.fromkeys(self.por_nombre_comun.get(key, ()) + self.por_nombre_cientifico.get(key, ())))
+
+    def sugerir_comunas(self, query: str, limit: Optional[int] = 10) -> List[str]:
+        """Comunas que contienen `query`, ordenadas (limit=None para todas)."""
+        self.load()
+        key = _key(query or '')
+        return sorted(comuna for k, comuna in self._comuna_keys.items() if key in k)[:limit]
+
+    def stats(self) -> Dict[str, Any]:
+        self.load()
+        return {'especies': len(self.especies), 'comunas': len(self.por_comuna),
+                'regiones': len(self.por_region), 'clases': len(self.por_clase),
+                'source': os.path.basename(self.source) if self.source else None}
+
+
+def build_artifact(csv_path: Optional[str] = None, artifact_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Precompila el CSV a un artefacto con el catálogo ya indexado (pickle).
+
+    Args:
+        csv_path: CSV de origen (por defecto el primero encontrado)
+        artifact_path: Destino (por defecto junto al CSV, docs/clases.pkl)
+
+    Returns:
+        dict: Rutas, especies y tamaño del artefacto en bytes
+    """
+    csv_path = csv_path or find_csv_path()
+    if not csv_path:
+        raise FileNotFoundError("Archivo clases.csv no encontrado")
+    artifact_path = artifact_path or artifact_path_for(csv_path)
+
+    catalog = FloraCatalog()
+    catalog._index(FloraCatalog.parse_csv(csv_path))
+    header = {'version': ARTIFACT_VERSION, 'csv': csv_fingerprint(csv_path)}
+    state = {attr: getattr(catalog, attr) for attr in _STATE_ATTRS}
+
+    # Escritura atómica: una instancia que arranca nunca ve un artefacto a medias
+    tmp_path = f'{artifact_path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, artifact_path)
+    return {'csv': csv_path, 'artifact': artifact_path, 'especies': len(catalog.especies),
+            'bytes': os.path.getsize(artifact_path)}
+
+
+# Instancia global
+flora_catalog = FloraCatalog()
@@ -3,7 +3,6 @@ Utilidades para Google Maps Plus Code usando la biblioteca oficial openlocationc
 Convierte Plus Codes a coordenadas lat/lng de forma confiable
 """
 import logging
-from openlocationcode import openlocationcode
 
 # Configurar logging
 logging.basicConfig(
@@ -58,6 +57,7 @@ def process_ubicacion_data(data):
         plus_code_match = re.search(r'([A-Z0-9]{4,}\+[A-Z0-9]{2,})', str(plus_code).upper())
         
         if plus_code_match:
+            from openlocationcode import openlocationcode  # import diferido
             clean_plus_code = plus_code_match.group(1)
             logger.info(f"Plus Code extraído: '{clean_plus_code}'")
 
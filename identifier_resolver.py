@@ -0,0 +1,145 @@
+"""
+Resolución de identificadores de usuario en una sola pasada para MeliAPP.
+
+Este módulo contiene:
+- Resolution: resultado de una resolución, con tiempos por paso
+- IdentifierResolver: clasifica la entrada una vez (UUID completo, segmento de
+  8 caracteres del QR, username o nombre libre) y ejecuta solo la búsqueda que
+  corresponde
+- resolver: instancia global
+
+Reemplaza la cascada de /buscar (nombre exacto, prefijo, identificador,
+parcial, username), que en el peor caso hacía unas ocho consultas.
+"""
+
+import logging
+import re
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from supabase_client import db
+from searcher import Searcher
+from name_index import name_index
+
+logger = logging.getLogger(__name__)
+
+_UUID_RE = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.IGNORECASE)
+_SEGMENT_RE = re.compile(r'^[0-9a-f]{8}$', re.IGNORECASE)
+_USERNAME_RE = re.compile(r'^[\w.\-]{3,}$')
+
+
+@dataclass
+class Resolution:
+    """Resultado de resolver un identificador."""
+    query: str
+    kind: str  # 'uuid' | 'segment' | 'username' | 'name' | 'empty'
+    user_id: Optional[str] = None  # usuario único resuelto, si lo hay
+    candidates: List[Dict[str, Any]] = field(default_factory=list)  # coincidencias por nombre ordenadas
+    timings: Dict[str, float] = field(default_factory=dict)  # paso -> ms
+
+    def server_timing(self) -> str:
+        """Valor del header Server-Timing con la duración de cada paso."""
+        return ', '.join(f'{step};dur={ms}' for step, ms in self.timings.items())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'query': self.query,
+            'kind': self.kind,
+            'user_id': self.user_id,
+            'candidates': self.candidates,
+            'timings_ms': self.timings
+        }
+
+
+class IdentifierResolver:
+    """Clasifica un identificador y ejecuta la única búsqueda que le corresponde."""
+
+    def __init__(self, searcher: Searcher):
+        self.searcher = searcher
+
+    @staticmethod
+    def classify(query: str) -> str:
+        """Tipo de identificador: 'uuid', 'segment', 'username', 'name' o 'empty'."""
+        if not query:
+            return 'empty'
+        if _UUID_RE.match(query):
+            return 'uuid'
+        if _SEGMENT_RE.match(query):
+            return 'segment'
+        if _USERNAME_RE.match(query):
+            return 'username'
+        return 'name'
+
+    @contextmanager
+    def timed(self, resolution: Resolution, name: str):
+        """Mide un paso y lo agrega a los tiempos de `resolution` (también para pasos del llamador)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            resolution.timings[name] = round((time.perf_counter() - started) * 1000, 2)
+
+    def resolve(self, query: str, limit: int = 20) -> Resolution:
+        """
+        Resuelve un identificador de usuario.
+
+        - UUID completo: se usa tal cual (sin consultas)
+        - Segmento de 8 caracteres: consulta de rango indexada sobre auth_user_id
+        - Username / nombre: búsqueda en el índice de trigramas en memoria; un
+          username que no está en el índice se confirma con una consulta
+
+        Un segmento o username sin resultado sigue como nombre libre, así que el
+        peor caso son dos pasos.
+
+        Args:
+            query: Texto ingresado o identificador de la URL
+            limit: Máximo de candidatos por nombre
+
+        Returns:
+            Resolution: Tipo, usuario resuelto (si es único), candidatos y tiempos
+        """
+        query = (query or '').strip()
+        resolution = Resolution(query=query, kind='empty')
+
+        with self.timed(resolution, 'classify'):
+            resolution.kind = self.classify(query)
+
+        if resolution.kind == 'empty':
+            return resolution
+
+        if resolution.kind == 'uuid':
+            resolution.user_id = query.lower()
+            return resolution
+
+        if resolution.kind == 'segment':
+            with self.timed(resolution, 'segment'):
+                user = self.searcher.resolve_uuid_prefix(query, 'auth_user_id')
+            if user:
+                resolution.user_id = user['auth_user_id']
+                return resolution
+
+        with self.timed(resolution, 'names'):
+            resolution.candidates = name_index.lookup(query, limit=limit)
+
+        if resolution.kind == 'username':
+            match = next((c for c in resolution.candidates
+                          if (c.get('username') or '').lower() == query.lower()), None)
+            if match is None and not resolution.candidates:
+                # El índice puede no tener aún un usuario recién creado en otra instancia
+                with self.timed(resolution, 'username'):
+                    rows = db.table('usuarios').select('auth_user_id').eq('username', query).limit(1).execute().data
+                match = rows[0] if rows else None
+            if match:
+                resolution.user_id = match['auth_user_id']
+                return resolution
+
+        exact = [c for c in resolution.candidates if c['exact']]
+        if len(exact) == 1:
+            resolution.user_id = exact[0]['auth_user_id']
+        return resolution
+
+
+# Instancia global
+resolver = IdentifierResolver(Searcher(db))
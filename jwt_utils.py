@@ -0,0 +1,213 @@
+"""
+Utilidades para leer tokens JWT de Supabase.
+
+Este módulo contiene:
+- Decodificación de claims sin verificación (para metadatos como `exp`)
+- Verificación local de firma: HS256 con SUPABASE_JWT_SECRET o JWKS cacheado (PyJWT)
+- Helpers de expiración y hash de tokens para usarlos como claves de cache
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+try:
+    import jwt as pyjwt  # PyJWT, opcional: solo necesario para tokens firmados con clave asimétrica
+except ImportError:
+    pyjwt = None
+
+logger = logging.getLogger(__name__)
+
+
+def _b64url_decode(segment: str) -> bytes:
+    """Decodifica un segmento base64url sin padding."""
+    padding = '=' * (-len(segment) % 4)
+    return base64.urlsafe_b64decode(segment + padding)
+
+
+def decode_jwt_claims(token: str) -> dict:
+    """
+    Decodifica el payload de un JWT SIN verificar la firma.
+
+    Solo debe usarse para metadatos (expiración, claves de cache); nunca
+    para decisiones de autorización.
+
+    Returns:
+        dict: Claims del token, o {} si el token no es un JWT válido
+    """
+    if not token or not isinstance(token, str):
+        return {}
+    try:
+        parts = token.split('.')
+        if len(parts) != 3:
+            return {}
+        claims = json.loads(_b64url_decode(parts[1]))
+        return claims if isinstance(claims, dict) else {}
+    except (ValueError, TypeError) as e:
+        logger.warning(f"No se pudo decodificar el JWT: {e}")
+        return {}
+
+
+def _decode_header(token: str) -> dict:
+    """Decodifica el header de un JWT sin verificar."""
+    try:
+        header = json.loads(_b64url_decode(token.split('.')[0]))
+        return header if isinstance(header, dict) else {}
+    except (ValueError, TypeError, IndexError):
+        return {}
+
+
+_jwks_client = None
+_jwks_lock = threading.Lock()
+
+
+def _get_jwks_client():
+    """Cliente JWKS de PyJWT para el proyecto Supabase (cachea las claves públicas)."""
+    global _jwks_client
+    if pyjwt is None:
+        return None
+    if _jwks_client is None:
+        with _jwks_lock:
+            if _jwks_client is None:
+                supabase_url = os.getenv('SUPABASE_URL', '').rstrip('/')
+                if not supabase_url:
+                    return None
+                _jwks_client = pyjwt.PyJWKClient(
+                    f"{supabase_url}/auth/v1/.well-known/jwks.json",
+                    cache_keys=True,
+                    lifespan=int(os.getenv('SUPABASE_JWKS_CACHE_SECONDS', 3600))
+                )
+    return _jwks_client
+
+
+def prefetch_jwks() -> int:
+    """
+    Descarga el JWKS del proyecto al cache de PyJWT (para el warmup).
+
+    Returns:
+        int: Número de claves cargadas (0 si no hay PyJWT o no se configuró JWKS)
+    """
+    jwks_client = _get_jwks_client()
+    if jwks_client is None:
+        return 0
+    return len(jwks_client.get_signing_keys())
+
+
+# Algoritmos de clave asimétrica que se verifican con el JWKS del proyecto
+ASYMMETRIC_ALGS = ('RS256', 'ES256')
+
+# (hay claves en el JWKS, momento de la consulta): evita ir a la red en cada request
+_jwks_status = None
+
+
+def has_jwks_keys() -> bool:
+    """
+    Indica si el JWKS del proyecto tiene claves de firma (proyectos con claves asimétricas).
+
+    El resultado, positivo o negativo, se recuerda SUPABASE_JWKS_CACHE_SECONDS;
+    un proyecto que solo usa HS256 publica un JWKS vacío.
+    """
+    global _jwks_status
+    if _jwks_status is not None and time.time() - _jwks_status[1] < int(os.getenv('SUPABASE_JWKS_CACHE_SECONDS', 3600)):
+        return _jwks_status[0]
+    try:
+        available = prefetch_jwks() > 0
+    except Exception as e:
+        logger.info(f"JWKS sin claves de firma o no disponible: {e}")
+        available = False
+    _jwks_status = (available, time.time())
+    return available
+
+
+def can_verify_locally(token: Optional[str] = None) -> bool:
+    """
+    Indica si hay con qué verificar localmente la firma de `token`, según su `alg`.
+
+    HS256 necesita SUPABASE_JWT_SECRET; RS256/ES256 necesitan PyJWT y un JWKS
+    con claves. Sin token, indica si hay alguna de las dos formas disponibles.
+    """
+    secret = bool(os.getenv('SUPABASE_JWT_SECRET'))
+    if token is None:
+        return secret or (pyjwt is not None and has_jwks_keys())
+    alg = _decode_header(token).get('alg')
+    if alg == 'HS256':
+        return secret
+    if alg in ASYMMETRIC_ALGS:
+        return pyjwt is not None and has_jwks_keys()
+    return False
+
+
+def verify_jwt(token: str, leeway: float = 0) -> Optional[dict]:
+    """
+    Verifica la firma y la expiración de un access token de Supabase sin ir a la red.
+
+    Los tokens HS256 se verifican con SUPABASE_JWT_SECRET; los firmados con
+    clave asimétrica (RS256/ES256) con el JWKS del proyecto vía PyJWT, que
+    mantiene las claves en cache.
+
+    Args:
+        token: Access token
+        leeway: Segundos de tolerancia para `exp`
+
+    Returns:
+        dict: Claims verificados, o None si el token es inválido, expiró o no se puede verificar
+    """
+    if not token or not isinstance(token, str) or token.count('.') != 2:
+        return None
+
+    alg = _decode_header(token).get('alg')
+    try:
+        if alg == 'HS256':
+            secret = os.getenv('SUPABASE_JWT_SECRET')
+            if not secret:
+                return None
+            signing_input, signature = token.rsplit('.', 1)
+            expected = hmac.new(secret.encode('utf-8'), signing_input.encode('ascii'), hashlib.sha256).digest()
+            if not hmac.compare_digest(expected, _b64url_decode(signature)):
+                logger.warning("Firma JWT inválida")
+                return None
+            claims = decode_jwt_claims(token)
+        elif alg in ASYMMETRIC_ALGS:
+            jwks_client = _get_jwks_client()
+            if jwks_client is None:
+                return None
+            signing_key = jwks_client.get_signing_key_from_jwt(token)
+            claims = pyjwt.decode(token, signing_key.key, algorithms=[alg],
+                                  options={'verify_aud': False, 'verify_exp': False})
+        else:
+            logger.warning(f"Algoritmo JWT no soportado: {alg}")
+            return None
+    except Exception as e:
+        logger.warning(f"No se pudo verificar el JWT: {e}")
+        return None
+
+    exp = claims.get('exp')
+    if exp is not None and float(exp) + leeway <= time.time():
+        return None
+    return claims
+
+
+def get_token_expiry(token: str) -> Optional[float]:
+    """Devuelve el claim `exp` del token como timestamp, o None si no existe."""
+    exp = decode_jwt_claims(token).get('exp')
+    try:
+        return float(exp) if exp is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def is_token_expired(token: str, leeway: float = 0) -> bool:
+    """Indica si el token expira dentro de `leeway` segundos (o ya expiró)."""
+    expiry = get_token_expiry(token)
+    return expiry is not None and expiry - leeway <= time.time()
+
+
+def token_fingerprint(token: str) -> str:
+    """Hash SHA-256 del token, para usarlo como clave sin guardar el token en claro."""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
@@ -10,7 +10,7 @@ from typing import Dict, List, Any, Optional
 from supabase_client import SupabaseClient
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask import session
-from modify_DB import DatabaseModifier, db_modifier
+from modify_DB import DatabaseModifier, db_modifier, notify_write
 
 logger = logging.getLogger(__name__)
 
@@ -217,6 +217,7 @@ class LotesManager:
                 .eq('id', lote_id) \
                 .eq('auth_user_id', usuario_id) \
                 .execute()
+            notify_write('origenes_botanicos', 'update', usuario_id)
             
             if hasattr(resultado, 'error') and resultado.error:
                 logger.error(f"Error en la actualización: {resultado.error}")
@@ -299,29 +300,16 @@ class LotesManager:
                     'comuna': None
                 }
             
-            # 2. Obtener especies del CSV usando botanical_chart
-            from botanical_chart import read_botanical_classes
+            # 2. Obtener especies del catálogo de flora en memoria
+            from flora_catalog import flora_catalog
             
             try:
-                classes_data = read_botanical_classes()
-                logger.info(f" Datos CSV cargados: {len(classes_data)} comunas disponibles")
-                
-                if comuna in classes_data:
-                    # Extraer todas las especies de todas las clases para esta comuna
-                    especies = []
-                    for clase, especies_clase in classes_data[comuna].items():
-                        especies.extend(especies_clase)
-                    
-                    # Remover duplicados manteniendo orden
-                    especies = list(dict.fromkeys(especies))
-                    logger.info(f" Especies del CSV para {comuna}: {especies}")
-                    
-                else:
-                    logger.warning(f" Comuna {comuna} no encontrada en CSV")
-                    especies = []
+                especies = flora_catalog.nombres_por_comuna(comuna)
+                if not especies:
+                    logger.warning(f" Comuna {comuna} no encontrada en el catálogo de flora")
                     
             except Exception as csv_error:
-                logger.error(f" Error al cargar CSV: {csv_error}")
+                logger.error(f" Error al cargar el catálogo de flora: {csv_error}")
                 especies = []
             logger.info(f" Especies encontradas para {comuna}: {especies}")
             logger.info(f" Total especies disponibles: {len(especies)}")
@@ -401,4 +389,4 @@ class LotesManager:
 
 # Instancia global
 from supabase_client import db
-lotes_manager = LotesManager(db.client)
+lotes_manager = LotesManager(db)
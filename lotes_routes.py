@@ -11,12 +11,12 @@ import logging
 import json
 from flask import Blueprint, request, jsonify, render_template, session, flash, redirect, url_for, g, send_file
 from io import BytesIO
-import segno
 from qr_code.generator import generate_qr_code
 from supabase_client import SupabaseClient
 from auth_manager import AuthManager
 from lotes_manager import lotes_manager
 from modify_DB import DatabaseModifier
+from singleflight import lote_flights
 from datetime import datetime
 
 db_client = SupabaseClient()
@@ -25,26 +25,6 @@ logger = logging.getLogger(__name__)
 # Cache simple para composiciones de lotes
 _composition_cache = {}
 
-# Cliente autenticado singleton para evitar múltiples autenticaciones
-_authenticated_client = None
-
-def get_singleton_authenticated_client():
-    """Obtiene un cliente autenticado singleton para evitar múltiples autenticaciones."""
-    global _authenticated_client
-    
-    if _authenticated_client is None:
-        logger.info("🔐 Creando cliente autenticado singleton")
-        db_modifier_instance = DatabaseModifier()
-        _authenticated_client = db_modifier_instance.get_authenticated_client()
-        
-        if not _authenticated_client:
-            logger.error("❌ No se pudo crear cliente autenticado singleton")
-            return None
-        
-        logger.info("✅ Cliente autenticado singleton creado exitosamente")
-    
-    return _authenticated_client
-
 # Crear blueprints para rutas de lotes
 lotes_api_bp = Blueprint('lotes_api', __name__, url_prefix='/api')
 lotes_web_bp = Blueprint('lotes_web', __name__)
@@ -115,13 +95,17 @@ def obtener_composicion_lote(lote_id):
                 'composicion': _composition_cache[lote_id]
             })
         
-        # Usar cliente normal para hacer la composición pública (sin autenticación requerida)
+        # Usar cliente normal para hacer la composición pública (sin autenticación requerida);
+        # los escaneos simultáneos del mismo lote comparten una sola consulta
         try:
-            response = db_client.client.table('origenes_botanicos').select('composicion').eq('id', lote_id).execute()
+            response = lote_flights.do(
+                ('composicion', lote_id),
+                lambda: db_client.client.table('origenes_botanicos').select('composicion').eq('id', lote_id).execute()
+            )
         except Exception as e:
             # Si falla con cliente normal, intentar con cliente autenticado como fallback
             logger.warning(f"Fallback a cliente autenticado para lote {lote_id}: {str(e)}")
-            auth_client = get_singleton_authenticated_client()
+            auth_client = AuthManager.get_authenticated_client()
             
             if not auth_client:
                 logger.error("No se pudo obtener cliente autenticado para obtener composición")
@@ -343,7 +327,7 @@ def generar_qr_lote(lote_id):
             return jsonify({'success': False, 'error': 'Usuario no autenticado.'}), 401
             
         # Usar cliente autenticado para respetar RLS
-        auth_client = get_singleton_authenticated_client()
+        auth_client = AuthManager.get_authenticated_client()
         if not auth_client:
             return jsonify({'success': False, 'error': 'Error de autenticación.'}), 401
             
@@ -369,6 +353,7 @@ def generar_qr_lote(lote_id):
         logger.info(f"Generating QR code for Lote ID: {lote_id} with URL: {lote_url}")
         
         # Generar el QR code usando la función del módulo
+        import segno  # import diferido: solo se carga al generar un QR
         qr_code_img = segno.make(lote_url, error='m')
         
         # Servir la imagen directamente para máxima calidad
@@ -400,9 +385,12 @@ def handle_lote_click(lote_id):
         data = request.get_json() or {}
         logger.info(f"🖱️ Click en lote: {lote_id}")
         
-        # Obtener información del lote
+        # Obtener información del lote (clicks simultáneos comparten la consulta)
         try:
-            response = db_client.client.table('origenes_botanicos').select('*').eq('id', lote_id).execute()
+            response = lote_flights.do(
+                ('lote', lote_id),
+                lambda: db_client.client.table('origenes_botanicos').select('*').eq('id', lote_id).execute()
+            )
             if not response.data or len(response.data) == 0:
                 return jsonify({
                     'success': False,
@@ -412,7 +400,7 @@ def handle_lote_click(lote_id):
             lote = response.data[0]
         except Exception as e:
             # Fallback con cliente autenticado
-            auth_client = get_singleton_authenticated_client()
+            auth_client = AuthManager.get_authenticated_client()
             if not auth_client:
                 return jsonify({
                     'success': False,
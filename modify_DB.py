@@ -4,14 +4,54 @@ Permite actualizar cualquier tabla/campo desde formularios JSON con manejo de RL
 """
 
 import logging
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, Optional, Tuple, Callable, List
 import json
 from datetime import datetime
 from gmaps_utils import process_ubicacion_data
 from auth_manager import AuthManager
+from query_memo import memoized_select, invalidate_table
+from search_cache import invalidate_search_results
 
 logger = logging.getLogger(__name__)
 
+# Funciones notificadas tras cada escritura: listener(table, action, auth_user_id)
+_write_listeners: List[Callable[[str, str, Optional[str]], None]] = []
+
+
+def register_write_listener(listener: Callable[[str, str, Optional[str]], None]):
+    """
+    Registra una función que se llama después de cada escritura.
+    
+    Permite que caches e índices en memoria se actualicen de forma incremental.
+    Se puede usar como decorador.
+    
+    Args:
+        listener: Función (table, action, auth_user_id); action es 'insert', 'update' o 'delete'
+    """
+    if listener not in _write_listeners:
+        _write_listeners.append(listener)
+    return listener
+
+
+def notify_write(table: str, action: str, auth_user_id: Optional[str] = None):
+    """
+    Avisa que `table` fue modificada para el usuario `auth_user_id`.
+    
+    Invalida el memo del request y llama a los listeners registrados; un
+    listener que falla no afecta a la escritura ni al resto.
+    """
+    invalidate_table(table)
+    for listener in list(_write_listeners):
+        try:
+            listener(table, action, auth_user_id)
+        except Exception as e:
+            logger.warning(f"Listener de escritura {getattr(listener, '__name__', listener)} falló: {e}")
+
+
+# Los resultados de búsqueda cacheados que incluyen al usuario escrito quedan obsoletos
+register_write_listener(invalidate_search_results)
+
+
 class DatabaseModifier:
     """Clase principal para manejar todas las operaciones de escritura en la base de datos"""
     
@@ -23,8 +63,8 @@ class DatabaseModifier:
         """Obtener el auth_user_id correspondiente al user_uuid"""
         try:
             # En el nuevo schema, user_uuid ES el auth_user_id
-            user_info = auth_client.table('usuarios').select('auth_user_id').eq('auth_user_id', user_uuid).single().execute()
-            return user_info.data['auth_user_id'] if user_info.data else None
+            user_rows = memoized_select(auth_client, 'usuarios', 'auth_user_id', {'auth_user_id': user_uuid})
+            return user_rows[0]['auth_user_id'] if user_rows else None
         except Exception as e:
             logger.error(f"Error obteniendo auth_user_id: {e}")
             return None
@@ -103,9 +143,9 @@ class DatabaseModifier:
                     ref_field = 'auth_user_id'
                 else:
                     ref_field = 'auth_user_id'
-                current_data = auth_client.table(table).select('*').eq(ref_field, user_uuid).execute()
-                if current_data.data:
-                    current_record = current_data.data[0]
+                current_rows = memoized_select(auth_client, table, '*', {ref_field: user_uuid})
+                if current_rows:
+                    current_record = current_rows[0]
                 
                 for field, value in data.items():
                     if field in field_mappings:
@@ -138,7 +178,7 @@ class DatabaseModifier:
                     return {
                         "success": True,
                         "message": "No se realizaron cambios - los campos vacíos no sobrescriben datos existentes",
-                        "data": current_data.data
+                        "data": current_rows
                     }, 200
                 
             else:
@@ -174,8 +214,8 @@ class DatabaseModifier:
                     
                     # Obtener el registro actual usando auth_user_id
                     ref_field = 'auth_user_id'
-                    current_data = auth_client.table(table).select('*').eq(ref_field, user_uuid).execute()
-                    logger.info(f"Datos actuales: {json.dumps(current_data.data, ensure_ascii=False)}")
+                    current_rows = memoized_select(auth_client, table, '*', {ref_field: user_uuid})
+                    logger.info(f"Datos actuales: {json.dumps(current_rows, ensure_ascii=False)}")
                     
                     # Mapeo de campos por tabla
                     field_mapping = {
@@ -205,7 +245,7 @@ class DatabaseModifier:
                         }
                     }
                     
-                    if not current_data.data or len(current_data.data) == 0:
+                    if not current_rows:
                         logger.warning("Registro NO existe - CREANDO")
                         create_data = {
                             'auth_user_id': user_uuid,
@@ -216,6 +256,7 @@ class DatabaseModifier:
                         create_data.update(update_data)
                         
                         insert_result = auth_client.table(table).insert(create_data).execute()
+                        notify_write(table, 'insert', user_uuid)
                         logger.info(f"Insert resultado: {json.dumps(insert_result.data, ensure_ascii=False)}")
                         
                         updated_data = auth_client.table(table).select('*').eq(ref_field, ref_value).single().execute()
@@ -230,6 +271,7 @@ class DatabaseModifier:
                         
                         # Ejecutar update con usuario autenticado
                         update_result = auth_client.table(table).update(update_data).eq(ref_field, ref_value).execute()
+                        notify_write(table, 'update', user_uuid)
                         
                         # Manejar respuesta vacía o lista
                         if hasattr(update_result, 'data') and update_result.data:
@@ -247,7 +289,7 @@ class DatabaseModifier:
                             return {"success": False, "error": "Error al recuperar datos actualizados"}, 500
                         
                         # Validar que cambió
-                        if updated_data.data and updated_data.data[0] != current_data.data[0]:
+                        if updated_data.data and updated_data.data[0] != current_rows[0]:
                             logger.info("✅ CAMBIOS APLICADOS CORRECTAMENTE")
                         else:
                             logger.error("❌ NO HUBO CAMBIOS - VERIFICAR RLS POLICY")
@@ -260,6 +302,7 @@ class DatabaseModifier:
                 
                 else:
                     auth_client.table(table).update(update_data).eq(ref_field, ref_value).execute()
+                    notify_write(table, 'update', user_uuid)
                     updated_data = auth_client.table(table).select('*').eq(ref_field, ref_value).single().execute()
                 
                 logger.info(f"=== DEBUG FIN {table} ===")
@@ -306,6 +349,7 @@ class DatabaseModifier:
 
             logger.info(f"Insertando en {table}: {json.dumps(data, ensure_ascii=False)}")
             insert_result = auth_client.table(table).insert(data).execute()
+            notify_write(table, 'insert', data['auth_user_id'])
 
             # Manejo de errores de la API de Supabase
             if hasattr(insert_result, 'error') and insert_result.error:
@@ -334,9 +378,7 @@ class DatabaseModifier:
                 return []
             
             ref_field = 'auth_user_id' if table != 'usuarios' else 'auth_user_id'
-            response = auth_client.table(table).select(select_fields).eq(ref_field, user_uuid).execute()
-            
-            return response.data if response.data else []
+            return memoized_select(auth_client, table, select_fields, {ref_field: user_uuid})
             
         except Exception as e:
             logger.error(f"Error obteniendo registros de {table}: {e}")
@@ -350,9 +392,9 @@ class DatabaseModifier:
                 return None
             
             ref_field = 'auth_user_id' if table != 'usuarios' else 'auth_user_id'
-            response = auth_client.table(table).select(select_fields).eq(ref_field, user_uuid).execute()
+            rows = memoized_select(auth_client, table, select_fields, {ref_field: user_uuid})
             
-            return response.data[0] if response.data else None
+            return rows[0] if rows else None
             
         except Exception as e:
             logger.error(f"Error obteniendo registro de {table}: {e}")
@@ -412,6 +454,7 @@ class DatabaseModifier:
                 
                 delete_result = query.execute()
             
+            notify_write(table, 'delete', user_uuid)
             logger.info(f"Resultado de eliminación: {delete_result.data if hasattr(delete_result, 'data') else 'Sin datos'}")
             
             if hasattr(delete_result, 'error') and delete_result.error:
@@ -466,7 +509,18 @@ def update_user_data(data, user_uuid):
         'empresa': {'max_length': 100}
     }
     
-    return db_modifier.update_record('usuarios', filtered_data, user_uuid, field_mappings, validation_rules)
+    result, status_code = db_modifier.update_record('usuarios', filtered_data, user_uuid, field_mappings, validation_rules)
+    
+    # Refrescar username/role cacheados en la sesión si este usuario los modificó
+    if result.get('success') and isinstance(result.get('data'), dict) \
+            and str(user_uuid) == str(AuthManager.get_current_user_id()):
+        AuthManager.cache_user_info(result['data'])
+    
+    # Un username nuevo puede coincidir con búsquedas ya cacheadas
+    if result.get('success') and filtered_data.get('username'):
+        invalidate_search_results('usuarios', 'update', user_uuid, names=[filtered_data['username']])
+    
+    return result, status_code
 
 def update_user_contact(data, user_uuid):
     """Actualizar información de contacto del usuario"""
@@ -491,4 +545,11 @@ def update_user_contact(data, user_uuid):
         'sitio_web': {'max_length': 255}
     }
     
-    return db_modifier.update_record('info_contacto', data, user_uuid, field_mappings, validation_rules)
+    result, status_code = db_modifier.update_record('info_contacto', data, user_uuid, field_mappings, validation_rules)
+    
+    # Un nombre nuevo puede coincidir con búsquedas ya cacheadas
+    names = [data.get('nombre_completo'), data.get('nombre_empresa')]
+    if result.get('success') and any(names):
+        invalidate_search_results('info_contacto', 'update', user_uuid, names=names)
+    
+    return result, status_code
@@ -0,0 +1,225 @@
+"""
+Índice de nombres por trigramas para búsquedas tolerantes a errores de MeliAPP.
+
+Este módulo contiene:
+- trigrams / similarity: trigramas al estilo pg_trgm sobre texto sin acentos
+- NameIndex: índice invertido de trigramas sobre info_contacto.nombre_completo,
+  info_contacto.nombre_empresa y usuarios.username
+- name_index: instancia global, construida por el warmup/cron y actualizada
+  con los listeners de escritura (mientras no está lista se usa `ilike`)
+
+Un nombre mal escrito en el teléfono ("jose peres") o sin tildes encuentra
+igual a "José Pérez", con un puntaje de similitud en una sola búsqueda.
+"""
+
+import logging
+import time
+from collections import defaultdict
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from search_index import InMemoryIndex, fetch_rows, fetch_tables, index_executor, search_rows, tokenize
+from modify_DB import register_write_listener
+from warmup import register_warmup_step
+
+logger = logging.getLogger(__name__)
+
+# Campos indexados por tabla
+NAME_FIELDS = {
+    'info_contacto': ('nombre_completo', 'nombre_empresa'),
+    'usuarios': ('username',),
+}
+
+# Puntaje mínimo para considerar una coincidencia
+MIN_SIMILARITY = 0.3
+
+
+def trigrams(text: Any) -> FrozenSet[str]:
+    """
+    Trigramas de un texto, como pg_trgm: cada palabra se rellena con dos
+    espacios al inicio y uno al final ('miel' -> '  m', ' mi', 'mie', 'iel', 'el ').
+    """
+    grams = set()
+    for word in tokenize(text):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def similarity(query_grams: FrozenSet[str], name_grams: FrozenSet[str]) -> float:
+    """
+    Similitud entre una consulta y un nombre.
+
+    Es el máximo entre la similitud de pg_trgm (trigramas compartidos sobre la
+    unión) y la cobertura de la consulta dentro del nombre, algo penalizada,
+    para que "jose" encuentre "José Pérez González" aunque el nombre sea largo.
+    """
+    if not query_grams or not name_grams:
+        return 0.0
+    shared = len(query_grams & name_grams)
+    jaccard = shared / (len(query_grams) + len(name_grams) - shared)
+    coverage = shared / len(query_grams)
+    return max(jaccard, 0.9 * coverage)
+
+
+class NameIndex(InMemoryIndex):
+    """Índice invertido trigrama -> nombres, agrupado por usuario."""
+
+    name = 'índice de nombres'
+
+    def __init__(self):
+        super().__init__()
+        self._reset()
+
+    def _reset(self):
+        self._postings: Dict[str, set] = defaultdict(set)  # trigrama -> {(auth_user_id, campo)}
+        self._names: Dict[Tuple[str, str], Tuple[str, FrozenSet[str]]] = {}  # (usuario, campo) -> (valor, trigramas)
+        self._users: Dict[str, Dict[str, Any]] = defaultdict(dict)  # usuario -> {campo: valor}
+
+    def _set_name(self, auth_user_id: str, field: str, value: Any):
+        """Indexa (o reemplaza) un nombre de un usuario. Debe llamarse con el lock tomado."""
+        key = (auth_user_id, field)
+        previous = self._names.pop(key, None)
+        if previous:
+            for gram in previous[1]:
+                self._postings[gram].discard(key)
+        self._users[auth_user_id].pop(field, None)
+
+        grams = trigrams(value)
+        if not grams:
+            return
+        self._names[key] = (value, grams)
+        self._users[auth_user_id][field] = value
+        for gram in grams:
+            self._postings[gram].add(key)
+
+    def _index_rows(self, table: str, rows: List[Dict[str, Any]]):
+        for row in rows:
+            auth_user_id = row.get('auth_user_id')
+            if auth_user_id:
+                for field in NAME_FIELDS[table]:
+                    self._set_name(str(auth_user_id), field, row.get(field))
+
+    def _build(self):
+        """Lee los nombres de usuarios e info_contacto y reemplaza el índice."""
+        rows = fetch_tables({table: (table, ','.join(('auth_user_id',) + fields))
+                             for table, fields in NAME_FIELDS.items()})
+        with self._lock:
+            self._reset()
+            for table, table_rows in rows.items():
+                self._index_rows(table, table_rows)
+            self.built_at = time.time()
+        logger.info(f"Índice de nombres construido: {len(self._names)} nombres, {len(self._users)} usuarios")
+
+    def refresh_user(self, table: str, auth_user_id: str):
+        """Reindexa los nombres de un usuario tras una escritura en `table`."""
+        if self.built_at is None or table not in NAME_FIELDS:
+            return
+        try:
+            rows = fetch_rows(table, ','.join(('auth_user_id',) + NAME_FIELDS[table]), auth_user_id=auth_user_id)
+        except Exception as e:
+            logger.warning(f"No se pudo reindexar nombres de {auth_user_id}: {e}")
+            return
+        with self._lock:
+            if not rows:
+                for field in NAME_FIELDS[table]:
+                    self._set_name(str(auth_user_id), field, None)
+            self._index_rows(table, rows)
+
+    def lookup(self, query: str, limit: int = 10, min_score: float = MIN_SIMILARITY) -> List[Dict[str, Any]]:
+        """
+        Busca usuarios por nombre completo, empresa o username.
+
+        Args:
+            query: Nombre tal como lo escribió el usuario (con o sin tildes, con errores)
+            limit: Número máximo de usuarios
+            min_score: Similitud mínima (0-1)
+
+        Returns:
+            list: Un dict por usuario, del más al menos similar, con
+                  auth_user_id, nombre_completo, nombre_empresa, username,
+                  score, matched_field y exact (nombre idéntico sin tildes)
+        """
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+        if not self.ready():
+            return self._fallback_lookup(query, query_grams, limit, min_score)
+        folded_query = ' '.join(tokenize(query))
+
+        with self._lock:
+            candidates = set()
+            for gram in query_grams:
+                candidates |= self._postings.get(gram, set())
+
+            best: Dict[str, Tuple[float, str]] = {}
+            for key in candidates:
+                auth_user_id, field = key
+                score = similarity(query_grams, self._names[key][1])
+                if score >= min_score and score > best.get(auth_user_id, (0.0, ''))[0]:
+                    best[auth_user_id] = (score, field)
+
+            ranked = sorted(best.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+            return [self._result(auth_user_id, self._users.get(auth_user_id, {}), score, field, folded_query)
+                    for auth_user_id, (score, field) in ranked]
+
+    @staticmethod
+    def _result(auth_user_id: str, names: Dict[str, Any], score: float, field: str,
+                folded_query: str) -> Dict[str, Any]:
+        return {
+            'auth_user_id': auth_user_id,
+            'nombre_completo': names.get('nombre_completo'),
+            'nombre_empresa': names.get('nombre_empresa'),
+            'username': names.get('username'),
+            'score': round(score, 3),
+            'matched_field': field,
+            'exact': ' '.join(tokenize(names.get(field))) == folded_query
+        }
+
+    def _fallback_lookup(self, query: str, query_grams: FrozenSet[str], limit: int,
+                         min_score: float) -> List[Dict[str, Any]]:
+        """
+        Respaldo mientras el índice no está construido: `ilike` por tabla y el
+        mismo puntaje de similitud (no tolera errores de tipeo).
+        """
+        term = ' '.join(query.split())
+        users: Dict[str, Dict[str, Any]] = defaultdict(dict)
+        for table, fields in NAME_FIELDS.items():
+            columns = ','.join(('auth_user_id',) + fields)
+            for row in search_rows(table, fields, term, columns, limit=limit):
+                if row.get('auth_user_id'):
+                    users[str(row['auth_user_id'])].update({field: row.get(field) for field in fields})
+
+        best: Dict[str, Tuple[float, str]] = {}
+        for auth_user_id, names in users.items():
+            for field, value in names.items():
+                score = similarity(query_grams, trigrams(value))
+                if score >= min_score and score > best.get(auth_user_id, (0.0, ''))[0]:
+                    best[auth_user_id] = (score, field)
+
+        folded_query = ' '.join(tokenize(query))
+        ranked = sorted(best.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+        return [self._result(auth_user_id, users[auth_user_id], score, field, folded_query)
+                for auth_user_id, (score, field) in ranked]
+
+    def stats(self) -> Dict[str, Any]:
+        """Tamaño del índice."""
+        with self._lock:
+            return {'names': len(self._names), 'users': len(self._users), 'trigrams': len(self._postings),
+                    'built_at': self.built_at}
+
+
+# Instancia global
+name_index = NameIndex()
+
+
+@register_write_listener
+def _refresh_name_index(table: str, action: str, auth_user_id: Optional[str]):
+    """Mantiene el índice de nombres al día tras escrituras (en segundo plano)."""
+    if auth_user_id and table in NAME_FIELDS:
+        index_executor.submit(name_index.refresh_user, table, auth_user_id)
+
+
+@register_warmup_step('name_index')
+def _warm_name_index(flask_app):
+    """Construye el índice de nombres si falta o está vencido (warmup y cron)."""
+    return {'built': name_index.build_if_stale(), **name_index.stats()}
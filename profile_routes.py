@@ -11,6 +11,7 @@ import logging
 from flask import Blueprint, render_template, url_for, redirect
 from supabase_client import db
 from searcher import Searcher
+from identifier_resolver import resolver
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +19,7 @@ logger = logging.getLogger(__name__)
 profile_bp = Blueprint('profile', __name__)
 
 # Inicializar componentes
-searcher = Searcher(db.client)
+searcher = Searcher(db)
 
 @profile_bp.route('/profile/<user_id>')
 def profile(user_id):
@@ -31,50 +32,36 @@ def profile(user_id):
     try:
         logger.info(f"[DEBUG /profile] Cargando perfil para user_id: {user_id}")
         
-        # Si user_id parece ser un UUID completo, usarlo directamente
-        if len(user_id) == 36 and user_id.count('-') == 4:
-            logger.info(f"[DEBUG /profile] Detectado UUID completo, usando directamente")
-            user_uuid = user_id
-            # Verificar que el usuario existe
-            user_response = db.client.table('usuarios').select('*').eq('auth_user_id', user_uuid).single().execute()
-            if not user_response.data:
-                logger.warning(f"[DEBUG /profile] Usuario no encontrado con UUID: {user_uuid}")
-                return render_template('pages/profile.html', error="Usuario no encontrado", user=None)
-            user_info = user_response.data
-        else:
-            # Usar función centralizada para buscar usuario por otros identificadores
+        # Si user_id no es un UUID completo, resolverlo y redirigir a la URL canónica
+        if not (len(user_id) == 36 and user_id.count('-') == 4):
             logger.info(f"[DEBUG /profile] Buscando usuario por identificador: {user_id}")
-            user_info = searcher.find_user_by_identifier(user_id)
+            resolution = resolver.resolve(user_id)
             
-            if not user_info:
+            if not resolution.user_id:
                 logger.warning(f"[DEBUG /profile] Usuario no encontrado con identificador: {user_id}")
                 return render_template('pages/profile.html', error="Usuario no encontrado", user=None)
-                
-            user_uuid = user_info['auth_user_id']
+            
+            user_uuid = resolution.user_id
+            logger.info(f"Redirigiendo de {user_id} a {user_uuid}")
+            return redirect(url_for('profile.profile', user_id=user_uuid))
         
+        user_uuid = user_id
         logger.info(f"[DEBUG /profile] Obteniendo datos completos para UUID: {user_uuid}")
         
-        # Obtener información completa del usuario usando función centralizada
-        profile_data = searcher.get_user_profile_data(user_uuid)
+        # Usuario y todas sus tablas hijas (RPC o select embebido, ver Searcher.load_profile)
+        profile = searcher.load_profile(user_uuid)
         
-        if not profile_data:
-            logger.warning(f"[DEBUG /profile] No se pudieron obtener datos de perfil para: {user_uuid}")
+        if not profile:
+            logger.warning(f"[DEBUG /profile] Usuario no encontrado con UUID: {user_uuid}")
             return render_template('pages/profile.html', error="Usuario no encontrado", user=None)
         
-        logger.info(f"[DEBUG /profile] Datos de perfil obtenidos exitosamente: {list(profile_data.keys())}")
-            
-        # Si el ID proporcionado no es el UUID completo, redirigir
-        if user_id != user_uuid:
-            logger.info(f"Redirigiendo de {user_id} a {user_uuid}")
-            return redirect(url_for('profile.profile', user_id=user_uuid))
-            
         # Preparar datos para la plantilla
-        user = profile_data['user']
-        contact_info = profile_data['contact_info'] or {}
-        locations = profile_data['locations']
-        producciones = profile_data['production']
-        origenes_botanicos = profile_data['botanical_origins']
-        solicitudes = profile_data['requests']
+        user = profile.user
+        contact_info = profile.contact_info or {}
+        locations = profile.locations
+        producciones = profile.production
+        origenes_botanicos = profile.botanical_origins
+        solicitudes = profile.requests
         
         # Crear objeto user para la plantilla
         user_obj = {
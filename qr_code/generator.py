@@ -1,7 +1,6 @@
 """
 Generador de códigos QR para usuarios/apicultores utilizando la biblioteca segno.
 """
-import segno
 import base64
 from io import BytesIO
 from flask import url_for, current_app
@@ -49,6 +48,7 @@ class QRGenerator:
         url = self._get_user_url(uuid_segment)
         
         # Generar el código QR con una sola línea de código
+        import segno  # import diferido: solo se carga al generar un QR
         qr = segno.make(url, error=error_level)
         return qr
     
@@ -90,6 +90,7 @@ def generate_qr_code(url, scale=5, border=2, error_level='m'):
         Objeto de QR de segno.
     """
     # Generar el código QR con la configuración especificada
+    import segno  # import diferido: solo se carga al generar un QR
     qr = segno.make(url, error=error_level)
     # Se devuelve el objeto QR para que el llamador decida el formato (PNG, SVG, etc.)
     return qr
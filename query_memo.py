@@ -0,0 +1,129 @@
+"""
+Memoización de consultas por request para MeliAPP.
+
+Este módulo contiene:
+- QueryMemo: identity map de lecturas `select ... where col = valor` por request
+- Helpers para obtener el memo del request actual (flask.g) e invalidarlo tras escrituras
+
+Dentro de un mismo request, lecturas idénticas (cliente, tabla, filtros, columnas)
+se sirven desde memoria. Una lectura de columnas concretas también se sirve desde
+una lectura previa con `*` de la misma tabla y filtros.
+"""
+
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+from flask import g, has_app_context
+from supabase_client import SupabaseClient
+
+logger = logging.getLogger(__name__)
+
+
+class QueryMemo:
+    """Memo de lecturas de un request. Se descarta al terminar el request."""
+
+    def __init__(self):
+        self._entries = {}  # (client_id, table, filtros, columnas) -> filas
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _client_key(client) -> int:
+        """Identidad del cliente; el singleton diferido `db` comparte entradas con `db.client`."""
+        if isinstance(client, SupabaseClient):
+            client = client.client
+        return id(client)
+
+    @staticmethod
+    def _normalize_columns(columns: str) -> str:
+        return ','.join(sorted(c.strip() for c in columns.split(','))) if columns != '*' else '*'
+
+    @staticmethod
+    def _project(rows: List[Dict[str, Any]], columns: str) -> List[Dict[str, Any]]:
+        """Proyecta filas completas a las columnas pedidas (siempre en diccionarios nuevos)."""
+        if columns == '*':
+            return [dict(row) for row in rows]
+        fields = columns.split(',')
+        return [{f: row.get(f) for f in fields} for row in rows]
+
+    def select(self, client, table: str, columns: str = '*', filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Ejecuta (o sirve desde memoria) un `select` con filtros de igualdad.
+
+        Args:
+            client: Cliente Supabase/PostgREST con el que se lee (la clave incluye su identidad por RLS)
+            table: Nombre de la tabla
+            columns: Columnas a seleccionar, como en `.select()`
+            filters: Diccionario {columna: valor} aplicado con `.eq()`
+
+        Returns:
+            list: Copia de las filas devueltas por la consulta; modificarla no
+                  altera lo memorizado
+        """
+        columns = self._normalize_columns(columns)
+        filter_key = tuple(sorted((k, str(v)) for k, v in (filters or {}).items()))
+        client_key = self._client_key(client)
+        key = (client_key, table, filter_key, columns)
+        full_key = (client_key, table, filter_key, '*')
+
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                return [dict(row) for row in self._entries[key]]
+            if full_key in self._entries:
+                self.hits += 1
+                return self._project(self._entries[full_key], columns)
+            self.misses += 1
+
+        query = client.table(table).select(columns)
+        for column, value in (filters or {}).items():
+            query = query.eq(column, value)
+        response = query.execute()
+        rows = response.data if response.data else []
+
+        with self._lock:
+            self._entries[key] = rows
+        return [dict(row) for row in rows]
+
+    def invalidate(self, table: str) -> None:
+        """Descarta todas las lecturas memorizadas de una tabla."""
+        with self._lock:
+            for key in [k for k in self._entries if k[1] == table]:
+                del self._entries[key]
+
+
+def get_request_memo() -> Optional[QueryMemo]:
+    """Devuelve el memo del request actual (lo crea si no existe) o None fuera de un request."""
+    if not has_app_context():
+        return None
+    memo = g.get('_query_memo')
+    if memo is None:
+        memo = QueryMemo()
+        g._query_memo = memo
+    return memo
+
+
+def memoized_select(client, table: str, columns: str = '*', filters: Optional[Dict[str, Any]] = None,
+                    memo: Optional[QueryMemo] = None) -> List[Dict[str, Any]]:
+    """
+    Lectura memorizada por request.
+
+    `memo` permite pasar explícitamente el memo del request a código que corre en
+    otros threads (por ejemplo el pool del Searcher), donde flask.g no está disponible.
+    """
+    memo = memo or get_request_memo()
+    if memo is None:
+        query = client.table(table).select(columns)
+        for column, value in (filters or {}).items():
+            query = query.eq(column, value)
+        response = query.execute()
+        return response.data if response.data else []
+    return memo.select(client, table, columns, filters)
+
+
+def invalidate_table(table: str) -> None:
+    """Invalida las lecturas memorizadas de una tabla tras una escritura en el request actual."""
+    memo = get_request_memo()
+    if memo is not None:
+        memo.invalidate(table)
@@ -0,0 +1,191 @@
+"""
+Catálogo en memoria de tablas y columnas de la base de datos de MeliAPP.
+
+Este módulo contiene:
+- SchemaCatalog: nombres de tablas y metadatos de columnas, leídos una vez
+  desde la raíz OpenAPI de PostgREST (una sola petición para todo el esquema)
+  y refrescados por TTL o a pedido
+- schema_catalog: instancia global usada por Searcher y data_tables
+
+Sin el catálogo, cada búsqueda global llamaba al RPC `get_all_tables` y las
+tablas sin campos conocidos se inspeccionaban con `select('*').limit(1)`.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from supabase_client import db, create_http_client
+from warmup import register_warmup_step
+
+logger = logging.getLogger(__name__)
+
+# Segundos tras los que el catálogo se vuelve a leer (cambios de esquema por migraciones)
+SCHEMA_CACHE_TTL = int(os.getenv('SCHEMA_CACHE_TTL', 3600))
+# Segundos antes de reintentar si la lectura del catálogo falló
+RETRY_SECONDS = 60
+
+# Tipos de Postgres sobre los que se puede usar `ilike`
+TEXT_TYPES = frozenset({'text', 'character varying', 'character', 'citext'})
+
+
+class SchemaCatalog:
+    """
+    Tablas y columnas del esquema público, cacheadas en memoria.
+
+    Cada columna es un dict con column_name, data_type (tipo de Postgres),
+    is_nullable y description, el mismo formato que information_schema.
+    Es seguro para uso concurrente.
+    """
+
+    def __init__(self, ttl: float = SCHEMA_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._loading = threading.Lock()
+        self._tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.loaded_at: Optional[float] = None
+        self.source: Optional[str] = None  # 'openapi' | 'rpc'
+
+    # ---- carga ----
+
+    @staticmethod
+    def _fetch_openapi() -> Dict[str, List[Dict[str, Any]]]:
+        """Lee todas las tablas y columnas desde la raíz OpenAPI de PostgREST."""
+        rest_url = f"{db.url.rstrip('/')}/rest/v1/"
+        headers = {'apikey': db.key, 'Authorization': f'Bearer {db.key}',
+                   'Accept': 'application/openapi+json'}
+        response = create_http_client().get(rest_url, headers=headers)
+        response.raise_for_status()
+
+        tables = {}
+        for table, definition in (response.json().get('definitions') or {}).items():
+            required = set(definition.get('required') or [])
+            tables[table] = [{
+                'column_name': column,
+                'data_type': spec.get('format') or spec.get('type'),
+                'is_nullable': column not in required,
+                'description': spec.get('description')
+            } for column, spec in (definition.get('properties') or {}).items()]
+        return tables
+
+    @staticmethod
+    def _fetch_table_names() -> Dict[str, List[Dict[str, Any]]]:
+        """Respaldo: solo los nombres de tablas, con el RPC `get_all_tables`."""
+        result = db.rpc('get_all_tables').execute()
+        return {row['table_name']: [] for row in (result.data or [])}
+
+    def _load(self) -> bool:
+        """Lee el catálogo (debe llamarse con `_loading` tomado)."""
+        started = time.perf_counter()
+        try:
+            tables, source = self._fetch_openapi(), 'openapi'
+        except Exception as e:
+            logger.warning(f"No se pudo leer el esquema OpenAPI, usando get_all_tables: {e}")
+            try:
+                tables, source = self._fetch_table_names(), 'rpc'
+            except Exception as rpc_error:
+                logger.error(f"No se pudo leer el catálogo de tablas: {rpc_error}")
+                # Se conserva el catálogo anterior y se reintenta pasados RETRY_SECONDS
+                with self._lock:
+                    self.loaded_at = time.time() - self.ttl + RETRY_SECONDS
+                return False
+
+        with self._lock:
+            self._tables = tables
+            self.source = source
+            self.loaded_at = time.time()
+        logger.info(f"Catálogo de esquema cargado ({source}): {len(tables)} tablas "
+                    f"en {(time.perf_counter() - started) * 1000:.0f} ms")
+        return True
+
+    def refresh(self) -> bool:
+        """
+        Vuelve a leer el catálogo (por ejemplo tras una migración).
+
+        Returns:
+            bool: True si se pudo leer; si falla se conserva el catálogo anterior
+        """
+        with self._loading:
+            return self._load()
+
+    def invalidate(self):
+        """Fuerza a releer el catálogo en el próximo uso."""
+        with self._lock:
+            self.loaded_at = None
+
+    def _ensure_loaded(self):
+        """Carga el catálogo si no existe; si está vencido lo refresca en segundo plano."""
+        if self.loaded_at is None:
+            with self._loading:
+                if self.loaded_at is None:
+                    self._load()
+        elif time.time() - self.loaded_at > self.ttl and self._loading.acquire(blocking=False):
+            # Mientras se refresca se sigue respondiendo con el catálogo actual
+            def reload():
+                try:
+                    self._load()
+                finally:
+                    self._loading.release()
+            threading.Thread(target=reload, name='SchemaCatalog-refresh', daemon=True).start()
+
+    # ---- consulta ----
+
+    def tables(self) -> List[str]:
+        """Nombres de las tablas, ordenados (lista vacía si no se pudo leer)."""
+        self._ensure_loaded()
+        with self._lock:
+            return sorted(self._tables)
+
+    def has_table(self, table: str) -> bool:
+        self._ensure_loaded()
+        with self._lock:
+            return table in self._tables
+
+    def columns(self, table: str) -> List[Dict[str, Any]]:
+        """Metadatos de columnas de una tabla (lista vacía si se desconocen)."""
+        self._ensure_loaded()
+        with self._lock:
+            return [dict(column) for column in self._tables.get(table, [])]
+
+    def column_names(self, table: str) -> List[str]:
+        return [column['column_name'] for column in self.columns(table)]
+
+    def primary_key(self, table: str) -> Optional[str]:
+        """
+        Columna única y estable para ordenar/paginar una tabla.
+
+        Usa la clave primaria que PostgREST marca con `<pk/>` (si es de una
+        sola columna); si no, `id` o `auth_user_id` cuando existen.
+        """
+        columns = self.columns(table)
+        keys = [c['column_name'] for c in columns if '<pk/>' in (c.get('description') or '')]
+        if len(keys) == 1:
+            return keys[0]
+        names = {c['column_name'] for c in columns}
+        return next((name for name in ('id', 'auth_user_id') if name in names), None)
+
+    def text_columns(self, table: str) -> List[str]:
+        """Columnas de texto de una tabla (donde `ilike` es válido)."""
+        return [column['column_name'] for column in self.columns(table) if column['data_type'] in TEXT_TYPES]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'tables': len(self._tables),
+                'source': self.source,
+                'loaded_at': self.loaded_at,
+                'age_seconds': round(time.time() - self.loaded_at, 1) if self.loaded_at else None
+            }
+
+
+# Instancia global
+schema_catalog = SchemaCatalog()
+
+
+@register_warmup_step('schema_catalog')
+def _warm_schema_catalog(flask_app):
+    """Lee el catálogo de tablas y columnas antes del primer request."""
+    schema_catalog.refresh()
+    return schema_catalog.stats()
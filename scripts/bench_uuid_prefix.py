@@ -0,0 +1,57 @@
+"""
+Benchmark del resolver de prefijos UUID (segmento de 8 caracteres de los QR).
+
+Mide la latencia de Searcher.resolve_uuid_prefix contra la base configurada en
+.env y la reporta junto al tamaño de `usuarios`. Ejecutándolo sobre bases de
+distinto tamaño (1k, 100k, 1M usuarios) la latencia debe mantenerse plana,
+porque la consulta de rango usa el índice de la clave primaria.
+
+Uso:
+    python scripts/bench_uuid_prefix.py [--iterations 200]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from supabase_client import db  # noqa: E402
+from searcher import Searcher  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    searcher = Searcher(db)
+    count = db.table('usuarios').select('auth_user_id', count='exact').limit(1).execute().count
+
+    # Mezcla de prefijos aleatorios (mayoría sin coincidencia) y uno real si existe
+    sample = db.table('usuarios').select('auth_user_id').limit(1).execute().data
+    prefixes = [f"{random.getrandbits(32):08x}" for _ in range(args.iterations)]
+    if sample:
+        prefixes[::10] = [sample[0]['auth_user_id'][:8]] * len(prefixes[::10])
+
+    searcher.resolve_uuid_prefix(prefixes[0], 'auth_user_id')  # abrir conexión fuera de la medición
+    latencies = []
+    for prefix in prefixes:
+        started = time.perf_counter()
+        searcher.resolve_uuid_prefix(prefix, 'auth_user_id')
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    latencies.sort()
+    print(f"usuarios: {count}")
+    print(f"iteraciones: {len(latencies)}")
+    print(f"p50: {statistics.median(latencies):.1f} ms")
+    print(f"p95: {latencies[int(len(latencies) * 0.95) - 1]:.1f} ms")
+    print(f"max: {latencies[-1]:.1f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""
+Precompila docs/clases.csv al artefacto docs/clases.pkl del catálogo de flora.
+
+El artefacto guarda las especies ya indexadas, así una instancia nueva carga
+el catálogo con una sola lectura en vez de parsear el CSV. Hay que volver a
+generarlo (y commitearlo) cada vez que cambia clases.csv; si se olvida, la
+app detecta el cambio por tamaño/SHA-256 y vuelve a leer el CSV.
+
+Uso:
+    python scripts/build_flora_catalog.py           # genera el artefacto
+    python scripts/build_flora_catalog.py --check   # sale con 1 si está desactualizado
+"""
+
+import argparse
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from flora_catalog import FloraCatalog, build_artifact, find_csv_path  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', help='CSV de origen (por defecto docs/clases.csv)')
+    parser.add_argument('--output', help='Ruta del artefacto (por defecto junto al CSV)')
+    parser.add_argument('--check', action='store_true', help='Solo verificar que el artefacto esté al día')
+    args = parser.parse_args()
+
+    csv_path = args.csv or find_csv_path()
+    if args.check:
+        state, artifact_path = FloraCatalog._read_artifact(csv_path)
+        if state is None:
+            print('❌ Artefacto ausente o desactualizado: ejecutar scripts/build_flora_catalog.py')
+            return 1
+        print(f'✅ Artefacto al día: {artifact_path}')
+        return 0
+
+    result = build_artifact(csv_path, args.output)
+    print(f"✅ {result['artifact']}: {result['especies']} especies, {result['bytes']} bytes (desde {result['csv']})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
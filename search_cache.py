@@ -0,0 +1,117 @@
+"""
+Cache de resultados de búsqueda para el Searcher de MeliAPP.
+
+Este módulo contiene:
+- search_cache: TTLCache (LRU + TTL) compartido por los Searcher del proceso
+- cached_search: decorador para métodos de búsqueda del Searcher
+- invalidate_search_results: descarta resultados afectados por una escritura
+- search_cache_stats: tamaño y contadores de aciertos/fallos
+
+Cada entrada guarda, además del resultado, los usuarios que aparecen en él y
+los términos buscados, para invalidar solo lo necesario: los resultados que
+contienen al usuario escrito y las búsquedas que ahora coincidirían con su
+nuevo nombre.
+"""
+
+import copy
+import inspect
+import logging
+import os
+from functools import wraps
+from typing import Any, Callable, FrozenSet, Iterable, Optional, Tuple
+
+from cache_utils import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Segundos de vida de un resultado (otras instancias también escriben)
+SEARCH_CACHE_TTL = int(os.getenv('SEARCH_CACHE_TTL', 60))
+# Número máximo de búsquedas cacheadas
+SEARCH_CACHE_SIZE = int(os.getenv('SEARCH_CACHE_SIZE', 1024))
+
+search_cache = TTLCache(maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+
+# Entradas descartadas por escrituras
+_invalidations = 0
+
+
+def _result_user_ids(value: Any) -> FrozenSet[str]:
+    """auth_user_id de las filas de un resultado (dict, lista de dicts o None)."""
+    rows = value if isinstance(value, list) else [value]
+    return frozenset(str(row['auth_user_id']) for row in rows
+                     if isinstance(row, dict) and row.get('auth_user_id'))
+
+
+def cached_search(method: Optional[Callable] = None, *, empty: Callable[[], Any] = list) -> Callable:
+    """
+    Cachea el resultado de un método de búsqueda del Searcher.
+
+    La clave es (método, cliente, argumentos ligados a la firma), así
+    `f(t, 5)` y `f(t, limit=5)` comparten entrada. Se devuelve una copia, así
+    el llamador puede modificar las filas sin alterar lo cacheado.
+
+    Si el método lanza una excepción no se cachea nada: se registra el error
+    y se devuelve `empty()` (lista vacía por defecto), y la próxima llamada
+    vuelve a consultar.
+
+    Uso: `@cached_search` o `@cached_search(empty=lambda: None)`.
+    """
+    if method is None:
+        return lambda m: cached_search(m, empty=empty)
+
+    signature = inspect.signature(method)
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        arguments = tuple(bound.arguments.items())[1:]  # sin self
+        key = (method.__name__, id(self.supabase), arguments)
+        entry = search_cache.get(key)
+        if entry is None:
+            try:
+                value = method(self, *args, **kwargs)
+            except Exception as e:
+                logger.error(f"Error en {method.__name__}{tuple(v for _, v in arguments)}: {e}")
+                return empty()
+            terms = tuple(v.lower() for _, v in arguments if isinstance(v, str) and v)
+            entry = (value, _result_user_ids(value), terms)
+            search_cache.set(key, entry)
+        return copy.deepcopy(entry[0])
+    return wrapper
+
+
+def invalidate_search_results(table: str, action: str, auth_user_id: Optional[str] = None,
+                              names: Iterable[Any] = ()) -> int:
+    """
+    Descarta los resultados cacheados que una escritura pudo cambiar.
+
+    Sirve como listener de escritura (table, action, auth_user_id) y, con
+    `names`, también descarta las búsquedas cuyo término está contenido en
+    alguno de los nombres nuevos (misma regla que `ilike '%term%'`).
+
+    Returns:
+        int: Entradas descartadas
+    """
+    global _invalidations
+    user = str(auth_user_id) if auth_user_id else None
+    lowered = [str(n).lower() for n in names if n]
+    if not user and not lowered:
+        return 0
+
+    def affected(key: Tuple, entry: Tuple) -> bool:
+        _, user_ids, terms = entry
+        if user and user in user_ids:
+            return True
+        return any(term in name for term in terms for name in lowered)
+
+    evicted = search_cache.evict_where(affected)
+    if evicted:
+        _invalidations += evicted
+        logger.debug(f"Cache de búsqueda: {evicted} entradas descartadas tras escribir en {table}")
+    return evicted
+
+
+def search_cache_stats() -> dict:
+    """Tamaño, aciertos/fallos, TTL y entradas invalidadas del cache de búsqueda."""
+    return {**search_cache.stats(), 'ttl': SEARCH_CACHE_TTL, 'invalidations': _invalidations}
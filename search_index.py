@@ -0,0 +1,399 @@
+"""
+Índice invertido en memoria para la búsqueda global de MeliAPP.
+
+Este módulo contiene:
+- fold_text / tokenize: normalización sin acentos y tokenización
+- InMemoryIndex: base de los índices en memoria (construcción, TTL y estado)
+- index_executor: pool propio de los índices, separado del pool de requests
+  del Searcher, para lecturas de construcción y reindexados
+- SearchIndex: índice invertido sobre Searcher.search_fields con ranking BM25
+- search_index: instancia global, construida por el warmup/cron y actualizada
+  de forma incremental con los listeners de escritura de modify_DB
+
+Mientras un índice no está construido, las consultas se responden con `ilike`
+(sin bloquear el request con la construcción completa).
+
+Reemplaza los escaneos `ilike '%term%'` por tabla (que no usan índices ni
+ordenan por relevancia) por una búsqueda en memoria ordenada por BM25.
+"""
+
+import html
+import logging
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from searcher import Searcher, SearchResult
+from supabase_client import db
+from modify_DB import register_write_listener
+from warmup import register_warmup_step
+
+logger = logging.getLogger(__name__)
+
+# Segundos tras los que el índice se reconstruye completo (otras instancias también escriben)
+SEARCH_INDEX_TTL = int(os.getenv('SEARCH_INDEX_TTL', 900))
+# Filas por página al construir el índice
+BUILD_PAGE_SIZE = 1000
+# Workers del pool de los índices (no compiten con las lecturas de los requests)
+INDEX_MAX_WORKERS = int(os.getenv('INDEX_MAX_WORKERS', 4))
+# En Vercel la instancia se congela al responder: solo el warmup/cron construye los índices.
+# En un servidor persistente, un request con el índice vacío o vencido lo construye en segundo plano.
+BACKGROUND_BUILDS = os.getenv('VERCEL') != '1'
+
+index_executor = ThreadPoolExecutor(max_workers=INDEX_MAX_WORKERS, thread_name_prefix='index')
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def fold_text(text: Any) -> str:
+    """Pasa a minúsculas y elimina acentos/diacríticos ('Cañete' -> 'canete')."""
+    if text is None:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', str(text))
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text: Any) -> List[str]:
+    """Tokeniza un texto normalizado en palabras alfanuméricas."""
+    return _TOKEN_RE.findall(fold_text(text))
+
+
+def highlight(text: Any, terms: Set[str]) -> str:
+    """
+    Marca con <mark> las palabras de `text` cuyo token normalizado está en `terms`.
+
+    El texto se escapa antes de marcar, así que el resultado es HTML seguro.
+    """
+    value = str(text)
+    parts = []
+    last = 0
+    for match in re.finditer(r'[^\W_]+', value):
+        if fold_text(match.group()) in terms:
+            parts.append(html.escape(value[last:match.start()]))
+            parts.append(f'<mark>{html.escape(match.group())}</mark>')
+            last = match.end()
+    parts.append(html.escape(value[last:]))
+    return ''.join(parts)
+
+
+def fetch_rows(table: str, columns: str = '*', auth_user_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Lee las filas de una tabla (todas o las de un usuario), paginando."""
+    rows = []
+    start = 0
+    while True:
+        query = db.table(table).select(columns)
+        if auth_user_id:
+            query = query.eq('auth_user_id', auth_user_id)
+        page = query.range(start, start + BUILD_PAGE_SIZE - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < BUILD_PAGE_SIZE:
+            return rows
+        start += BUILD_PAGE_SIZE
+
+
+def fetch_tables(reads: Dict[str, Tuple[str, str]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Lee varias tablas completas en paralelo sobre index_executor.
+
+    Args:
+        reads: {nombre: (tabla, columnas)}
+
+    Returns:
+        dict: {nombre: filas}; si una lectura falla se propaga su error
+    """
+    futures = {name: index_executor.submit(fetch_rows, table, columns) for name, (table, columns) in reads.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+
+def search_rows(table: str, fields: Tuple[str, ...], term: str, columns: str = '*',
+                limit: int = 20) -> List[Dict[str, Any]]:
+    """Respaldo sin índice: filas de `table` con `term` en alguno de `fields` (`ilike`, una consulta)."""
+    pattern = Searcher._quote_filter_value(f'*{term}*')
+    or_filter = ','.join(f'{field}.ilike.{pattern}' for field in fields)
+    return db.table(table).select(columns).or_(or_filter).limit(limit).execute().data or []
+
+
+class InMemoryIndex:
+    """
+    Base de los índices en memoria: construcción completa y estado.
+
+    Las subclases implementan `_build()`. El warmup/cron construye el índice
+    (build_if_stale) y las consultas nunca esperan una construcción: si el
+    índice no está listo usan su respaldo con `ilike` (ver `ready()`).
+    """
+
+    name = 'índice'
+
+    def __init__(self, ttl: float = SEARCH_INDEX_TTL):
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._building = threading.Lock()
+        self.built_at: Optional[float] = None
+
+    def _build(self):
+        raise NotImplementedError
+
+    def build(self):
+        """Construye el índice completo."""
+        with self._building:
+            self._build()
+
+    def is_stale(self) -> bool:
+        """True si el índice no se construyó o pasó su TTL."""
+        return self.built_at is None or time.time() - self.built_at > self.ttl
+
+    def build_if_stale(self) -> bool:
+        """Construye el índice si falta o está vencido (warmup/cron). Devuelve True si lo construyó."""
+        if not self.is_stale():
+            return False
+        self.build()
+        return True
+
+    def ready(self) -> bool:
+        """
+        Indica si el índice puede responder, sin bloquear nunca.
+
+        Un índice vencido sigue respondiendo. Si falta o está vencido y
+        BACKGROUND_BUILDS está activo, programa su construcción en un thread
+        aparte (una sola a la vez).
+        """
+        if BACKGROUND_BUILDS and self.is_stale() and self._building.acquire(blocking=False):
+            def rebuild():
+                try:
+                    self._build()
+                except Exception as e:
+                    logger.warning(f"No se pudo construir el {self.name}: {e}")
+                finally:
+                    self._building.release()
+            threading.Thread(target=rebuild, name=f'{type(self).__name__}-build', daemon=True).start()
+        return self.built_at is not None
+
+
+class SearchIndex(InMemoryIndex):
+    """
+    Índice invertido con ranking BM25 sobre los campos de búsqueda del Searcher.
+
+    Cada fila de una tabla es un documento con clave (tabla, id). Los campos
+    de identificadores no se indexan. Es seguro para uso concurrente.
+    """
+
+    name = 'índice de búsqueda'
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, searcher: Searcher):
+        super().__init__()
+        self.searcher = searcher
+        self._reset()
+
+    def _reset(self):
+        self._postings: Dict[str, Dict[Tuple[str, str], int]] = defaultdict(dict)  # término -> {doc: tf}
+        self._docs: Dict[Tuple[str, str], Dict[str, Any]] = {}  # doc -> {'data', 'length', 'terms', 'user'}
+        self._by_user: Dict[Tuple[str, str], Set[Tuple[str, str]]] = defaultdict(set)  # (tabla, usuario) -> docs
+        self._total_length = 0
+        self._vocabulary: Optional[List[str]] = None  # términos ordenados, para prefijos
+
+    # ---- construcción ----
+
+    def _text_fields(self, table: str) -> List[str]:
+        return [f for f in self.searcher.search_fields.get(table, []) if not Searcher._is_id_field(f)]
+
+    def _add_row(self, table: str, row: Dict[str, Any]):
+        """Indexa una fila (debe llamarse con el lock tomado)."""
+        auth_user_id = row.get('auth_user_id')
+        doc_id = str(row.get('id') or auth_user_id or '')
+        if not doc_id:
+            return
+        key = (table, doc_id)
+        if key in self._docs:
+            self._remove_doc(key)
+
+        fields = self.searcher.search_fields.get(table, [])
+        data = {f: row.get(f) for f in fields if f in row}
+        if 'id' in row:
+            data['id'] = row['id']
+
+        terms = Counter()
+        for field in self._text_fields(table):
+            terms.update(tokenize(row.get(field)))
+        if not terms:
+            return
+
+        length = sum(terms.values())
+        for term, tf in terms.items():
+            if term not in self._postings:
+                self._vocabulary = None
+            self._postings[term][key] = tf
+        self._docs[key] = {'data': data, 'length': length, 'terms': set(terms), 'user': auth_user_id}
+        self._by_user[(table, str(auth_user_id))].add(key)
+        self._total_length += length
+
+    def _remove_doc(self, key: Tuple[str, str]):
+        """Quita un documento del índice (debe llamarse con el lock tomado)."""
+        doc = self._docs.pop(key, None)
+        if not doc:
+            return
+        for term in doc['terms']:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self._postings[term]
+                    self._vocabulary = None
+        self._by_user[(key[0], str(doc['user']))].discard(key)
+        self._total_length -= doc['length']
+
+    def _build(self):
+        """Lee todas las tablas de búsqueda en paralelo y reemplaza el índice."""
+        started = time.perf_counter()
+        rows = fetch_tables({table: (table, '*') for table in self.searcher.search_fields})
+
+        with self._lock:
+            self._reset()
+            for table, table_rows in rows.items():
+                for row in table_rows:
+                    self._add_row(table, row)
+            self.built_at = time.time()
+        logger.info(f"Índice de búsqueda construido: {len(self._docs)} documentos, "
+                    f"{len(self._postings)} términos en {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def refresh_user(self, table: str, auth_user_id: str):
+        """Reindexa las filas de `table` de un usuario tras una escritura."""
+        if self.built_at is None or table not in self.searcher.search_fields:
+            return
+        try:
+            rows = fetch_rows(table, auth_user_id=auth_user_id)
+        except Exception as e:
+            logger.warning(f"No se pudo reindexar {table} para {auth_user_id}: {e}")
+            return
+        with self._lock:
+            for key in list(self._by_user.get((table, str(auth_user_id)), ())):
+                self._remove_doc(key)
+            for row in rows:
+                self._add_row(table, row)
+
+    # ---- consulta ----
+
+    def _expand(self, token: str) -> List[str]:
+        """Términos del vocabulario que comienzan con `token` (para búsquedas parciales)."""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        vocabulary = self._vocabulary
+        expanded = []
+        i = bisect_left(vocabulary, token)
+        while i < len(vocabulary) and vocabulary[i].startswith(token) and len(expanded) < 50:
+            expanded.append(vocabulary[i])
+            i += 1
+        return expanded
+
+    def search(self, query: str, limit: int = 20, tables: Optional[List[str]] = None) -> List[SearchResult]:
+        """
+        Busca `query` y devuelve los documentos ordenados por BM25.
+
+        Cada token de la consulta coincide exactamente y, si tiene 3 o más
+        caracteres, también como prefijo (con menor peso). Si el índice aún no
+        está construido responde con el `ilike` del Searcher (score 0).
+
+        Args:
+            query: Texto de búsqueda (sin importar acentos ni mayúsculas)
+            limit: Número máximo de resultados
+            tables: Restringir a estas tablas
+
+        Returns:
+            list: SearchResult con `matches` = {campo: valor con <mark>} y `score`
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        if not self.ready():
+            return self._fallback_search(query, limit, tables)
+
+        with self._lock:
+            n_docs = len(self._docs) or 1
+            avgdl = self._total_length / n_docs if self._docs else 1
+            scores = defaultdict(float)
+            matched_terms = defaultdict(set)
+
+            for token in dict.fromkeys(tokens):
+                candidates = [(token, 1.0)] if token in self._postings else []
+                if len(token) >= 3:
+                    candidates += [(t, 0.5) for t in self._expand(token) if t != token]
+                for term, weight in candidates:
+                    postings = self._postings[term]
+                    idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for key, tf in postings.items():
+                        if tables and key[0] not in tables:
+                            continue
+                        length = self._docs[key]['length']
+                        norm = tf * (self.K1 + 1) / (tf + self.K1 * (1 - self.B + self.B * length / avgdl))
+                        scores[key] += weight * idf * norm
+                        matched_terms[key].add(term)
+
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+            results = []
+            for key, score in ranked:
+                table, doc_id = key
+                data = dict(self._docs[key]['data'])
+                terms = matched_terms[key]
+                matches = {
+                    field: highlight(data[field], terms)
+                    for field in self._text_fields(table)
+                    if data.get(field) is not None and terms & set(tokenize(data[field]))
+                }
+                results.append(SearchResult(table=table, id=doc_id, data=data, matches=matches, score=round(score, 4)))
+            return results
+
+    def _fallback_search(self, query: str, limit: int, tables: Optional[List[str]]) -> List[SearchResult]:
+        """Búsqueda con `ilike` del Searcher mientras el índice no está construido (sin ranking)."""
+        terms = set(tokenize(query))
+        rows = self.searcher.search_all_tables(query, limit_per_table=limit,
+                                               tables=tables or list(self.searcher.search_fields))
+        results = []
+        for row in rows[:limit]:
+            table = row.pop('_table')
+            fields = self.searcher.search_fields.get(table, [])
+            data = {f: row.get(f) for f in fields if f in row}
+            if 'id' in row:
+                data['id'] = row['id']
+            matches = {
+                field: highlight(data[field], terms)
+                for field in self._text_fields(table)
+                if data.get(field) is not None and terms & set(tokenize(data[field]))
+            }
+            doc_id = str(row.get('id') or row.get('auth_user_id') or '')
+            results.append(SearchResult(table=table, id=doc_id, data=data, matches=matches, score=0.0))
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """Tamaño del índice y antigüedad."""
+        with self._lock:
+            return {
+                'documents': len(self._docs),
+                'terms': len(self._postings),
+                'built_at': self.built_at,
+                'age_seconds': round(time.time() - self.built_at, 1) if self.built_at else None
+            }
+
+
+# Instancia global
+search_index = SearchIndex(Searcher(db))
+
+
+@register_write_listener
+def _refresh_search_index(table: str, action: str, auth_user_id: Optional[str]):
+    """Mantiene el índice al día tras escrituras de DatabaseModifier (en segundo plano)."""
+    if auth_user_id and table in search_index.searcher.search_fields:
+        index_executor.submit(search_index.refresh_user, table, auth_user_id)
+
+
+@register_warmup_step('search_index')
+def _warm_search_index(flask_app):
+    """Construye el índice de búsqueda si falta o está vencido (warmup y cron)."""
+    return {'built': search_index.build_if_stale(), **search_index.stats()}
@@ -1,20 +1,87 @@
-from typing import Dict, List, Any, Optional, Union, Tuple
+from typing import Dict, List, Any, Optional, Union, Tuple, Callable, Iterator
 from supabase import Client as SupabaseClient
 from dataclasses import dataclass
-from data_tables_supabase import list_tables, get_table_data
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from schema_catalog import schema_catalog
+from data_tables_supabase import normalize_count, paginate
+from query_memo import get_request_memo, memoized_select
+from search_cache import cached_search
+from singleflight import coalesced, searcher_flights
+import asyncio
 import logging
+import os
+import re
 
 # Configuración de logging
 logger = logging.getLogger(__name__)
 
+# Pool acotado para lanzar en paralelo lecturas independientes a PostgREST
+SEARCHER_MAX_WORKERS = int(os.getenv('SEARCHER_MAX_WORKERS', 8))
+_executor = ThreadPoolExecutor(max_workers=SEARCHER_MAX_WORKERS, thread_name_prefix='searcher')
+
+# RPC que devuelve el perfil completo en una llamada
+# (supabase/migrations/20261017000000_get_user_profile_full.sql)
+PROFILE_RPC = 'get_user_profile_full'
+
+# Alternativa: perfil con resource embedding (1 consulta). El select embebido corre
+# bajo RLS del cliente (anon para `db`), a diferencia de get_user_profile (SECURITY
+# DEFINER): activarlo solo si las políticas de info_contacto y ubicaciones lo permiten.
+PROFILE_EMBEDDING = os.getenv('PROFILE_EMBEDDING', '0') == '1'
+
+# Errores de PostgREST cuando no existe la relación pedida en un select embebido
+RELATIONSHIP_ERROR_CODES = ('PGRST200', 'PGRST201')
+# Error de PostgREST cuando no existe la función RPC
+MISSING_FUNCTION_CODE = 'PGRST202'
+
 @dataclass
 class SearchResult:
     table: str
     id: str
     data: Dict[str, Any]
     matches: Dict[str, str]  # field: matched_value
+    score: float = 0.0
+
+@dataclass
+class UserProfile:
+    """Documento de perfil público: usuario y todas sus tablas hijas."""
+    user: Dict[str, Any]
+    contact_info: Optional[Dict[str, Any]]
+    locations: List[Dict[str, Any]]
+    production: List[Dict[str, Any]]
+    requests: List[Dict[str, Any]]
+    
+    @property
+    def auth_user_id(self) -> str:
+        return self.user.get('auth_user_id')
+    
+    @property
+    def botanical_origins(self) -> List[Dict[str, Any]]:
+        # Misma tabla (origenes_botanicos) según el esquema actual
+        return self.production
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Formato compatible con el dict que devuelve get_user_profile_data."""
+        return {
+            'user': self.user,
+            'contact_info': self.contact_info,
+            'locations': self.locations,
+            'production': self.production,
+            'botanical_origins': self.botanical_origins,
+            'requests': self.requests
+        }
 
 class Searcher:
+    # Se desactivan si PostgREST no encuentra las relaciones del select embebido
+    # o la función PROFILE_RPC (migración sin aplicar), para no reintentarlos en cada perfil
+    _profile_embedding_supported = True
+    _profile_rpc_supported = True
+    
+    # Tablas con datos por usuario (todas referencian usuarios.auth_user_id)
+    USER_TABLES = ('usuarios', 'info_contacto', 'ubicaciones', 'origenes_botanicos', 'solicitudes_apicultor')
+    
+    # Select con resource embedding de PostgREST: usuario + tablas hijas en una sola consulta
+    PROFILE_SELECT = '*, info_contacto(*), ubicaciones(*), origenes_botanicos(*), solicitudes_apicultor(*)'
+    
     def __init__(self, supabase_client):
         """Inicializa el Searcher con el cliente de Supabase."""
         self.supabase = supabase_client
@@ -26,6 +93,66 @@ class Searcher:
             'solicitudes_apicultor': ['auth_user_id', 'nombre_completo', 'nombre_empresa', 'region', 'comuna', 'telefono', 'status']
         }
         
+    def _fetch_concurrently(self, queries: Dict[str, Callable[[], Any]]) -> Dict[str, Tuple[Any, Optional[Exception]]]:
+        """
+        Ejecuta lecturas independientes en paralelo sobre el pool del Searcher.
+        
+        Cada consulta se aísla: si una falla, su error se devuelve junto a su
+        nombre y el resto de resultados no se ve afectado.
+        
+        Args:
+            queries: Diccionario {nombre: función sin argumentos que ejecuta la consulta}
+            
+        Returns:
+            dict: {nombre: (resultado, error)} con error=None si la consulta tuvo éxito
+        """
+        futures = {name: _executor.submit(query) for name, query in queries.items()}
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = (future.result(), None)
+            except Exception as e:
+                logger.warning(f"Consulta '{name}' falló: {str(e)}")
+                results[name] = (None, e)
+        return results
+    
+    def _iter_concurrently(self, queries: Dict[str, Callable[[], Any]]) -> Iterator[Tuple[str, Any, Optional[Exception]]]:
+        """
+        Como _fetch_concurrently, pero entrega cada resultado apenas termina su consulta.
+        
+        Yields:
+            tuple: (nombre, resultado, error) en orden de finalización
+        """
+        futures = {_executor.submit(query): name for name, query in queries.items()}
+        try:
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    yield name, future.result(), None
+                except Exception as e:
+                    logger.warning(f"Consulta '{name}' falló: {str(e)}")
+                    yield name, None, e
+        finally:
+            # Si el consumidor abandona (cliente desconectado) no se lanzan las pendientes
+            for future in futures:
+                future.cancel()
+    
+    def _select_by_user(self, table: str, auth_user_id: str) -> Callable[[], List[Dict[str, Any]]]:
+        """
+        Construye la lectura `select *` de una tabla filtrada por auth_user_id.
+        
+        El memo del request se captura aquí (thread del request) porque la
+        consulta se ejecuta en el pool, donde flask.g no está disponible.
+        """
+        memo = get_request_memo()
+        return lambda: memoized_select(self.supabase, table, '*', {'auth_user_id': auth_user_id}, memo=memo)
+    
+    @staticmethod
+    def _rows(result: Tuple[Any, Optional[Exception]]) -> List[Dict[str, Any]]:
+        """Extrae la lista de filas de un resultado de _fetch_concurrently."""
+        rows, _ = result
+        return rows or []
+
     def get_uuid_segment(self, uuid_str: str) -> str:
         """
         Extrae el primer segmento (8 caracteres) de un UUID.
@@ -45,6 +172,63 @@ class Searcher:
         clean_uuid = uuid_str.split('-')[0].lower()
         return clean_uuid[:8] if clean_uuid else ''
 
+    _HEX_PREFIX = re.compile(r'^[0-9a-f]{1,32}$')
+
+    @classmethod
+    def uuid_prefix_bounds(cls, prefix: str) -> Optional[Tuple[str, str]]:
+        """
+        Calcula el rango de UUIDs que comienzan con un prefijo hexadecimal.
+        
+        Args:
+            prefix: Prefijo del UUID, con o sin guiones (p. ej. el segmento de 8 caracteres del QR)
+            
+        Returns:
+            tuple: (menor, mayor) UUID del rango, o None si el prefijo no es hexadecimal
+            
+        Ejemplo:
+            '550e8400' -> ('550e8400-0000-0000-0000-000000000000',
+                           '550e8400-ffff-ffff-ffff-ffffffffffff')
+        """
+        if not prefix or not isinstance(prefix, str):
+            return None
+        clean = prefix.replace('-', '').lower()
+        if not cls._HEX_PREFIX.match(clean):
+            return None
+        
+        def as_uuid(hex32: str) -> str:
+            return f"{hex32[:8]}-{hex32[8:12]}-{hex32[12:16]}-{hex32[16:20]}-{hex32[20:]}"
+        
+        return as_uuid(clean.ljust(32, '0')), as_uuid(clean.ljust(32, 'f'))
+
+    @coalesced(searcher_flights)
+    def resolve_uuid_prefix(self, prefix: str, columns: str = '*') -> Optional[Dict[str, Any]]:
+        """
+        Busca el usuario cuyo auth_user_id comienza con `prefix` sin recorrer la tabla.
+        
+        Usa una consulta de rango (gte/lte) sobre auth_user_id, que PostgreSQL
+        resuelve con el índice de la clave primaria: O(log n) en vez de
+        descargar todos los usuarios y filtrarlos en Python.
+        
+        Args:
+            prefix: Prefijo del UUID (normalmente el segmento de 8 caracteres del QR)
+            columns: Columnas a devolver
+            
+        Returns:
+            dict: Fila del usuario o None si no existe
+        """
+        bounds = self.uuid_prefix_bounds(prefix)
+        if not bounds:
+            return None
+        lower, upper = bounds
+        response = self.supabase.table('usuarios')\
+            .select(columns)\
+            .gte('auth_user_id', lower)\
+            .lte('auth_user_id', upper)\
+            .order('auth_user_id')\
+            .limit(1)\
+            .execute()
+        return response.data[0] if response.data else None
+
     def get_user_data(self, auth_user_id: str) -> tuple[dict, dict, list, list, list, list, str]:
         """
         Obtiene los datos de un usuario, su información de contacto, ubicaciones, 
@@ -60,31 +244,38 @@ class Searcher:
             return None, None, [], [], [], [], "Se requiere un auth_user_id de usuario"
             
         try:
-            # Obtener datos del usuario
-            user_response = self.supabase.table('usuarios').select('*').eq('auth_user_id', auth_user_id).execute()
-            user = user_response.data[0] if user_response.data else None
+            # Lanzar en paralelo las cinco lecturas independientes
+            results = self._fetch_concurrently({
+                table: self._select_by_user(table, auth_user_id)
+                for table in self.USER_TABLES
+            })
+            
+            # El usuario es obligatorio: si su consulta falló, propagar el error
+            _, user_error = results['usuarios']
+            if user_error is not None:
+                raise user_error
+            
+            users = self._rows(results['usuarios'])
+            user = users[0] if users else None
             
             if not user:
                 return None, None, [], [], [], [], "Usuario no encontrado"
             
             # Obtener información de contacto
-            contact_response = self.supabase.table('info_contacto').select('*').eq('auth_user_id', auth_user_id).execute()
-            contact = contact_response.data[0] if contact_response.data else {}
+            contacts = self._rows(results['info_contacto'])
+            contact = contacts[0] if contacts else {}
             
             # Obtener ubicaciones
-            locations_response = self.supabase.table('ubicaciones').select('*').eq('auth_user_id', auth_user_id).execute()
-            locations = locations_response.data if locations_response.data else []
+            locations = self._rows(results['ubicaciones'])
             
             # Obtener orígenes botánicos (producciones apícolas)
-            producciones_response = self.supabase.table('origenes_botanicos').select('*').eq('auth_user_id', auth_user_id).execute()
-            producciones = producciones_response.data if producciones_response.data else []
+            producciones = self._rows(results['origenes_botanicos'])
             
             # Obtener orígenes botánicos
             origenes_botanicos = producciones  # Misma tabla según nuevo esquema
             
             # Obtener solicitudes
-            solicitudes_response = self.supabase.table('solicitudes_apicultor').select('*').eq('auth_user_id', auth_user_id).execute()
-            solicitudes = solicitudes_response.data if solicitudes_response.data else []
+            solicitudes = self._rows(results['solicitudes_apicultor'])
             
             return user, contact, locations, producciones, origenes_botanicos, solicitudes, ""
             
@@ -121,188 +312,223 @@ class Searcher:
 
     def get_tables(self) -> List[str]:
         """
-        Obtiene la lista de tablas disponibles usando data_tables_supabase.
+        Obtiene la lista de tablas disponibles desde el catálogo de esquema en memoria.
         
         Returns:
-            List[str]: Lista de nombres de tablas disponibles
+            List[str]: Lista de nombres de tablas disponibles (las de search_fields
+                       si el catálogo no se pudo leer)
         """
-        try:
-            # Primero intentamos con data_tables_supabase
-            success, tables = list_tables()
-            
-            if success and tables:
-                return tables
-                
-            # Si falla, intentamos con una consulta directa a las tablas de información
-            try:
-                result = self.supabase.table('pg_tables')\
-                                  .select('tablename')\
-                                  .eq('schemaname', 'public')\
-                                  .execute()
-                if hasattr(result, 'data') and result.data:
-                    return [table['tablename'] for table in result.data]
-            except Exception:
-                pass
-                
-            # Último recurso: usar las tablas definidas en search_fields
-            return list(self.search_fields.keys())
-            
-        except Exception as e:
-            print(f"Error al obtener tablas: {str(e)}")
-            return list(self.search_fields.keys())
+        return schema_catalog.tables() or list(self.search_fields.keys())
+    
+    def _searchable_tables(self, tables: Optional[List[str]] = None) -> List[str]:
+        """
+        Tablas pedidas que existen en el catálogo (todas las de get_tables si no se piden).
+        
+        Los nombres desconocidos se descartan, así un parámetro `tables` de la
+        URL no puede llegar a PostgREST con tablas arbitrarias.
+        """
+        available = self.get_tables()
+        if not tables:
+            return available
+        known = set(available)
+        ignored = [table for table in tables if table not in known]
+        if ignored:
+            logger.warning(f"Tablas desconocidas ignoradas en la búsqueda: {ignored}")
+        return [table for table in dict.fromkeys(tables) if table in known]
+    
+    def obtener_esquema_tabla(self, tabla: str) -> List[Dict[str, Any]]:
+        """
+        Columnas de una tabla desde el catálogo de esquema (sin consultas).
+        
+        Returns:
+            Lista de dicts con column_name, data_type, is_nullable y description
+        """
+        return schema_catalog.columns(tabla)
 
+    # Valores de respaldo para tablas sin campos de búsqueda conocidos
+    DEFAULT_SEARCH_FIELDS = ['auth_user_id', 'username', 'email', 'descripcion']
+    
+    _UUID_RE = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.IGNORECASE)
+    
+    @staticmethod
+    def _is_id_field(field: str) -> bool:
+        """Columnas de identificadores (uuid/enteros): `ilike` falla sobre ellas."""
+        return field == 'id' or field.endswith('_id')
+    
+    @staticmethod
+    def _quote_filter_value(value: str) -> str:
+        """Entrecomilla un valor para la sintaxis de filtros de PostgREST (comas, paréntesis, puntos)."""
+        return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+    
+    def _build_or_filter(self, fields: List[str], term: str) -> str:
+        """
+        Construye el filtro `or=(...)` que busca `term` en todos los campos de texto.
+        
+        Las columnas de identificadores se comparan por igualdad y solo cuando
+        el término es un UUID completo.
+        """
+        pattern = self._quote_filter_value(f'*{term}*')
+        conditions = [f'{field}.ilike.{pattern}' for field in fields if not self._is_id_field(field)]
+        if self._UUID_RE.match(term):
+            conditions += [f'{field}.eq.{term}' for field in fields if self._is_id_field(field)]
+        return ','.join(conditions)
+    
+    def _get_search_fields(self, table: str) -> Tuple[List[str], str]:
+        """
+        Campos donde buscar en una tabla y columnas a seleccionar.
+        
+        Returns:
+            tuple: (campos, columnas para `.select()`)
+        """
+        if table in self.search_fields:
+            fields = self.search_fields[table]
+            return fields, ','.join(fields)
+        
+        # Tabla sin campos predefinidos: columnas de texto según el catálogo de esquema
+        fields = schema_catalog.text_columns(table)
+        if fields:
+            return fields, '*'
+        return self.DEFAULT_SEARCH_FIELDS, '*'
+    
+    @staticmethod
+    def _unique_by_id(rows: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+        """Elimina duplicados por auth_user_id/id conservando el orden."""
+        seen_ids = set()
+        unique_results = []
+        for item in rows:
+            item_id = item.get('auth_user_id') or item.get('id')
+            if item_id and item_id not in seen_ids:
+                unique_results.append(item)
+                seen_ids.add(item_id)
+        return unique_results[:limit]
+    
+    @cached_search
+    @coalesced(searcher_flights)
     def search_in_table(self, table: str, term: str, limit: int = 10) -> List[Dict[str, Any]]:
         """
         Busca un término en todos los campos de búsqueda de una tabla específica.
         
+        Hace una sola consulta con `or=(campo.ilike.*term*, ...)` que devuelve
+        solo las columnas de búsqueda. Si PostgREST rechaza el filtro combinado
+        (por ejemplo un campo inexistente), vuelve a una consulta por campo.
+            
         Args:
             table: Nombre de la tabla donde buscar
             term: Término de búsqueda
             limit: Límite de resultados a devolver
-            
+                
         Returns:
             Lista de diccionarios con los resultados de la búsqueda
+            (lista vacía si la consulta falló; en ese caso no se cachea)
         """
-        results = []
+        fields, columns = self._get_search_fields(table)
+        if not fields:
+            logger.warning(f"No se encontraron campos de búsqueda para la tabla {table}")
+            return []
+        
+        or_filter = self._build_or_filter(fields, term)
+        if not or_filter:
+            return []
+        
         try:
-            # Obtener campos de búsqueda para esta tabla
-            # 1. Usar campos predefinidos si existen
-            if table in self.search_fields:
-                fields = self.search_fields[table]
-            else:
-                # 2. Intentar obtener los campos de la tabla
-                try:
-                    result = self.supabase.table(table).select('*').limit(1).execute()
-                    if hasattr(result, 'data') and result.data:
-                        fields = list(result.data[0].keys())
-                    else:
-                        # 3. Usar campos comunes como último recurso
-                        fields = ['id', 'nombre', 'correo_personal', 'descripcion']
-                except Exception as e:
-                    print(f"Error al obtener campos para la tabla {table}: {str(e)}")
-                    fields = ['id', 'nombre', 'correo_personal', 'descripcion']
-            
-            if not fields:
-                print(f"No se encontraron campos de búsqueda para la tabla {table}")
-                return results
-                
-            # Construir consulta OR para buscar en múltiples campos
-            query = self.supabase.table(table).select('*')
-            
-            # Buscar en cada campo individualmente y combinar resultados
-            results = []
-            for field in fields:
-                try:
-                    field_query = self.supabase.table(table).select('*').ilike(field, f'%{term}%').limit(limit)
-                    field_response = field_query.execute()
-                    if hasattr(field_response, 'data') and field_response.data:
-                        results.extend(field_response.data)
-                except Exception as e:
-                    print(f"Error buscando en campo {field}: {str(e)}")
-                    continue
-            
-            # Eliminar duplicados basado en ID
-            seen_ids = set()
-            unique_results = []
-            for item in results:
-                item_id = item.get('auth_user_id') or item.get('id')
-                if item_id and item_id not in seen_ids:
-                    unique_results.append(item)
-                    seen_ids.add(item_id)
-            
-            return unique_results[:limit]
-                
+            response = self.supabase.table(table).select(columns).or_(or_filter).limit(limit).execute()
+            return self._unique_by_id(response.data or [], limit)
         except Exception as e:
-            print(f"Error al buscar en la tabla {table}: {str(e)}")
-            
-        return []
+            logger.warning(f"Filtro OR falló en {table}, buscando campo por campo: {str(e)}")
+        
+        # Respaldo: una consulta por campo de texto; si fallan todas, se propaga
+        # el error para que cached_search no guarde un resultado vacío
+        results = []
+        last_error = None
+        searched = 0
+        for field in fields:
+            if self._is_id_field(field):
+                continue
+            searched += 1
+            try:
+                field_response = self.supabase.table(table).select(columns).ilike(field, f'%{term}%').limit(limit).execute()
+                if hasattr(field_response, 'data') and field_response.data:
+                    results.extend(field_response.data)
+            except Exception as e:
+                logger.warning(f"Error buscando en campo {field}: {str(e)}")
+                last_error = e
+        if last_error is not None and searched and not results:
+            raise last_error
+        return self._unique_by_id(results, limit)
 
-    async def search_in_all_tables(self, term: str, limit_per_table: int = 5) -> List[Dict[str, Any]]:
+    def search_all_tables(self, term: str, limit_per_table: int = 5, tables: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """
-        Busca un término en todas las tablas disponibles.
+        Busca un término en varias tablas en paralelo (una consulta por tabla).
         
         Args:
             term: Término de búsqueda
             limit_per_table: Límite de resultados por tabla
+            tables: Tablas donde buscar (por defecto las de get_tables; se ignoran
+                    las que no están en el catálogo)
             
         Returns:
-            Lista de diccionarios con los resultados de la búsqueda
+            Lista de diccionarios con los resultados; cada uno lleva `_table`
         """
         results = []
         try:
-            tables = self.get_tables()
+            tables = self._searchable_tables(tables)
+            searches = self._fetch_concurrently({
+                table: (lambda t=table: self.search_in_table(t, term, limit_per_table))
+                for table in tables
+            })
             for table in tables:
-                try:
-                    table_results = self.search_in_table(table, term, limit_per_table)
-                    for result in table_results:
-                        result['_table'] = table  # Agregar nombre de la tabla al resultado
-                    results.extend(table_results)
-                except Exception as e:
-                    print(f"Error al buscar en la tabla {table}: {str(e)}")
-                    continue
+                for result in self._rows(searches[table]):
+                    result['_table'] = table  # Agregar nombre de la tabla al resultado
+                    results.append(result)
         except Exception as e:
-            print(f"Error en búsqueda global: {str(e)}")
+            logger.error(f"Error en búsqueda global: {str(e)}")
             
         return results
 
-    def search_in_table(self, table: str, term: str, limit: int = 10) -> List[Dict[str, Any]]:
+    def stream_all_tables(self, term: str, limit_per_table: int = 5,
+                          tables: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
         """
-        Busca un término en todos los campos de búsqueda de una tabla específica.
+        Variante en streaming de search_all_tables: entrega los resultados de
+        cada tabla apenas llegan, sin esperar a las tablas lentas.
+        
+        Solo se retienen en memoria los resultados de las tablas aún no consumidas.
+        
+        Args:
+            term: Término de búsqueda
+            limit_per_table: Límite de resultados por tabla
+            tables: Tablas donde buscar (por defecto las de get_tables; se ignoran
+                    las que no están en el catálogo)
             
+        Yields:
+            dict: {'table', 'results'} por tabla, o {'table', 'error'} si su consulta
+                  falló (el detalle solo va al log)
+        """
+        tables = self._searchable_tables(tables)
+        searches = {
+            table: (lambda t=table: self.search_in_table(t, term, limit_per_table))
+            for table in tables
+        }
+        for table, rows, error in self._iter_concurrently(searches):
+            if error is not None:
+                logger.error(f"Error en búsqueda en streaming en {table}: {str(error)}")
+                yield {'table': table, 'error': 'Error interno del servidor'}
+                continue
+            for row in rows or []:
+                row['_table'] = table
+            yield {'table': table, 'results': rows or []}
+
+    async def search_in_all_tables(self, term: str, limit_per_table: int = 5) -> List[Dict[str, Any]]:
+        """
+        Versión async de search_all_tables: la búsqueda paralela corre fuera del event loop.
+        
         Args:
-            table: Nombre de la tabla donde buscar
             term: Término de búsqueda
-            limit: Límite de resultados a devolver
-                
+            limit_per_table: Límite de resultados por tabla
+            
         Returns:
             Lista de diccionarios con los resultados de la búsqueda
         """
-        results = []
-        try:
-            # Obtener campos de búsqueda para esta tabla
-            # 1. Usar campos predefinidos si existen
-            if table in self.search_fields:
-                fields = self.search_fields[table]
-            else:
-                # 2. Intentar obtener los campos de la tabla
-                try:
-                    result = self.supabase.table(table).select('*').limit(1).execute()
-                    if hasattr(result, 'data') and result.data:
-                        fields = list(result.data[0].keys())
-                    else:
-                        # 3. Usar campos comunes como último recurso
-                        fields = ['auth_user_id', 'username', 'email', 'descripcion']
-                except Exception as e:
-                    print(f"Error al obtener campos para la tabla {table}: {str(e)}")
-                    fields = ['auth_user_id', 'username', 'email', 'descripcion']
-                    
-            if not fields:
-                print(f"No se encontraron campos de búsqueda para la tabla {table}")
-                return results
-                    
-            # Buscar en cada campo individualmente y combinar resultados
-            seen_ids = set()
-            unique_results = []
-            
-            for field in fields:
-                try:
-                    field_query = self.supabase.table(table).select('*').ilike(field, f'%{term}%').limit(limit)
-                    field_response = field_query.execute()
-                    if hasattr(field_response, 'data') and field_response.data:
-                        for item in field_response.data:
-                            item_id = item.get('auth_user_id') or item.get('id')
-                            if item_id and item_id not in seen_ids:
-                                unique_results.append(item)
-                                seen_ids.add(item_id)
-                except Exception as e:
-                    print(f"Error buscando en campo {field}: {str(e)}")
-                    continue
-                    
-            return unique_results[:limit]
-                
-        except Exception as e:
-            print(f"Error al buscar en la tabla {table}: {str(e)}")
-            return []
+        return await asyncio.to_thread(self.search_all_tables, term, limit_per_table)
 
     def buscar_en_tabla(
         self, 
@@ -311,25 +537,33 @@ class Searcher:
         orden_por: Optional[str] = None,
         ascendente: bool = True,
         limite: int = 100,
-        pagina: int = 1
+        pagina: int = 1,
+        cursor: Optional[str] = None,
+        conteo: Optional[str] = 'exact'
     ) -> Dict:
         """
         Busca registros en una tabla con filtros opcionales.
         
+        Con `cursor` ('' para la primera página, luego `siguiente_cursor`) se
+        pagina por keyset sobre la clave estable de la tabla, sin offset; el
+        costo de la página 500 es el mismo que el de la primera.
+        
         Args:
             tabla: Nombre de la tabla
             filtros: Diccionario con {columna: valor} para filtrar
             orden_por: Columna para ordenar
             ascendente: Orden ascendente (True) o descendente (False)
             limite: Límite de resultados por página
-            pagina: Número de página (1-based)
+            pagina: Número de página (1-based); se ignora si hay cursor
+            cursor: Cursor opaco devuelto en la página anterior
+            conteo: 'exact', 'planned', 'estimated' o None para no contar
             
         Returns:
-            Dict con los resultados y metadatos
+            Dict con los resultados y metadatos (`total` es None si no se cuenta)
         """
         try:
-            offset = (pagina - 1) * limite
-            query = self.supabase.table(tabla).select('*', count='exact')
+            conteo = normalize_count(conteo)
+            query = self.supabase.table(tabla).select('*', count=conteo)
             
             # Aplicar filtros
             if filtros:
@@ -337,43 +571,41 @@ class Searcher:
                     if valor:
                         query = query.ilike(columna, f'%{valor}%')
             
-            # Aplicar ordenamiento
-            if orden_por:
-                query = query.order(orden_por, asc=ascendente)
-            
-            # Aplicar paginación
-            query = query.range(offset, offset + limite - 1)
-            
-            # Ejecutar consulta
-            resultado = query.execute()
+            # Ordenar por (orden_por, clave estable) y paginar por cursor u offset
+            resultado, datos, siguiente_cursor, hay_siguiente = paginate(
+                query, tabla, limite, pagina, cursor, orden_por, ascendente)
             
             # Obtener total de registros
-            total = len(resultado.data) if hasattr(resultado, 'count') and not resultado.count else resultado.count
+            total = resultado.count if conteo else None
             
             # Calcular total de páginas
-            total_paginas = (total + limite - 1) // limite if limite > 0 else 1
+            total_paginas = (total + limite - 1) // limite if total is not None and limite > 0 else None
             
             # Obtener esquema de la tabla
             esquema = self.obtener_esquema_tabla(tabla)
             
             # Obtener nombres de columnas del esquema
-            columnas = [col['column_name'] for col in esquema] if esquema else (list(resultado.data[0].keys()) if resultado.data else [])
+            columnas = [col['column_name'] for col in esquema] if esquema else (list(datos[0].keys()) if datos else [])
             
             return {
-                'datos': resultado.data,
+                'datos': datos,
                 'total': total,
                 'total_paginas': total_paginas,
+                'siguiente_cursor': siguiente_cursor,
+                'hay_siguiente': hay_siguiente,
                 'esquema': esquema,
                 'columnas': columnas
             }
             
         except Exception as e:
-            print(f"Error al buscar en tabla {tabla}: {str(e)}")
+            logger.error(f"Error al buscar en tabla {tabla}: {str(e)}")
             return {
                 'error': str(e),
                 'datos': [],
                 'total': 0,
                 'total_paginas': 0,
+                'siguiente_cursor': None,
+                'hay_siguiente': False,
                 'esquema': [],
                 'columnas': []
             }
@@ -386,6 +618,8 @@ class Searcher:
         except:
             return None
     
+    @cached_search(empty=lambda: None)
+    @coalesced(searcher_flights)
     def find_user_by_identifier(self, user_identifier: str) -> Optional[Dict]:
         """
         Función centralizada para buscar usuarios por UUID, segmento o username.
@@ -399,36 +633,27 @@ class Searcher:
         if not user_identifier:
             return None
             
-        try:
-            # Primero intentar buscar por username exacto
-            username_response = self.supabase.table('usuarios').select('*').eq('username', user_identifier).execute()
-            if username_response.data:
-                return username_response.data[0]
-                
-            # Buscar por segmento de UUID (primeros 8 caracteres) - usar cast a text
-            if len(user_identifier) == 8:
-                # Usar una consulta SQL raw para hacer el cast correcto
-                try:
-                    # Obtener todos los usuarios y filtrar en Python para evitar problemas de casting
-                    all_users_response = self.supabase.table('usuarios').select('*').execute()
-                    if all_users_response.data:
-                        for user in all_users_response.data:
-                            user_id_str = str(user.get('auth_user_id', ''))
-                            if user_id_str.lower().startswith(user_identifier.lower()):
-                                return user
-                except Exception as segment_error:
-                    logger.error(f"Error en búsqueda por segmento: {str(segment_error)}")
-                    
-            # Buscar por username parcial
-            username_search = self.supabase.table('usuarios').select('*').ilike('username', f'%{user_identifier}%').execute()
-            if username_search.data:
-                return username_search.data[0]
+        # Los errores se propagan a cached_search, que no cachea el resultado
+        # Primero intentar buscar por username exacto
+        username_response = self.supabase.table('usuarios').select('*').eq('username', user_identifier).execute()
+        if username_response.data:
+            return username_response.data[0]
+            
+        # Buscar por segmento de UUID (primeros 8 caracteres) con consulta de rango indexada
+        if len(user_identifier) == 8:
+            user = self.resolve_uuid_prefix(user_identifier)
+            if user:
+                return user
                 
-        except Exception as e:
-            logger.error(f"Error en find_user_by_identifier: {str(e)}")
+        # Buscar por username parcial
+        username_search = self.supabase.table('usuarios').select('*').ilike('username', f'%{user_identifier}%').execute()
+        if username_search.data:
+            return username_search.data[0]
             
         return None
 
+    @cached_search
+    @coalesced(searcher_flights)
     def search_users_by_query(self, query: str, limit: int = 10) -> List[Dict]:
         """
         Búsqueda flexible de usuarios por múltiples criterios.
@@ -446,23 +671,22 @@ class Searcher:
         users = []
         seen_users = set()
         
-        # Buscar solo en username (según esquema BD actual)
+        # Buscar solo en username (según esquema BD actual); los errores
+        # se propagan a cached_search, que no cachea el resultado
         search_fields = ['username']
         
         for field in search_fields:
-            try:
-                response = self.supabase.table('usuarios').select('*').ilike(field, f'%{query}%').limit(limit).execute()
-                if response.data:
-                    for user in response.data:
-                        auth_user_id = user.get('auth_user_id')
-                        if auth_user_id and auth_user_id not in seen_users:
-                            users.append(user)
-                            seen_users.add(auth_user_id)
-            except:
-                continue
+            response = self.supabase.table('usuarios').select('*').ilike(field, f'%{query}%').limit(limit).execute()
+            if response.data:
+                for user in response.data:
+                    auth_user_id = user.get('auth_user_id')
+                    if auth_user_id and auth_user_id not in seen_users:
+                        users.append(user)
+                        seen_users.add(auth_user_id)
         
         return users[:limit]
     
+    @coalesced(searcher_flights)
     def get_user_profile_data(self, auth_user_id: str) -> Optional[Dict]:
         """
         Obtener datos completos del perfil de usuario usando la función RPC 'get_user_profile'.
@@ -475,8 +699,17 @@ class Searcher:
             dict: Datos completos del usuario o None
         """
         try:
-            # 1. Llamar a la función RPC segura para obtener datos de perfil (usuario, contacto, ubicaciones)
-            profile_response = self.supabase.rpc('get_user_profile', {'p_auth_user_id': auth_user_id}).execute()
+            # 1. Lanzar en paralelo la RPC segura (usuario, contacto, ubicaciones) y los datos
+            #    adicionales que SÍ deben respetar RLS (producción, solicitudes).
+            #    Estas últimas solo devuelven filas si el usuario autenticado es el dueño.
+            results = self._fetch_concurrently({
+                'profile': lambda: self.supabase.rpc('get_user_profile', {'p_auth_user_id': auth_user_id}).execute(),
+                'origenes_botanicos': self._select_by_user('origenes_botanicos', auth_user_id),
+                'solicitudes_apicultor': self._select_by_user('solicitudes_apicultor', auth_user_id)
+            })
+            profile_response, profile_error = results['profile']
+            if profile_error is not None:
+                raise profile_error
             
             # La función RPC devuelve un diccionario, no una lista, por eso falla la validación
             # Accedemos directamente al resultado sin usar .data
@@ -499,19 +732,17 @@ class Searcher:
                 logger.warning(f"No se encontró perfil para el usuario {auth_user_id} usando RPC.")
                 return None
             
-            # 2. Obtener datos adicionales que SÍ deben respetar RLS (producción, solicitudes)
-            #    Estas consultas solo funcionarán si el usuario autenticado es el dueño de los datos.
-            producciones_response = self.supabase.table('origenes_botanicos').select('*').eq('auth_user_id', auth_user_id).execute()
-            solicitudes_response = self.supabase.table('solicitudes_apicultor').select('*').eq('auth_user_id', auth_user_id).execute()
+            producciones = self._rows(results['origenes_botanicos'])
+            solicitudes = self._rows(results['solicitudes_apicultor'])
 
             # 3. Ensamblar la respuesta final
             return {
                 'user': profile_data.get('usuario'),
                 'contact_info': profile_data.get('info_contacto'),
                 'locations': profile_data.get('ubicaciones') or [],
-                'production': producciones_response.data if producciones_response.data else [],
-                'botanical_origins': producciones_response.data if producciones_response.data else [],
-                'requests': solicitudes_response.data if solicitudes_response.data else []
+                'production': producciones,
+                'botanical_origins': producciones,
+                'requests': solicitudes
             }
             
         except Exception as e:
@@ -519,6 +750,108 @@ class Searcher:
             # Fallback: obtener datos usando consultas individuales
             return self._get_profile_fallback(auth_user_id)
 
+    @coalesced(searcher_flights)
+    def load_profile(self, auth_user_id: str) -> Optional[UserProfile]:
+        """
+        Carga el perfil completo de un usuario en un solo round trip.
+        
+        Por defecto llama al RPC PROFILE_RPC, que devuelve usuario, contacto y
+        ubicaciones vía get_user_profile (SECURITY DEFINER, sirve a visitantes
+        anónimos) junto a origenes_botanicos y solicitudes_apicultor leídas con
+        RLS de quien llama. Con PROFILE_EMBEDDING=1 usa en cambio resource
+        embedding de PostgREST (todas las tablas bajo RLS del cliente).
+        
+        Si falta la relación o la función, esa vía se desactiva para el
+        proceso; ante otros errores solo esa llamada recurre a
+        get_user_profile_data (RPC más consultas separadas).
+        
+        Args:
+            auth_user_id: auth_user_id (UUID completo) del usuario
+            
+        Returns:
+            UserProfile: Perfil tipado o None si el usuario no existe
+        """
+        if not auth_user_id:
+            return None
+        
+        if PROFILE_EMBEDDING and self._profile_embedding_supported:
+            try:
+                response = self.supabase.table('usuarios')\
+                    .select(self.PROFILE_SELECT)\
+                    .eq('auth_user_id', auth_user_id)\
+                    .limit(1)\
+                    .execute()
+                if not response.data:
+                    return None
+                return self._profile_from_embedded(response.data[0])
+            except Exception as e:
+                if self._is_relationship_error(e):
+                    logger.warning(f"Embedding de perfil no disponible, usando el RPC: {str(e)}")
+                    Searcher._profile_embedding_supported = False
+                else:
+                    logger.warning(f"Error en el perfil embebido de {auth_user_id}, usando el RPC: {str(e)}")
+        
+        elif self._profile_rpc_supported:
+            try:
+                response = self.supabase.rpc(PROFILE_RPC, {'p_auth_user_id': auth_user_id}).execute()
+                if not response.data:
+                    return None
+                return self._profile_from_rpc(response.data)
+            except Exception as e:
+                if getattr(e, 'code', None) == MISSING_FUNCTION_CODE:
+                    logger.warning(f"RPC {PROFILE_RPC} no disponible, usando consultas separadas: {str(e)}")
+                    Searcher._profile_rpc_supported = False
+                else:
+                    logger.warning(f"Error en {PROFILE_RPC} para {auth_user_id}, usando consultas separadas: {str(e)}")
+        
+        profile_data = self.get_user_profile_data(auth_user_id)
+        if not profile_data or not profile_data.get('user'):
+            return None
+        return UserProfile(
+            user=profile_data['user'],
+            contact_info=profile_data.get('contact_info'),
+            locations=profile_data.get('locations') or [],
+            production=profile_data.get('production') or [],
+            requests=profile_data.get('requests') or []
+        )
+    
+    @staticmethod
+    def _is_relationship_error(error: Exception) -> bool:
+        """Indica si PostgREST rechazó el select embebido por no encontrar la relación."""
+        return getattr(error, 'code', None) in RELATIONSHIP_ERROR_CODES \
+            or 'Could not find a relationship' in str(error)
+    
+    @staticmethod
+    def _profile_from_rpc(data: Dict[str, Any]) -> Optional[UserProfile]:
+        """Convierte la respuesta de PROFILE_RPC en un UserProfile (None si no hay usuario)."""
+        if isinstance(data, list):
+            data = data[0] if data else {}
+        if not data.get('usuario'):
+            return None
+        return UserProfile(
+            user=data['usuario'],
+            contact_info=data.get('info_contacto'),
+            locations=data.get('ubicaciones') or [],
+            production=data.get('origenes_botanicos') or [],
+            requests=data.get('solicitudes_apicultor') or []
+        )
+    
+    @staticmethod
+    def _profile_from_embedded(row: Dict[str, Any]) -> UserProfile:
+        """Separa una fila de usuarios con recursos embebidos en un UserProfile."""
+        user = dict(row)
+        contact = user.pop('info_contacto', None)
+        # La relación 1:1 llega como objeto; si no hay FK única llega como lista
+        if isinstance(contact, list):
+            contact = contact[0] if contact else None
+        return UserProfile(
+            user=user,
+            contact_info=contact,
+            locations=user.pop('ubicaciones', None) or [],
+            production=user.pop('origenes_botanicos', None) or [],
+            requests=user.pop('solicitudes_apicultor', None) or []
+        )
+
     def _get_profile_fallback(self, auth_user_id):
         """
         Método fallback para obtener datos del perfil usando consultas individuales
@@ -527,29 +860,28 @@ class Searcher:
         try:
             logger.info(f"Usando método fallback para obtener perfil de {auth_user_id}")
             
-            # Obtener datos del usuario
-            user_response = self.supabase.table('usuarios').select('*').eq('auth_user_id', auth_user_id).execute()
-            user_data = user_response.data[0] if user_response.data else None
+            # Lanzar en paralelo las cinco lecturas; cada una falla de forma aislada
+            results = self._fetch_concurrently({
+                table: self._select_by_user(table, auth_user_id)
+                for table in self.USER_TABLES
+            })
             
-            # Obtener información de contacto
-            contact_response = self.supabase.table('info_contacto').select('*').eq('auth_user_id', auth_user_id).execute()
-            contact_data = contact_response.data[0] if contact_response.data else None
-            
-            # Obtener ubicaciones
-            locations_response = self.supabase.table('ubicaciones').select('*').eq('auth_user_id', auth_user_id).execute()
-            locations_data = locations_response.data if locations_response.data else []
+            # Sin la fila de usuarios no hay perfil que mostrar
+            _, user_error = results['usuarios']
+            if user_error is not None:
+                raise user_error
             
-            # Obtener datos adicionales
-            producciones_response = self.supabase.table('origenes_botanicos').select('*').eq('auth_user_id', auth_user_id).execute()
-            solicitudes_response = self.supabase.table('solicitudes_apicultor').select('*').eq('auth_user_id', auth_user_id).execute()
+            users = self._rows(results['usuarios'])
+            contacts = self._rows(results['info_contacto'])
+            producciones = self._rows(results['origenes_botanicos'])
             
             return {
-                'user': user_data,
-                'contact_info': contact_data,
-                'locations': locations_data,
-                'production': producciones_response.data if producciones_response.data else [],
-                'botanical_origins': producciones_response.data if producciones_response.data else [],
-                'requests': solicitudes_response.data if solicitudes_response.data else []
+                'user': users[0] if users else None,
+                'contact_info': contacts[0] if contacts else None,
+                'locations': self._rows(results['ubicaciones']),
+                'production': producciones,
+                'botanical_origins': producciones,
+                'requests': self._rows(results['solicitudes_apicultor'])
             }
             
         except Exception as fallback_error:
@@ -10,11 +10,20 @@ Este módulo contiene las rutas relacionadas con:
 import logging
 import io
 import base64
-from flask import Blueprint, render_template, request, jsonify, url_for, redirect, send_file, session
+import json
+import time
+from flask import Blueprint, Response, render_template, request, jsonify, url_for, redirect, send_file, session, make_response
 from supabase_client import db
 from searcher import Searcher
 from auth_manager import AuthManager
-import segno
+from query_memo import memoized_select
+from search_index import search_index
+from search_cache import search_cache_stats
+from singleflight import singleflight_stats
+from schema_catalog import schema_catalog
+from identifier_resolver import resolver
+from suggest_index import suggest_index
+from batch_loader import get_loader
 
 logger = logging.getLogger(__name__)
 
@@ -23,7 +32,7 @@ search_bp = Blueprint('search', __name__, url_prefix='/api')
 search_web_bp = Blueprint('search_web', __name__)
 
 # Inicializar componentes
-searcher = Searcher(db.client)
+searcher = Searcher(db)
 
 # ====================
 # Rutas API de Búsqueda
@@ -40,22 +49,17 @@ def get_usuario_by_uuid_segment(uuid_segment):
         if len(uuid_segment) != 8:
             return jsonify({"error": "El segmento UUID debe tener 8 caracteres"}), 400
             
-        # Buscar usuarios y filtrar por segmento UUID en Python
-        response = db.client.table('usuarios')\
-            .select('auth_user_id')\
-            .execute()
+        if not searcher.uuid_prefix_bounds(uuid_segment):
+            return jsonify({"error": "El segmento UUID debe ser hexadecimal"}), 400
             
-        if not response.data:
-            return jsonify({"error": "No hay usuarios en la base de datos"}), 404
+        # Consulta de rango sobre auth_user_id (usa el índice, no descarga la tabla)
+        user = searcher.resolve_uuid_prefix(uuid_segment, 'auth_user_id')
             
-        # Filtrar usuarios cuyo ID comience con el segmento
-        matching_users = [user for user in response.data if str(user['auth_user_id']).startswith(uuid_segment)]
-            
-        if not matching_users:
+        if not user:
             return jsonify({"error": "Usuario no encontrado"}), 404
             
         # Retornar información del usuario encontrado
-        user_id = matching_users[0]['auth_user_id']
+        user_id = user['auth_user_id']
         return jsonify({
             "success": True,
             "user_id": user_id,
@@ -81,16 +85,16 @@ def get_current_user():
         # Obtener el ID del usuario actual desde la sesión
         current_user_id = session['user_id']
         
-        # Verificar que el usuario existe usando SupabaseClient
-        user_response = db.get_usuario(current_user_id)
+        # Verificar que el usuario existe (ya leído por AuthManager.load_current_user en este request)
+        user_rows = memoized_select(db.client, 'usuarios', '*', {'auth_user_id': current_user_id})
             
-        if not user_response.data:
+        if not user_rows:
             return jsonify({"success": False, "error": "Usuario no encontrado"}), 404
             
         return jsonify({
             "success": True,
             "user_id": current_user_id,
-            "user": user_response.data
+            "user": user_rows[0]
         })
         
     except Exception as e:
@@ -102,7 +106,7 @@ def get_my_profile_complete():
     """
     NUEVO endpoint API REST para Flutter.
     Obtiene datos COMPLETOS del usuario autenticado: usuarios + info_contacto.
-    Usa el MISMO método que /profile (searcher.get_user_profile_data)
+    Usa el MISMO cargador que /profile (searcher.load_profile)
     
     GET /api/profile/me
     
@@ -117,16 +121,16 @@ def get_my_profile_complete():
         current_user_id = session['user_id']
         logger.info(f"[API /profile/me] Obteniendo datos completos para: {current_user_id}")
         
-        # Usar el MISMO método que usa /profile para obtener datos completos
-        profile_data = searcher.get_user_profile_data(current_user_id)
+        # Usar el MISMO cargador que usa /profile
+        profile = searcher.load_profile(current_user_id)
         
-        if not profile_data:
+        if not profile:
             logger.warning(f"[API /profile/me] Usuario no encontrado: {current_user_id}")
             return jsonify({"success": False, "error": "Usuario no encontrado"}), 404
         
         # Combinar datos de usuario e info_contacto en un solo objeto
-        user_data = profile_data.get('user') or {}
-        contact_data = profile_data.get('contact_info') or {}
+        user_data = profile.user or {}
+        contact_data = profile.contact_info or {}
         
         # Crear objeto completo combinando ambas tablas
         complete_user = {
@@ -152,6 +156,158 @@ def get_my_profile_complete():
         logger.error(f"[API /profile/me] Error: {str(e)}")
         return jsonify({"success": False, "error": "Error interno del servidor"}), 500
 
+def hydrate_owners(auth_user_ids):
+    """
+    Datos del dueño (username, tipo_usuario, nombre, empresa) para una lista de usuarios.
+    
+    Usa los loaders del request: una consulta `in_()` por tabla, sin importar
+    cuántos resultados haya.
+    
+    Returns:
+        list: Un dict por id (o None si el id es None), en el mismo orden
+    """
+    usuarios = get_loader(db, 'usuarios', columns='auth_user_id,username,tipo_usuario')
+    contactos = get_loader(db, 'info_contacto', columns='auth_user_id,nombre_completo,nombre_empresa')
+    for auth_user_id in auth_user_ids:
+        contactos.queue(auth_user_id)
+    user_rows = usuarios.load_many(auth_user_ids)
+    contact_rows = contactos.load_many(auth_user_ids)
+    
+    owners = []
+    for auth_user_id, usuario, contacto in zip(auth_user_ids, user_rows, contact_rows):
+        if not auth_user_id:
+            owners.append(None)
+            continue
+        usuario, contacto = usuario or {}, contacto or {}
+        owners.append({
+            'auth_user_id': auth_user_id,
+            'username': usuario.get('username'),
+            'tipo_usuario': usuario.get('tipo_usuario'),
+            'nombre_completo': contacto.get('nombre_completo'),
+            'nombre_empresa': contacto.get('nombre_empresa')
+        })
+    return owners
+
+@search_bp.route('/search', methods=['GET'])
+def api_search():
+    """
+    Búsqueda global ordenada por relevancia (BM25) sobre el índice en memoria.
+    
+    GET /api/search?q=miel+ulmo&limit=20&tables=info_contacto,ubicaciones
+    
+    Returns:
+        JSON con resultados {table, id, score, matches, data}; `matches` trae
+        los campos coincidentes con las palabras marcadas con <mark>
+    """
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({"success": False, "error": "Parámetro q requerido"}), 400
+        
+        limit = min(request.args.get('limit', 20, type=int), 100)
+        tables = [t for t in request.args.get('tables', '').split(',') if t] or None
+        
+        results = search_index.search(query, limit=limit, tables=tables)
+        owners = hydrate_owners([r.data.get('auth_user_id') or (r.id if r.table == 'usuarios' else None)
+                                 for r in results])
+        return jsonify({
+            "success": True,
+            "query": query,
+            "count": len(results),
+            "results": [
+                {"table": r.table, "id": r.id, "score": r.score, "matches": r.matches, "data": r.data,
+                 "owner": owner}
+                for r, owner in zip(results, owners)
+            ]
+        })
+        
+    except Exception as e:
+        logger.error(f"Error en búsqueda global: {str(e)}")
+        return jsonify({"success": False, "error": "Error interno del servidor"}), 500
+
+@search_bp.route('/search/stream', methods=['GET'])
+def api_search_stream():
+    """
+    Búsqueda en todas las tablas con resultados en streaming (NDJSON).
+    
+    GET /api/search/stream?q=ulmo&limit_per_table=20&tables=ubicaciones,origenes_botanicos
+    
+    Returns:
+        Una línea JSON por tabla apenas termina su consulta
+        ({"table", "count", "results"} o {"table", "error"}) y una línea final
+        {"done": true, "tables", "elapsed_ms"}
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"success": False, "error": "Parámetro q requerido"}), 400
+    
+    limit_per_table = min(request.args.get('limit_per_table', 5, type=int), 100)
+    tables = [t for t in request.args.get('tables', '').split(',') if t] or None
+    
+    def generate():
+        started = time.perf_counter()
+        completed = 0
+        try:
+            for chunk in searcher.stream_all_tables(query, limit_per_table, tables):
+                completed += 1
+                if 'results' in chunk:
+                    chunk['count'] = len(chunk['results'])
+                yield json.dumps(chunk, default=str, ensure_ascii=False) + '\n'
+        except Exception as e:
+            logger.error(f"Error en búsqueda en streaming: {str(e)}")
+            yield json.dumps({"error": "Error interno del servidor"}) + '\n'
+        yield json.dumps({"done": True, "tables": completed,
+                          "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)}) + '\n'
+    
+    response = Response(generate(), mimetype='application/x-ndjson')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # que los proxies no acumulen la respuesta
+    return response
+
+@search_bp.route('/search/stats', methods=['GET'])
+def api_search_stats():
+    """
+    Estado de los caches de búsqueda.
+    
+    Returns:
+        JSON con aciertos/fallos del cache de resultados del Searcher, el
+        tamaño de los índices en memoria, el estado del catálogo de esquema y
+        las lecturas ahorradas por singleflight
+    """
+    try:
+        return jsonify({
+            "success": True,
+            "result_cache": search_cache_stats(),
+            "search_index": search_index.stats(),
+            "suggest_index": suggest_index.stats(),
+            "schema_catalog": schema_catalog.stats(),
+            "singleflight": singleflight_stats()
+        })
+    except Exception as e:
+        logger.error(f"Error obteniendo estadísticas de búsqueda: {str(e)}")
+        return jsonify({"success": False, "error": "Error interno del servidor"}), 500
+
+@search_bp.route('/resolve', methods=['GET'])
+def api_resolve():
+    """
+    Resuelve un identificador (UUID, segmento de QR, username o nombre).
+    
+    GET /api/resolve?q=550e8400
+    
+    Returns:
+        JSON con el tipo detectado, el usuario resuelto (si es único), los
+        candidatos por nombre y la duración de cada paso; los tiempos también
+        van en el header Server-Timing
+    """
+    try:
+        resolution = resolver.resolve(request.args.get('q', ''))
+        response = jsonify({"success": True, **resolution.to_dict()})
+        response.headers['Server-Timing'] = resolution.server_timing()
+        return response
+    except Exception as e:
+        logger.error(f"Error resolviendo identificador: {str(e)}")
+        return jsonify({"success": False, "error": "Error interno del servidor"}), 500
+
 @search_bp.route('/usuario/<uuid_segment>/qr', methods=['GET'])
 @AuthManager.login_required
 def get_user_qr(uuid_segment):
@@ -183,6 +339,7 @@ def get_user_qr(uuid_segment):
         
         # Generar URL del perfil
         profile_url = url_for('profile.profile', user_id=user_id, _external=True)
+        import segno  # import diferido: solo se carga al generar un QR
         qr = segno.make(profile_url)
         
         if qr_format == 'png':
@@ -233,73 +390,26 @@ def buscar():
         
         if search_term:
             try:
-                # Primero buscar por nombre_completo en info_contacto (mismo método que las sugerencias)
-                logger.info(f"[DEBUG /buscar] Buscando por nombre_completo en info_contacto")
+                # Clasificar una vez y ejecutar solo la búsqueda que corresponde
+                resolution = resolver.resolve(search_term)
+                logger.info(f"[DEBUG /buscar] '{search_term}' -> {resolution.kind}, "
+                            f"{len(resolution.candidates)} candidatos ({resolution.server_timing()})")
                 
-                # Buscar por coincidencia exacta (sin espacios extra)
-                try:
-                    contact_response = db.client.table('info_contacto') \
-                        .select('auth_user_id, nombre_completo') \
-                        .eq('nombre_completo', search_term) \
-                        .limit(1) \
-                        .execute()
-                    
-                    if contact_response.data:
-                        user_uuid = contact_response.data[0]['auth_user_id']
-                        logger.info(f"[DEBUG /buscar] Usuario encontrado por nombre_completo exacto: {user_uuid}")
-                        return redirect(url_for('profile.profile', user_id=user_uuid))
-                except Exception as exact_error:
-                    logger.info(f"[DEBUG /buscar] Búsqueda exacta falló: {str(exact_error)}")
-                
-                # Buscar ignorando espacios al inicio y final
-                try:
-                    trimmed_response = db.client.table('info_contacto') \
-                        .select('auth_user_id, nombre_completo') \
-                        .ilike('nombre_completo', f'{search_term.strip()}%') \
-                        .limit(1) \
-                        .execute()
-                    
-                    if trimmed_response.data:
-                        # Verificar si es una coincidencia exacta (ignorando espacios)
-                        found_name = trimmed_response.data[0]['nombre_completo'].strip()
-                        if found_name.lower() == search_term.strip().lower():
-                            user_uuid = trimmed_response.data[0]['auth_user_id']
-                            logger.info(f"[DEBUG /buscar] Usuario encontrado por nombre_completo (ignorando espacios): {user_uuid}")
-                            return redirect(url_for('profile.profile', user_id=user_uuid))
-                except Exception as trimmed_error:
-                    logger.info(f"[DEBUG /buscar] Búsqueda con trim falló: {str(trimmed_error)}")
-                
-                # Si no se encuentra por nombre exacto, buscar por identificador tradicional
-                logger.info(f"[DEBUG /buscar] Buscando por identificador tradicional")
-                user_info = searcher.find_user_by_identifier(search_term)
-                
-                if user_info:
-                    user_uuid = user_info['auth_user_id']
-                    logger.info(f"[DEBUG /buscar] Usuario encontrado por identificador: {user_uuid}")
-                    return redirect(url_for('profile.profile', user_id=user_uuid))
-                
-                # Búsqueda parcial por nombre_completo
-                logger.info(f"[DEBUG /buscar] Buscando parcialmente por nombre_completo")
-                partial_response = db.client.table('info_contacto') \
-                    .select('auth_user_id, nombre_completo') \
-                    .ilike('nombre_completo', f'%{search_term}%') \
-                    .limit(1) \
-                    .execute()
-                
-                if partial_response.data:
-                    user_uuid = partial_response.data[0]['auth_user_id']
-                    logger.info(f"[DEBUG /buscar] Usuario encontrado por búsqueda parcial: {user_uuid}")
-                    return redirect(url_for('profile.profile', user_id=user_uuid))
-                
-                # Fallback: buscar por username
-                logger.info(f"[DEBUG /buscar] Fallback: buscando por username")
-                search_results = searcher.search_users_by_query(search_term)
-                if search_results:
-                    logger.info(f"[DEBUG /buscar] Encontrados {len(search_results)} resultados por username")
-                    return render_template('pages/search.html', usuarios=search_results)
-                
-                logger.warning(f"[DEBUG /buscar] No se encontró usuario para: '{search_term}'")
-                return render_template('pages/search.html', error="Usuario no encontrado")
+                if resolution.user_id:
+                    response = redirect(url_for('profile.profile', user_id=resolution.user_id))
+                elif resolution.candidates:
+                    # tipo_usuario de todos los candidatos en una sola consulta
+                    with resolver.timed(resolution, 'hydrate'):
+                        owners = hydrate_owners([c['auth_user_id'] for c in resolution.candidates])
+                    usuarios = [{**c, 'tipo_usuario': o['tipo_usuario']} for c, o in zip(resolution.candidates, owners)]
+                    response = make_response(render_template('pages/search.html', usuarios=usuarios,
+                                                             search_term=search_term))
+                else:
+                    logger.warning(f"[DEBUG /buscar] No se encontró usuario para: '{search_term}'")
+                    response = make_response(render_template('pages/search.html', error="Usuario no encontrado",
+                                                             search_term=search_term))
+                response.headers['Server-Timing'] = resolution.server_timing()
+                return response
                 
             except Exception as e:
                 logger.error(f"[DEBUG /buscar] Error en búsqueda: {str(e)}", exc_info=True)
@@ -312,129 +422,21 @@ def sugerir():
     """
     Endpoint para obtener sugerencias de autocompletado de usuarios.
     
+    Se responde desde el índice de prefijos en memoria (suggest_index), sin
+    consultas a la base de datos.
+    
     GET /sugerir?q=<término>
     """
     try:
         termino = request.args.get('q', '').strip()
-        logger.info(f"[DEBUG /sugerir] Término recibido: '{termino}'")
-        
-        if not termino:
-            logger.info("[DEBUG /sugerir] Término vacío, retornando lista vacía")
-            return jsonify({'suggestions': []})
         
         if len(termino) < 2:
-            logger.info(f"[DEBUG /sugerir] Término muy corto ({len(termino)} chars), retornando lista vacía")
             return jsonify({'suggestions': []})
-            
-        logger.info(f"[DEBUG /sugerir] Iniciando búsqueda en tabla usuarios con término: '{termino}'")
-        
-        # Test de conexión a BD
-        try:
-            test_response = searcher.supabase.table('usuarios').select('auth_user_id').limit(1).execute()
-            logger.info(f"[DEBUG /sugerir] Test de conexión BD exitoso. Datos disponibles: {bool(test_response.data)}")
-            logger.info(f"[DEBUG /sugerir] Número de registros en test: {len(test_response.data) if test_response.data else 0}")
-            
-            # Test adicional: verificar auth.users
-            try:
-                auth_test = searcher.supabase.table('auth.users').select('id').limit(1).execute()
-                logger.info(f"[DEBUG /sugerir] Registros en auth.users: {len(auth_test.data) if auth_test.data else 0}")
-            except Exception as auth_error:
-                logger.info(f"[DEBUG /sugerir] No se puede acceder a auth.users: {str(auth_error)}")
-            
-            # Test de estructura de tabla
-            if test_response.data and len(test_response.data) > 0:
-                logger.info(f"[DEBUG /sugerir] Estructura primer registro: {test_response.data[0].keys()}")
-            else:
-                logger.warning("[DEBUG /sugerir] PROBLEMA: La tabla usuarios está VACÍA")
-                # Intentar buscar en info_contacto como alternativa
-                try:
-                    info_test = searcher.supabase.table('info_contacto').select('auth_user_id, nombre_completo').limit(5).execute()
-                    logger.info(f"[DEBUG /sugerir] Registros en info_contacto: {len(info_test.data) if info_test.data else 0}")
-                    if info_test.data:
-                        logger.info(f"[DEBUG /sugerir] Primer registro info_contacto: {info_test.data[0]}")
-                except Exception as info_error:
-                    logger.info(f"[DEBUG /sugerir] Error accediendo info_contacto: {str(info_error)}")
-                
-        except Exception as conn_error:
-            logger.error(f"[DEBUG /sugerir] Error de conexión BD: {str(conn_error)}")
-            return jsonify({"error": "Error de conexión a base de datos"}), 500
-            
-        # Búsqueda principal - buscar por nombre_completo en info_contacto
-        logger.info(f"[DEBUG /sugerir] Ejecutando query JOIN para obtener datos completos")
-        
-        try:            
-            # Debug: Primero verificar que hay datos en la tabla con el cliente directo
-            test_all = db.client.table('info_contacto') \
-                .select('auth_user_id, nombre_completo') \
-                .limit(3) \
-                .execute()
-            logger.info(f"[DEBUG /sugerir] Test general (cliente directo): {len(test_all.data) if test_all.data else 0} registros totales")
-            if test_all.data:
-                logger.info(f"[DEBUG /sugerir] Primer registro: {test_all.data[0]}")
-            
-            # Query con ilike usando cliente directo
-            logger.info(f"[DEBUG /sugerir] Ejecutando con cliente directo: .ilike('nombre_completo', '%{termino}%')")
-            response = db.client.table('info_contacto') \
-                .select('auth_user_id, nombre_completo, nombre_empresa') \
-                .ilike('nombre_completo', f'%{termino}%') \
-                .limit(10) \
-                .execute()
-                
-            logger.info(f"[DEBUG /sugerir] Response ilike (cliente directo): {len(response.data) if response.data else 0} resultados")
-            
-            contacts = response.data if hasattr(response, 'data') else []
-            logger.info(f"[DEBUG /sugerir] Contactos finales encontrados: {len(contacts)}")
-            
-            if contacts:
-                logger.info(f"[DEBUG /sugerir] Primer contacto encontrado: {contacts[0]}")
-                
-        except Exception as query_error:
-            logger.error(f"[DEBUG /sugerir] Error en query info_contacto: {str(query_error)}")
-            contacts = []
-        
-        # Convertir contactos a formato de usuarios para mantener compatibilidad
-        users = []
-        for contact in contacts:
-            # Obtener tipo_usuario de la tabla usuarios usando cliente directo
-            tipo_usuario = 'Usuario'
-            try:
-                user_response = db.client.table('usuarios') \
-                    .select('tipo_usuario') \
-                    .eq('auth_user_id', contact['auth_user_id']) \
-                    .single() \
-                    .execute()
-                if user_response.data:
-                    tipo_usuario = user_response.data.get('tipo_usuario', 'Usuario')
-            except:
-                pass  # Usar valor por defecto si no se encuentra
-            
-            users.append({
-                'auth_user_id': contact['auth_user_id'],
-                'username': contact['nombre_completo'],  # Usar nombre_completo como username para compatibilidad
-                'tipo_usuario': tipo_usuario,
-                'status': 'active'
-            })
-        
-        logger.info(f"[DEBUG /sugerir] Usuarios procesados: {len(users)}")
-        
-        if users:
-            logger.info(f"[DEBUG /sugerir] Primer usuario: {users[0]}")
-        
-        suggestions = []
-        for i, user in enumerate(users):
-            logger.info(f"[DEBUG /sugerir] Procesando usuario {i+1}: {user}")
-            suggestion = {
-                'id': user['auth_user_id'],
-                'nombre': user.get('username', ''),
-                'especialidad': user.get('tipo_usuario', 'Apicultor')
-            }
-            suggestions.append(suggestion)
-            logger.info(f"[DEBUG /sugerir] Sugerencia creada: {suggestion}")
         
-        logger.info(f"[DEBUG /sugerir] Total sugerencias generadas: {len(suggestions)}")
+        suggestions = suggest_index.suggest(termino, limit=10)
+        logger.debug(f"[/sugerir] '{termino}': {len(suggestions)} sugerencias")
         return jsonify({'suggestions': suggestions})
         
     except Exception as e:
-        logger.error(f"[DEBUG /sugerir] ERROR CRÍTICO: {str(e)}", exc_info=True)
-        logger.error(f"[DEBUG /sugerir] Tipo de error: {type(e)}")
+        logger.error(f"[/sugerir] Error: {str(e)}", exc_info=True)
         return jsonify({"error": f"Error al obtener sugerencias: {str(e)}"}), 500
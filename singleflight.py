@@ -0,0 +1,135 @@
+"""
+Agrupación de lecturas idénticas en curso (singleflight) para MeliAPP.
+
+Este módulo contiene:
+- SingleFlight: ejecuta una sola vez una lectura pedida en paralelo por
+  varios threads con la misma clave; todos reciben el mismo resultado
+- SingleFlightError: error de los que esperaban una lectura que falló
+- coalesced: decorador para métodos de lectura del Searcher
+- searcher_flights / lote_flights: grupos globales
+- singleflight_stats: llamadas hechas y ahorradas por grupo
+
+Cuando se escanea el QR de una etiqueta popular llegan decenas de
+/profile/<uuid> idénticos en milisegundos; solo el primero va a Supabase.
+No es un cache: en cuanto termina la lectura, la siguiente vuelve a consultar.
+"""
+
+import copy
+import logging
+import threading
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlightError(RuntimeError):
+    """La lectura compartida falló; el error original queda en `__cause__`."""
+
+
+class _Call:
+    """Lectura en curso: el primer thread la ejecuta, el resto espera `done`."""
+
+    __slots__ = ('done', 'result', 'error', 'finished', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.finished = False  # True si fn() devolvió un resultado
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Grupo de lecturas agrupables por clave.
+
+    Es seguro para uso concurrente. Los que esperan reciben una copia del
+    resultado, así nadie modifica el objeto de otro request.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executed = 0  # lecturas que fueron a la base de datos
+        self.saved = 0  # llamadas que reutilizaron una lectura en curso
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Ejecuta `fn()` o, si ya hay una lectura en curso con `key`, espera su resultado.
+
+        Si la lectura falla, cada uno de los que esperaban recibe un
+        SingleFlightError nuevo encadenado al error original. Si el thread que
+        la ejecutaba se interrumpió (GeneratorExit, KeyboardInterrupt...), los
+        que esperaban vuelven a intentarlo.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.saved += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.finished:
+                return copy.deepcopy(call.result)
+            if isinstance(call.error, Exception):
+                raise SingleFlightError(f"Lectura compartida {key!r} ({self.name}) falló: {call.error}") from call.error
+            return self.do(key, fn)
+
+        try:
+            call.result = fn()
+            call.finished = True
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+            if call.waiters:
+                logger.debug(f"Singleflight {self.name}: {call.waiters} llamadas reutilizaron {key!r}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Lecturas ejecutadas, ahorradas y en curso."""
+        with self._lock:
+            total = self.executed + self.saved
+            return {
+                'executed': self.executed,
+                'saved': self.saved,
+                'in_flight': len(self._calls),
+                'saved_rate': round(self.saved / total, 4) if total else 0.0
+            }
+
+
+# Grupos globales
+searcher_flights = SingleFlight('searcher')
+lote_flights = SingleFlight('lotes')
+
+
+def coalesced(group: SingleFlight) -> Callable:
+    """
+    Agrupa las llamadas concurrentes idénticas a un método del Searcher.
+
+    La clave es (método, cliente, argumentos), para no compartir lecturas
+    hechas con clientes distintos (RLS).
+    """
+    def decorator(method: Callable) -> Callable:
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            key = (method.__name__, id(self.supabase), args, tuple(sorted(kwargs.items())))
+            return group.do(key, lambda: method(self, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def singleflight_stats() -> Dict[str, Dict[str, Any]]:
+    """Estadísticas de todos los grupos globales."""
+    return {group.name: group.stats() for group in (searcher_flights, lote_flights)}
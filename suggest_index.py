@@ -0,0 +1,191 @@
+"""
+Autocompletado en memoria para /sugerir de MeliAPP.
+
+Este módulo contiene:
+- SuggestIndex: arreglo ordenado de nombres normalizados (búsqueda por
+  prefijo con bisect) con tipo_usuario desnormalizado en cada entrada
+- suggest_index: instancia global, construida por el warmup/cron y
+  actualizada con los listeners de escritura
+
+Cada pulsación en el buscador se responde sin tocar la base de datos (salvo
+mientras el índice no está construido, cuando se usa `ilike`).
+"""
+
+import logging
+import time
+from bisect import bisect_left, insort
+from typing import Any, Dict, List, Optional, Tuple
+
+from batch_loader import get_loader
+from search_index import InMemoryIndex, fetch_rows, fetch_tables, index_executor, search_rows, tokenize
+from supabase_client import db
+from modify_DB import register_write_listener
+from warmup import register_warmup_step
+
+logger = logging.getLogger(__name__)
+
+# Tablas cuyas escrituras afectan a las sugerencias
+SUGGEST_TABLES = ('info_contacto', 'usuarios')
+
+
+class SuggestIndex(InMemoryIndex):
+    """
+    Índice de prefijos sobre info_contacto.nombre_completo.
+
+    Por cada nombre se guarda una clave por palabra inicial ("jose perez",
+    "perez"), así "per" sugiere "José Pérez" como hacía el `ilike '%term%'`.
+    """
+
+    name = 'índice de sugerencias'
+
+    def __init__(self):
+        super().__init__()
+        self._reset()
+
+    def _reset(self):
+        self._keys: List[Tuple[str, str]] = []  # (clave normalizada, auth_user_id), ordenado
+        self._entries: Dict[str, Dict[str, Any]] = {}  # auth_user_id -> {'nombre', 'tipo_usuario', 'keys'}
+
+    @staticmethod
+    def _name_keys(nombre: Any) -> List[str]:
+        words = tokenize(nombre)
+        return [' '.join(words[i:]) for i in range(len(words))]
+
+    def _set_entry(self, auth_user_id: str, nombre: Any = None, tipo_usuario: Any = None):
+        """
+        Crea o actualiza la entrada de un usuario. Debe llamarse con el lock tomado.
+
+        `nombre`/`tipo_usuario` en None conservan el valor actual.
+        """
+        entry = self._entries.setdefault(auth_user_id, {'nombre': None, 'tipo_usuario': None, 'keys': []})
+        if tipo_usuario is not None:
+            entry['tipo_usuario'] = tipo_usuario
+        if nombre is not None and nombre != entry['nombre']:
+            for key in entry['keys']:
+                i = bisect_left(self._keys, (key, auth_user_id))
+                if i < len(self._keys) and self._keys[i] == (key, auth_user_id):
+                    del self._keys[i]
+            entry['nombre'] = nombre
+            entry['keys'] = self._name_keys(nombre)
+            for key in entry['keys']:
+                insort(self._keys, (key, auth_user_id))
+
+    def _build(self):
+        """Lee nombres y tipos de usuario y reemplaza el índice."""
+        rows = fetch_tables({'contacts': ('info_contacto', 'auth_user_id,nombre_completo'),
+                             'users': ('usuarios', 'auth_user_id,tipo_usuario')})
+        contact_rows, user_rows = rows['contacts'], rows['users']
+
+        with self._lock:
+            self._reset()
+            tipos = {str(u['auth_user_id']): u.get('tipo_usuario') for u in user_rows if u.get('auth_user_id')}
+            entries = {}
+            for contact in contact_rows:
+                auth_user_id = str(contact.get('auth_user_id') or '')
+                if auth_user_id and contact.get('nombre_completo'):
+                    keys = self._name_keys(contact['nombre_completo'])
+                    entries[auth_user_id] = {'nombre': contact['nombre_completo'],
+                                             'tipo_usuario': tipos.get(auth_user_id), 'keys': keys}
+            self._entries = entries
+            self._keys = sorted((key, uid) for uid, entry in entries.items() for key in entry['keys'])
+            self.built_at = time.time()
+        logger.info(f"Índice de sugerencias construido: {len(self._entries)} nombres")
+
+    def refresh_user(self, table: str, auth_user_id: str):
+        """Actualiza la entrada de un usuario tras una escritura en `table`."""
+        if self.built_at is None or table not in SUGGEST_TABLES:
+            return
+        column = 'nombre_completo' if table == 'info_contacto' else 'tipo_usuario'
+        try:
+            rows = fetch_rows(table, f'auth_user_id,{column}', auth_user_id=auth_user_id)
+        except Exception as e:
+            logger.warning(f"No se pudo actualizar sugerencias de {auth_user_id}: {e}")
+            return
+        value = rows[0].get(column) if rows else None
+        with self._lock:
+            if table == 'info_contacto':
+                self._set_entry(str(auth_user_id), nombre=value or '')
+            else:
+                self._set_entry(str(auth_user_id), tipo_usuario=value or '')
+
+    def suggest(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Sugerencias de usuarios cuyo nombre tiene una palabra que empieza con `query`.
+
+        Los nombres que empiezan con la consulta van primero. Si el índice aún
+        no está construido se responde con `ilike` sobre nombre_completo.
+
+        Returns:
+            list: [{'id', 'nombre', 'especialidad'}] en el formato que espera search.html
+        """
+        prefix = ' '.join(tokenize(query))
+        if not prefix:
+            return []
+        if not self.ready():
+            return self._fallback_suggest(query, prefix, limit)
+
+        with self._lock:
+            matches = {}
+            i = bisect_left(self._keys, (prefix, ''))
+            while i < len(self._keys) and self._keys[i][0].startswith(prefix) and len(matches) < limit * 3:
+                key, auth_user_id = self._keys[i]
+                entry = self._entries[auth_user_id]
+                starts_name = bool(entry['keys']) and key == entry['keys'][0]
+                matches[auth_user_id] = matches.get(auth_user_id, False) or starts_name
+                i += 1
+
+            ranked = sorted(matches.items(), key=lambda item: (not item[1], self._entries[item[0]]['keys'][0]))[:limit]
+            missing = [uid for uid, _ in ranked if self._entries[uid]['tipo_usuario'] is None]
+
+        # Entradas creadas sin tipo_usuario (p. ej. un contacto nuevo): una sola consulta in_(), fuera del lock
+        if missing:
+            loader = get_loader(db, 'usuarios', columns='auth_user_id,tipo_usuario')
+            usuarios = loader.load_many(missing)
+            with self._lock:
+                for uid, usuario in zip(missing, usuarios):
+                    if uid in self._entries:
+                        self._entries[uid]['tipo_usuario'] = (usuario or {}).get('tipo_usuario') or ''
+
+        with self._lock:
+            return [{
+                'id': auth_user_id,
+                'nombre': self._entries[auth_user_id]['nombre'],
+                'especialidad': self._entries[auth_user_id]['tipo_usuario'] or 'Usuario'
+            } for auth_user_id, _ in ranked if auth_user_id in self._entries]
+
+    def _fallback_suggest(self, query: str, prefix: str, limit: int) -> List[Dict[str, Any]]:
+        """Respaldo sin índice: `ilike '%query%'` y tipo_usuario con una sola consulta in_()."""
+        contacts = [c for c in search_rows('info_contacto', ('nombre_completo',), ' '.join(query.split()),
+                                           'auth_user_id,nombre_completo', limit=limit)
+                    if c.get('auth_user_id') and c.get('nombre_completo')]
+        contacts.sort(key=lambda c: (not ' '.join(tokenize(c['nombre_completo'])).startswith(prefix),
+                                     ' '.join(tokenize(c['nombre_completo']))))
+        loader = get_loader(db, 'usuarios', columns='auth_user_id,tipo_usuario')
+        usuarios = loader.load_many([str(c['auth_user_id']) for c in contacts])
+        return [{
+            'id': str(contact['auth_user_id']),
+            'nombre': contact['nombre_completo'],
+            'especialidad': (usuario or {}).get('tipo_usuario') or 'Usuario'
+        } for contact, usuario in zip(contacts, usuarios)]
+
+    def stats(self) -> Dict[str, Any]:
+        """Tamaño del índice."""
+        with self._lock:
+            return {'names': len(self._entries), 'keys': len(self._keys), 'built_at': self.built_at}
+
+
+# Instancia global
+suggest_index = SuggestIndex()
+
+
+@register_write_listener
+def _refresh_suggest_index(table: str, action: str, auth_user_id: Optional[str]):
+    """Mantiene las sugerencias al día tras escrituras (en segundo plano)."""
+    if auth_user_id and table in SUGGEST_TABLES:
+        index_executor.submit(suggest_index.refresh_user, table, auth_user_id)
+
+
+@register_warmup_step('suggest_index')
+def _warm_suggest_index(flask_app):
+    """Construye el índice de sugerencias si falta o está vencido (warmup y cron)."""
+    return {'built': suggest_index.build_if_stale(), **suggest_index.stats()}
@@ -0,0 +1,35 @@
+-- Perfil completo de un usuario en una sola llamada (Searcher.load_profile).
+--
+-- Devuelve lo mismo que get_user_profile (usuario, info_contacto, ubicaciones)
+-- más origenes_botanicos y solicitudes_apicultor. La función es SECURITY
+-- INVOKER: las tablas hijas se leen con las políticas RLS de quien llama, igual
+-- que las consultas separadas que reemplaza, mientras que usuario, contacto y
+-- ubicaciones siguen saliendo de get_user_profile (SECURITY DEFINER), así un
+-- visitante anónimo ve el mismo perfil público que antes.
+
+create or replace function public.get_user_profile_full(p_auth_user_id uuid)
+returns jsonb
+language sql
+stable
+security invoker
+set search_path = public
+as $$
+    select case
+        when profile.data is null then null
+        else profile.data || jsonb_build_object(
+            'origenes_botanicos', coalesce((
+                select jsonb_agg(to_jsonb(o))
+                from public.origenes_botanicos o
+                where o.auth_user_id = p_auth_user_id
+            ), '[]'::jsonb),
+            'solicitudes_apicultor', coalesce((
+                select jsonb_agg(to_jsonb(s))
+                from public.solicitudes_apicultor s
+                where s.auth_user_id = p_auth_user_id
+            ), '[]'::jsonb)
+        )
+    end
+    from (select public.get_user_profile(p_auth_user_id)::jsonb as data) as profile;
+$$;
+
+grant execute on function public.get_user_profile_full(uuid) to anon, authenticated;
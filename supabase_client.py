@@ -6,10 +6,150 @@ from dotenv import load_dotenv
 import os
 import httpx
 import json
+import threading
+import importlib.util
+import time
+from cache_utils import TTLCache
+from jwt_utils import get_token_expiry, token_fingerprint
+
+# Configuración del pool de conexiones compartido
+HTTP2_AVAILABLE = importlib.util.find_spec('h2') is not None
+POOL_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv('SUPABASE_POOL_MAX_CONNECTIONS', 50)),
+    max_keepalive_connections=int(os.getenv('SUPABASE_POOL_MAX_KEEPALIVE', 20)),
+    keepalive_expiry=float(os.getenv('SUPABASE_POOL_KEEPALIVE_EXPIRY', 60))
+)
+HTTP_TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+
+_shared_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_shared_transport() -> httpx.HTTPTransport:
+    """
+    Devuelve el transporte HTTP único del proceso.
+    
+    Mantiene el pool de conexiones keep-alive (HTTP/2 si `h2` está instalado)
+    que comparten el cliente anónimo y todos los clientes autenticados, de modo
+    que la conexión TLS a Supabase se establece una sola vez por instancia.
+    """
+    global _shared_transport
+    
+    if _shared_transport is None:
+        with _transport_lock:
+            if _shared_transport is None:
+                _shared_transport = httpx.HTTPTransport(
+                    http2=HTTP2_AVAILABLE,
+                    limits=POOL_LIMITS,
+                    retries=1
+                )
+    return _shared_transport
+
+
+def create_http_client(base_url: str = '', headers: dict = None) -> httpx.Client:
+    """
+    Crea un cliente httpx liviano sobre el transporte compartido.
+    
+    Cada cliente conserva sus propios headers (por ejemplo el bearer token del
+    usuario) pero no abre conexiones nuevas: todas salen del pool compartido.
+    """
+    return httpx.Client(
+        base_url=base_url,
+        headers=headers or {},
+        timeout=HTTP_TIMEOUT,
+        transport=get_shared_transport(),
+        follow_redirects=True
+    )
+
+
+def create_authenticated_client(access_token: str):
+    """
+    Crea un cliente PostgREST autenticado con el token del usuario.
+    
+    Reemplaza a `create_client()` por request: solo se cambia el header
+    Authorization, la conexión se reutiliza desde el pool compartido.
+    
+    Args:
+        access_token: JWT de Supabase del usuario
+        
+    Returns:
+        SyncPostgrestClient: Cliente con `.table()`, `.rpc()` y `.from_()`
+    """
+    from postgrest import SyncPostgrestClient
+    
+    url = os.getenv('SUPABASE_URL')
+    key = os.getenv('SUPABASE_KEY')
+    if not url or not key:
+        raise ValueError("SUPABASE_URL y SUPABASE_KEY deben estar configurados")
+    
+    rest_url = f"{url.rstrip('/')}/rest/v1"
+    headers = {
+        'apikey': key,
+        'Authorization': f'Bearer {access_token}'
+    }
+    return SyncPostgrestClient(
+        rest_url,
+        headers=headers,
+        http_client=create_http_client(rest_url, headers)
+    )
+
+
+# Cache de clientes autenticados: clave = hash del token, expira con el `exp` del JWT
+AUTH_CLIENT_CACHE_SIZE = int(os.getenv('SUPABASE_AUTH_CLIENT_CACHE_SIZE', 256))
+AUTH_CLIENT_DEFAULT_TTL = 3600  # Si el token no trae `exp`
+
+_authenticated_clients = TTLCache(maxsize=AUTH_CLIENT_CACHE_SIZE, ttl=AUTH_CLIENT_DEFAULT_TTL)
+
+
+def get_authenticated_client_for_token(access_token: str):
+    """
+    Obtiene (o crea) el cliente PostgREST autenticado para un token.
+    
+    Los clientes se guardan en un cache LRU acotado indexado por el hash del
+    token y se desalojan automáticamente al llegar el `exp` del JWT, de modo
+    que todas las llamadas dentro de la vida del token reutilizan el mismo
+    cliente ya inicializado.
+    """
+    if not access_token:
+        return None
+    
+    key = token_fingerprint(access_token)
+    client = _authenticated_clients.get(key)
+    if client is None:
+        expires_at = get_token_expiry(access_token)
+        if expires_at is not None and expires_at <= time.time():
+            # Token vencido: no cachear, PostgREST responderá con el error de JWT
+            return create_authenticated_client(access_token)
+        client = create_authenticated_client(access_token)
+        _authenticated_clients.set(key, client, expires_at)
+    return client
+
+
+def evict_authenticated_client(access_token: str) -> None:
+    """Elimina del cache el cliente asociado a un token (logout o refresh)."""
+    if access_token:
+        _authenticated_clients.pop(token_fingerprint(access_token))
+
+
+def _client_options():
+    """Opciones de `create_client` para que use el pool compartido, si la versión lo soporta."""
+    try:
+        from supabase import ClientOptions
+        return ClientOptions(httpx_client=create_http_client())
+    except (ImportError, TypeError):
+        return None
 
 class SupabaseClient:
+    """
+    Cliente Supabase compartido (singleton) con inicialización diferida.
+    
+    Crear la instancia no hace I/O: el cliente real se construye en el primer
+    acceso a `client` (o a `table`, `rpc`, `auth`). La verificación de
+    conectividad se hace explícitamente con `check_connectivity` (ver /api/health).
+    """
     _instance = None
-    client = None
+    _client = None
+    _client_lock = threading.Lock()
     
     def __new__(cls):
         if cls._instance is None:
@@ -18,37 +158,79 @@ class SupabaseClient:
         return cls._instance
     
     def _initialize(self):
-        """Inicializa el cliente de Supabase."""
+        """Lee la configuración de Supabase. No crea el cliente ni abre conexiones."""
         # Intentar cargar variables de entorno desde .env (para desarrollo local)
         # Si no existe el archivo, continuar (para producción en Vercel)
         load_dotenv(".env")
         
+        self.url = os.getenv('SUPABASE_URL')
+        self.key = os.getenv('SUPABASE_KEY')
+        self.init_seconds = None
+    
+    @property
+    def client(self) -> Client:
+        """Cliente Supabase real, creado en el primer acceso."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._create_client()
+        return self._client
+    
+    def _create_client(self) -> Client:
+        """Construye el cliente de Supabase sobre el pool HTTP compartido."""
         try:
-            self.url = os.getenv('SUPABASE_URL')
-            self.key = os.getenv('SUPABASE_KEY')
-            
-            print(f"[DEBUG SUPABASE] URL configurada: {bool(self.url)}")
-            print(f"[DEBUG SUPABASE] KEY configurada: {bool(self.key)}")
-            
             if not self.url or not self.key:
                 raise ValueError("SUPABASE_URL y SUPABASE_KEY deben estar configurados")
             
-            print(f"[DEBUG SUPABASE] Creando cliente con URL: {self.url[:30]}...")
-            self.client = create_client(self.url, self.key)
-            
-            # Test de conexión
-            try:
-                test_response = self.client.table('usuarios').select('auth_user_id').limit(1).execute()
-                print(f"[DEBUG SUPABASE] Test de conexión exitoso. Registros disponibles: {len(test_response.data) if test_response.data else 0}")
-            except Exception as test_error:
-                print(f"[DEBUG SUPABASE] WARNING - Test de conexión falló: {test_error}")
+            started = time.perf_counter()
+            options = _client_options()
+            if options is not None:
+                client = create_client(self.url, self.key, options=options)
+            else:
+                client = create_client(self.url, self.key)
+            self.init_seconds = time.perf_counter() - started
             
-            print("✅ Cliente Supabase inicializado correctamente")
+            print(f"✅ Cliente Supabase inicializado en {self.init_seconds * 1000:.1f} ms")
+            return client
             
         except Exception as e:
             print(f"❌ Error inicializando cliente Supabase: {e}")
             raise ValueError(f"Error al conectar con Supabase: {str(e)}")
     
+    @property
+    def is_initialized(self) -> bool:
+        """Indica si el cliente real ya fue creado."""
+        return self._client is not None
+    
+    def table(self, table_name: str):
+        """Atajo a `client.table`, para usar la instancia como cliente."""
+        return self.client.table(table_name)
+    
+    def rpc(self, fn: str, params: dict = None, **kwargs):
+        """Atajo a `client.rpc`, para usar la instancia como cliente."""
+        return self.client.rpc(fn, params or {}, **kwargs)
+    
+    @property
+    def auth(self):
+        """Atajo a `client.auth`."""
+        return self.client.auth
+    
+    def check_connectivity(self):
+        """
+        Verifica la conexión real con Supabase con una consulta mínima.
+        
+        Returns:
+            tuple: (ok: bool, detalles: dict) con la latencia de la consulta en ms
+        """
+        started = time.perf_counter()
+        try:
+            response = self.client.table('usuarios').select('auth_user_id').limit(1).execute()
+            latency_ms = round((time.perf_counter() - started) * 1000, 1)
+            return response.data is not None, {'latency_ms': latency_ms}
+        except Exception as e:
+            latency_ms = round((time.perf_counter() - started) * 1000, 1)
+            return False, {'latency_ms': latency_ms, 'error': str(e)}
+    
     def test_connection(self):
         """
         Prueba la conexión con Supabase.
@@ -66,8 +248,10 @@ class SupabaseClient:
         if not self.key.startswith('ey'):
             return False, "Error: Clave de API de Supabase inválida"
             
-        # Verificar que el cliente se inicializó
-        if not hasattr(self, 'client') or not self.client:
+        # Verificar que el cliente se puede inicializar
+        try:
+            self.client
+        except ValueError:
             return False, "Error: No se pudo inicializar el cliente de Supabase"
             
         # Si llegamos aquí, la conexión es exitosa
@@ -164,8 +348,6 @@ class SupabaseClient:
             dict: Respuesta de la función
         """
         try:
-            import requests
-            
             # Construir la URL de la Edge Function
             edge_url = f"{self.url}/functions/v1/{function_name}"
             
@@ -179,8 +361,8 @@ class SupabaseClient:
                 'apikey': token
             }
             
-            # Realizar la petición síncrona
-            response = requests.post(
+            # Realizar la petición síncrona sobre el pool compartido
+            response = create_http_client().post(
                 edge_url,
                 json=payload,
                 headers=headers
@@ -214,7 +396,11 @@ def get_service_client():
         return None
     
     try:
-        service_client = create_client(url, service_key)
+        options = _client_options()
+        if options is not None:
+            service_client = create_client(url, service_key, options=options)
+        else:
+            service_client = create_client(url, service_key)
         print("✅ Service client creado exitosamente")
         return service_client
     except Exception as e:
@@ -6,8 +6,11 @@ Este módulo contiene las rutas relacionadas con:
 - Operaciones directas del cliente Supabase
 """
 
+import hmac
 import logging
-from flask import Blueprint, jsonify
+import os
+import time
+from flask import Blueprint, jsonify, request, current_app
 from supabase_client import db
 
 logger = logging.getLogger(__name__)
@@ -15,6 +18,50 @@ logger = logging.getLogger(__name__)
 # Crear blueprint para rutas de SupabaseClient
 supabase_bp = Blueprint('supabase', __name__, url_prefix='/api')
 
+@supabase_bp.route('/health', methods=['GET'])
+def health():
+    """
+    Chequeo de salud con conectividad real contra Supabase.
+    
+    El cliente se crea de forma diferida, así que esta ruta (o el warmup de la
+    plataforma) es donde se paga la primera conexión, no el import del módulo.
+    
+    GET /api/health
+    """
+    was_initialized = db.is_initialized
+    started = time.perf_counter()
+    ok, details = db.check_connectivity()
+    return jsonify({
+        "success": ok,
+        "database_status": "online" if ok else "offline",
+        "client_was_initialized": was_initialized,
+        "client_init_ms": round(db.init_seconds * 1000, 1) if db.init_seconds is not None else None,
+        "total_ms": round((time.perf_counter() - started) * 1000, 1),
+        **details
+    }), 200 if ok else 503
+
+@supabase_bp.route('/warmup', methods=['GET', 'POST'])
+def warmup_instance():
+    """
+    Precalienta la instancia (catálogo, plantillas, conexiones y caches).
+    
+    Pensado para el hook de warmup/cron de la plataforma. Exige
+    `Authorization: Bearer <CRON_SECRET>`; sin CRON_SECRET configurado la ruta
+    queda deshabilitada, para que nadie pueda dispararla en bucle.
+    
+    GET|POST /api/warmup?steps=templates,connections
+    """
+    cron_secret = os.getenv('CRON_SECRET')
+    if not cron_secret:
+        return jsonify({"success": False, "error": "Warmup deshabilitado: configurar CRON_SECRET"}), 503
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {cron_secret}"):
+        return jsonify({"success": False, "error": "No autorizado"}), 401
+    
+    from warmup import warmup
+    steps = request.args.get('steps')
+    report = warmup(current_app._get_current_object(), only=steps.split(',') if steps else None)
+    return jsonify(report), 200 if report['success'] else 207
+
 @supabase_bp.route('/test', methods=['GET'])
 def test_connection():
     """
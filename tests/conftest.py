@@ -0,0 +1,65 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    """Consulta encadenable al estilo postgrest-py que registra lo pedido."""
+
+    def __init__(self, client, target, params=None):
+        self.client = client
+        self.target = target
+        self.params = params
+        self.ops = []
+
+    def __getattr__(self, name):
+        def op(*args, **kwargs):
+            self.ops.append((name, args, kwargs))
+            return self
+        return op
+
+    def execute(self):
+        self.client.requests.append(self)
+        if self.params is not None:
+            result = self.client.rpcs[self.target]
+            return FakeResponse(result(self.params) if callable(result) else result)
+        rows = [dict(row) for row in self.client.tables.get(self.target, [])]
+        for name, args, _ in self.ops:
+            if name == 'eq':
+                rows = [row for row in rows if row.get(args[0]) == args[1]]
+            elif name == 'in_':
+                rows = [row for row in rows if row.get(args[0]) in args[1]]
+            elif name == 'limit':
+                rows = rows[:args[0]]
+        return FakeResponse(rows, count=len(rows))
+
+
+class FakeClient:
+    """Cliente Supabase falso: tablas en memoria, RPCs fijos y registro de requests."""
+
+    def __init__(self, tables=None, rpcs=None):
+        self.tables = tables or {}
+        self.rpcs = rpcs or {}
+        self.requests = []
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    from_ = table
+
+    def rpc(self, name, params=None):
+        return FakeQuery(self, name, params or {})
+
+
+@pytest.fixture
+def fake_client():
+    return FakeClient
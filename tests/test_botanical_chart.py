@@ -0,0 +1,87 @@
+import gzip
+import json
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('werkzeug')
+
+from flask import Flask
+
+import botanical_chart
+from botanical_chart import PrebuiltResponse, botanical_bp
+
+COMMUNES = {'success': True, 'communes': [f'Comuna {i}' for i in range(100)], 'total': 100}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(botanical_chart, '_prebuilt', {})
+    monkeypatch.setattr(botanical_chart, '_prebuilt_communes', PrebuiltResponse(COMMUNES))
+    app = Flask(__name__)
+    app.register_blueprint(botanical_bp)
+    return app.test_client()
+
+
+def _get(client, **headers):
+    return client.get('/api/botanical-classes', headers=headers)
+
+
+def test_identity_response_without_accept_encoding(client):
+    response = _get(client)
+
+    assert response.status_code == 200
+    assert 'Content-Encoding' not in response.headers
+    assert json.loads(response.data) == COMMUNES
+    assert response.headers['ETag'] == botanical_chart._prebuilt_communes.etag
+    assert response.headers['Vary'] == 'Accept-Encoding'
+
+
+def test_gzip_response_has_its_own_etag(client):
+    response = _get(client, **{'Accept-Encoding': 'br, gzip;q=0.8'})
+
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(response.data)) == COMMUNES
+    assert response.headers['ETag'] == botanical_chart._prebuilt_communes.gzip_etag
+    assert response.headers['ETag'] != botanical_chart._prebuilt_communes.etag
+
+
+@pytest.mark.parametrize('accept_encoding', ['gzip;q=0', 'identity', 'br'])
+def test_gzip_not_used_when_not_accepted(client, accept_encoding):
+    response = _get(client, **{'Accept-Encoding': accept_encoding})
+
+    assert 'Content-Encoding' not in response.headers
+    assert response.headers['ETag'] == botanical_chart._prebuilt_communes.etag
+
+
+def test_gzip_accepted_through_wildcard(client):
+    response = _get(client, **{'Accept-Encoding': '*'})
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+
+
+def test_if_none_match_returns_304_for_the_same_representation(client):
+    etag = _get(client).headers['ETag']
+
+    response = _get(client, **{'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+    assert response.headers['Cache-Control'] == botanical_chart.BOTANICAL_CACHE_CONTROL
+
+
+def test_if_none_match_accepts_weak_and_listed_etags(client):
+    etag = _get(client).headers['ETag']
+
+    assert _get(client, **{'If-None-Match': f'"otro", W/{etag}'}).status_code == 304
+
+
+def test_etag_of_other_encoding_does_not_match(client):
+    gzip_etag = _get(client, **{'Accept-Encoding': 'gzip'}).headers['ETag']
+
+    response = _get(client, **{'If-None-Match': gzip_etag})
+
+    assert response.status_code == 200
+    assert json.loads(response.data) == COMMUNES
@@ -0,0 +1,101 @@
+import datetime
+import uuid
+
+import pytest
+
+# supabase/ (migraciones) se importa como paquete de espacio de nombres;
+# postgrest solo está instalado junto con supabase-py
+pytest.importorskip('postgrest')
+
+import data_tables_supabase
+from data_tables_supabase import (_after_cursor_filter, decode_cursor, encode_cursor, paginate,
+                                  validate_order_by)
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    columns = {'ubicaciones': ['id', 'nombre', 'created_at']}
+    monkeypatch.setattr(data_tables_supabase.schema_catalog, 'column_names', lambda t: columns.get(t, []))
+    monkeypatch.setattr(data_tables_supabase.schema_catalog, 'primary_key',
+                        lambda t: 'id' if t in columns else None)
+
+
+def test_cursor_round_trip():
+    when = datetime.datetime(2026, 1, 2, 3, 4, 5)
+    user = uuid.UUID('0f8fad5b-d9cb-469f-a165-70867728950e')
+
+    cursor = encode_cursor({'k': user, 'by': 'created_at', 'o': when, 'asc': False})
+
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == {'k': str(user), 'by': 'created_at', 'o': when.isoformat(), 'asc': False}
+
+
+@pytest.mark.parametrize('cursor', ['no-es-base64!', encode_cursor([1, 2]), encode_cursor({'o': 1})])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_filter_by_key_only():
+    assert _after_cursor_filter('id', 5) == 'id.gt."5"'
+    assert _after_cursor_filter('id', 5, ascending=False) == 'id.lt."5"'
+
+
+def test_filter_ascending_puts_nulls_last():
+    assert _after_cursor_filter('id', 5, 'nombre', 'b') == \
+        'nombre.gt."b",and(nombre.eq."b",id.gt."5"),nombre.is.null'
+    assert _after_cursor_filter('id', 5, 'nombre', None) == 'and(nombre.is.null,id.gt."5")'
+
+
+def test_filter_descending_puts_nulls_first():
+    assert _after_cursor_filter('id', 5, 'nombre', 'b', ascending=False) == \
+        'nombre.lt."b",and(nombre.eq."b",id.gt."5")'
+    assert _after_cursor_filter('id', 5, 'nombre', None, ascending=False) == \
+        'and(nombre.is.null,id.gt."5"),nombre.not.is.null'
+
+
+def test_filter_quotes_values_with_filter_syntax():
+    assert _after_cursor_filter('id', 5, 'nombre', 'a,b)"') == \
+        'nombre.gt."a,b)\\"",and(nombre.eq."a,b)\\"",id.gt."5"),nombre.is.null'
+
+
+def test_validate_order_by(catalog):
+    assert validate_order_by('ubicaciones', None) is None
+    assert validate_order_by('ubicaciones', 'nombre') == 'nombre'
+
+
+@pytest.mark.parametrize('table, order_by', [
+    ('ubicaciones', 'no_existe'),
+    ('ubicaciones', 'nombre,id'),
+    ('ubicaciones', 'nombre.is.null),id.gt.(0'),
+    ('otra_tabla', 'nombre'),
+])
+def test_validate_order_by_rejects_unknown_columns(catalog, table, order_by):
+    with pytest.raises(ValueError):
+        validate_order_by(table, order_by)
+
+
+def test_cursor_for_another_order_is_rejected(catalog, fake_client):
+    query = fake_client(tables={'ubicaciones': []}).table('ubicaciones').select('*')
+    cursor = encode_cursor({'k': 5, 'by': 'nombre', 'o': 'b', 'asc': True})
+
+    with pytest.raises(ValueError, match='otro orden'):
+        paginate(query, 'ubicaciones', 10, cursor=cursor, order_by='created_at')
+    with pytest.raises(ValueError, match='otro orden'):
+        paginate(query, 'ubicaciones', 10, cursor=cursor, order_by='nombre', ascending=False)
+
+
+def test_keyset_page_and_next_cursor(catalog, fake_client):
+    rows = [{'id': i, 'nombre': f'n{i}'} for i in range(1, 5)]
+    client = fake_client(tables={'ubicaciones': rows})
+    cursor = encode_cursor({'k': 1, 'by': 'nombre', 'o': 'n1', 'asc': True})
+
+    _, page, next_cursor, has_next = paginate(client.table('ubicaciones').select('*'), 'ubicaciones', 2,
+                                              cursor=cursor, order_by='nombre')
+
+    ops = [(name, args) for name, args, _ in client.requests[0].ops]
+    assert ('order', ('nombre',)) in ops and ('order', ('id',)) in ops
+    assert ('or_', ('nombre.gt."n1",and(nombre.eq."n1",id.gt."1"),nombre.is.null',)) in ops
+    assert ('limit', (3,)) in ops
+    assert has_next and len(page) == 2
+    assert decode_cursor(next_cursor) == {'k': 2, 'asc': True, 'by': 'nombre', 'o': 'n2'}
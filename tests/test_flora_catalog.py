@@ -0,0 +1,83 @@
+import os
+import pickle
+
+import pytest
+
+import flora_catalog
+from flora_catalog import FloraCatalog, artifact_path_for, build_artifact
+
+HEADER = 'Comuna;Region;Nombre Comun;Nombre Cientifico;Clase;Origen;Periodo de Floracion;\n'
+ROWS = [
+    'Chiloe;Los Lagos;Tineo;Weinmannia trichosperma;Arbol;Nativa;Primavera;\n',
+    'Chiloe;Los Lagos;Ulmo;Eucryphia cordifolia;Arbol;Nativa;Verano;\n',
+    'Osorno;Los Lagos;Trebol;Trifolium repens;Hierba;Introducida;Verano;\n',
+]
+
+
+@pytest.fixture
+def csv_path(tmp_path, monkeypatch):
+    path = tmp_path / 'clases.csv'
+    path.write_text(HEADER + ''.join(ROWS), encoding='utf-8')
+    monkeypatch.setattr(flora_catalog, 'CSV_PATHS', (str(path),))
+    build_artifact(str(path))
+    return path
+
+
+def test_loads_from_up_to_date_artifact(csv_path):
+    catalog = FloraCatalog().load()
+
+    assert catalog.source == artifact_path_for(str(csv_path))
+    assert catalog.comunas() == ['Chiloe', 'Osorno']
+    assert catalog.clases_por_comuna('chiloe') == {'Arbol': ['Tineo', 'Ulmo']}
+
+
+def test_touching_the_csv_keeps_the_artifact(csv_path):
+    stat = os.stat(csv_path)
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert FloraCatalog().load().source == artifact_path_for(str(csv_path))
+
+
+def test_stale_artifact_falls_back_to_csv(csv_path):
+    csv_path.write_text(HEADER + ''.join(ROWS) + 'Ancud;Los Lagos;Maqui;Aristotelia chilensis;Arbusto;Nativa;Primavera;\n',
+                        encoding='utf-8')
+
+    catalog = FloraCatalog().load()
+
+    assert catalog.source == str(csv_path)
+    assert 'Ancud' in catalog.comunas()
+
+
+def test_same_size_change_is_detected_by_hash(csv_path):
+    csv_path.write_text(HEADER + ''.join(ROWS).replace('Ulmo', 'Olmo'), encoding='utf-8')
+
+    catalog = FloraCatalog().load()
+
+    assert catalog.source == str(csv_path)
+    assert catalog.clases_por_comuna('Chiloe') == {'Arbol': ['Tineo', 'Olmo']}
+
+
+def test_stale_artifact_state_is_not_unpickled(csv_path, monkeypatch):
+    csv_path.write_text(HEADER + ROWS[0], encoding='utf-8')
+    loads = []
+    real_load = pickle.load
+    monkeypatch.setattr(flora_catalog.pickle, 'load', lambda f: loads.append(1) or real_load(f))
+
+    assert FloraCatalog._read_artifact(str(csv_path)) == (None, None)
+    assert len(loads) == 1
+
+
+def test_artifact_with_other_version_falls_back_to_csv(csv_path, monkeypatch):
+    monkeypatch.setattr(flora_catalog, 'ARTIFACT_VERSION', flora_catalog.ARTIFACT_VERSION + 1)
+
+    assert FloraCatalog().load().source == str(csv_path)
+
+
+def test_unreadable_artifact_falls_back_to_csv(csv_path):
+    with open(artifact_path_for(str(csv_path)), 'wb') as f:
+        f.write(b'no es un pickle')
+
+    catalog = FloraCatalog().load()
+
+    assert catalog.source == str(csv_path)
+    assert len(catalog.especies) == len(ROWS)
@@ -0,0 +1,70 @@
+"""
+Presupuesto de tiempo de import (cold start) de `app`.
+
+Importa `app` con `python -X importtime` en un proceso limpio y falla si el
+tiempo acumulado supera IMPORT_TIME_BUDGET_MS o si algún módulo que debe
+cargarse en el primer request se importa al arrancar.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_TIME_BUDGET_MS = float(os.getenv('IMPORT_TIME_BUDGET_MS', 1500))
+
+# Módulos que solo deben importarse al construir la app o en su primer uso
+LAZY_MODULES = (
+    'segno', 'openlocationcode', 'supabase', 'supabase_client',
+    'searcher', 'search_index', 'name_index', 'suggest_index',
+    'searcher_routes', 'lotes_routes', 'lotes_manager', 'qr_code',
+    'data_tables_routes', 'data_tables_supabase', 'profile_routes',
+)
+
+
+def measure_imports(module: str = 'app') -> dict:
+    """Importa `module` con -X importtime y devuelve {módulo: microsegundos acumulados}."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'}
+    )
+    if result.returncode != 0:
+        if 'ModuleNotFoundError' in result.stderr:
+            pytest.skip(f"Dependencias no instaladas: {result.stderr.strip().splitlines()[-1]}")
+        pytest.fail(f"No se pudo importar {module}:\n{result.stderr[-2000:]}")
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        # Formato: "import time:  self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        try:
+            _, cumulative, name = line[len('import time:'):].split('|')
+            timings[name.strip()] = int(cumulative)
+        except ValueError:
+            continue
+    return timings
+
+
+@pytest.fixture(scope='module')
+def timings():
+    return measure_imports('app')
+
+
+def test_import_app_within_budget(timings):
+    total_ms = timings.get('app', 0) / 1000
+    top = sorted(timings.items(), key=lambda item: item[1], reverse=True)[:15]
+    assert total_ms <= IMPORT_TIME_BUDGET_MS, (
+        f"Import de app: {total_ms:.1f} ms (presupuesto {IMPORT_TIME_BUDGET_MS:.0f} ms). Top: "
+        + ', '.join(f"{name}={us / 1000:.1f}ms" for name, us in top))
+
+
+def test_heavy_modules_are_not_imported_at_startup(timings):
+    eager = sorted(name for name in timings if name.split('.')[0] in LAZY_MODULES)
+    assert not eager, f"Importados al arrancar: {', '.join(eager)}"
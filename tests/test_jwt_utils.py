@@ -0,0 +1,47 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+import jwt_utils
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _hs256_token(secret: str, **claims) -> str:
+    header = _b64(json.dumps({'alg': 'HS256', 'typ': 'JWT'}).encode())
+    payload = _b64(json.dumps({'sub': 'user-1', 'exp': int(time.time()) + 3600, **claims}).encode())
+    signature = hmac.new(secret.encode(), f'{header}.{payload}'.encode(), hashlib.sha256).digest()
+    return f'{header}.{payload}.{_b64(signature)}'
+
+
+def test_hs256_without_secret_cannot_verify_locally(monkeypatch):
+    monkeypatch.delenv('SUPABASE_JWT_SECRET', raising=False)
+    token = _hs256_token('project-secret')
+
+    assert jwt_utils.can_verify_locally(token) is False
+    assert jwt_utils.verify_jwt(token) is None
+    # El llamador usa entonces la decodificación sin verificar
+    assert jwt_utils.decode_jwt_claims(token)['sub'] == 'user-1'
+    assert not jwt_utils.is_token_expired(token)
+
+
+def test_hs256_with_secret_verifies_locally(monkeypatch):
+    monkeypatch.setenv('SUPABASE_JWT_SECRET', 'project-secret')
+    token = _hs256_token('project-secret')
+
+    assert jwt_utils.can_verify_locally(token) is True
+    assert jwt_utils.verify_jwt(token)['sub'] == 'user-1'
+    assert jwt_utils.verify_jwt(_hs256_token('other-secret')) is None
+
+
+def test_asymmetric_token_without_jwks_keys(monkeypatch):
+    monkeypatch.setenv('SUPABASE_JWT_SECRET', 'project-secret')
+    monkeypatch.setattr(jwt_utils, 'has_jwks_keys', lambda: False)
+    header = _b64(json.dumps({'alg': 'RS256', 'typ': 'JWT'}).encode())
+    token = f'{header}.{_b64(b"{}")}.{_b64(b"sig")}'
+
+    assert jwt_utils.can_verify_locally(token) is False
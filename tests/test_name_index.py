@@ -0,0 +1,69 @@
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('supabase')
+
+import name_index as name_index_module
+import search_index as search_index_module
+from name_index import MIN_SIMILARITY, NameIndex, similarity, trigrams
+
+ROWS = {
+    'info_contacto': [
+        {'auth_user_id': 'u1', 'nombre_completo': 'José Pérez González', 'nombre_empresa': 'Miel del Sur'},
+        {'auth_user_id': 'u2', 'nombre_completo': 'Ana Soto', 'nombre_empresa': None},
+    ],
+    'usuarios': [
+        {'auth_user_id': 'u1', 'username': 'jperez'},
+        {'auth_user_id': 'u2', 'username': 'anasoto'},
+    ],
+}
+
+
+@pytest.fixture
+def index(monkeypatch):
+    def fetch_rows(table, columns='*', auth_user_id=None):
+        return [dict(r) for r in ROWS[table] if auth_user_id is None or r['auth_user_id'] == auth_user_id]
+
+    monkeypatch.setattr(search_index_module, 'fetch_rows', fetch_rows)
+    monkeypatch.setattr(name_index_module, 'fetch_rows', fetch_rows)
+    monkeypatch.setattr(search_index_module, 'BACKGROUND_BUILDS', False)
+    index = NameIndex()
+    index.build()
+    return index
+
+
+def test_trigrams_are_padded_like_pg_trgm():
+    assert trigrams('Miel') == frozenset({'  m', ' mi', 'mie', 'iel', 'el '})
+
+
+def test_similarity_of_identical_names_is_one():
+    assert similarity(trigrams('José Pérez'), trigrams('jose perez')) == 1.0
+
+
+def test_typo_is_tolerated(index):
+    results = index.lookup('jose peres')
+
+    assert results[0]['auth_user_id'] == 'u1'
+    assert results[0]['exact'] is False
+    assert results[0]['score'] >= MIN_SIMILARITY
+
+
+def test_exact_name_without_accents(index):
+    result = index.lookup('jose perez gonzalez')[0]
+
+    assert result['auth_user_id'] == 'u1'
+    assert result['matched_field'] == 'nombre_completo'
+    assert result['exact'] is True
+
+
+def test_threshold_filters_unrelated_names(index):
+    assert index.lookup('xyz qwv') == []
+    assert all(r['score'] >= 0.6 for r in index.lookup('ana soto', min_score=0.6))
+    assert index.lookup('sotomayor', min_score=0.99) == []
+
+
+def test_one_result_per_user_with_best_field(index):
+    results = index.lookup('jperez')
+
+    assert [r['auth_user_id'] for r in results].count('u1') == 1
+    assert results[0]['matched_field'] == 'username'
@@ -0,0 +1,82 @@
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('postgrest')
+
+import query_memo
+from query_memo import QueryMemo
+
+USERS = {'usuarios': [
+    {'auth_user_id': 'u1', 'username': 'juan', 'tipo_usuario': 'apicultor'},
+    {'auth_user_id': 'u2', 'username': 'maria', 'tipo_usuario': 'cliente'},
+]}
+
+
+def test_identical_reads_hit_the_memo(fake_client):
+    client = fake_client(tables=USERS)
+    memo = QueryMemo()
+
+    first = memo.select(client, 'usuarios', 'username', {'auth_user_id': 'u1'})
+    second = memo.select(client, 'usuarios', 'username', {'auth_user_id': 'u1'})
+    memo.select(client, 'usuarios', 'username', {'auth_user_id': 'u2'})
+
+    assert first == second
+    assert len(client.requests) == 2
+    assert (memo.hits, memo.misses) == (1, 2)
+
+
+def test_column_order_does_not_change_the_key(fake_client):
+    client = fake_client(tables=USERS)
+    memo = QueryMemo()
+
+    memo.select(client, 'usuarios', 'username, tipo_usuario', {'auth_user_id': 'u1'})
+    memo.select(client, 'usuarios', 'tipo_usuario,username', {'auth_user_id': 'u1'})
+
+    assert len(client.requests) == 1
+
+
+def test_columns_are_projected_from_a_full_read(fake_client):
+    client = fake_client(tables=USERS)
+    memo = QueryMemo()
+
+    memo.select(client, 'usuarios', '*', {'auth_user_id': 'u1'})
+    rows = memo.select(client, 'usuarios', 'username', {'auth_user_id': 'u1'})
+
+    assert rows == [{'username': 'juan'}]
+    assert len(client.requests) == 1
+
+
+def test_reads_with_another_client_are_not_shared(fake_client):
+    memo = QueryMemo()
+    first, second = fake_client(tables=USERS), fake_client(tables=USERS)
+
+    memo.select(first, 'usuarios', '*', {'auth_user_id': 'u1'})
+    memo.select(second, 'usuarios', '*', {'auth_user_id': 'u1'})
+
+    assert len(first.requests) == len(second.requests) == 1
+
+
+def test_returned_rows_are_copies(fake_client):
+    client = fake_client(tables=USERS)
+    memo = QueryMemo()
+
+    memo.select(client, 'usuarios', '*', {'auth_user_id': 'u1'})[0]['username'] = 'modificado'
+    memo.select(client, 'usuarios', '*', {'auth_user_id': 'u1'}).append({'username': 'extra'})
+
+    assert memo.select(client, 'usuarios', '*', {'auth_user_id': 'u1'}) == [USERS['usuarios'][0]]
+
+
+def test_notify_write_invalidates_the_written_table(fake_client, monkeypatch):
+    from modify_DB import notify_write
+
+    client = fake_client(tables=USERS)
+    memo = QueryMemo()
+    monkeypatch.setattr(query_memo, 'get_request_memo', lambda: memo)
+
+    memo.select(client, 'usuarios', '*', {'auth_user_id': 'u1'})
+    memo.select(client, 'ubicaciones', '*', {'auth_user_id': 'u1'})
+    notify_write('usuarios', 'update', 'u1')
+    memo.select(client, 'usuarios', '*', {'auth_user_id': 'u1'})
+    memo.select(client, 'ubicaciones', '*', {'auth_user_id': 'u1'})
+
+    assert [q.target for q in client.requests] == ['usuarios', 'ubicaciones', 'usuarios']
@@ -0,0 +1,133 @@
+import pytest
+
+import cache_utils
+import search_cache
+from cache_utils import TTLCache
+from search_cache import cached_search, invalidate_search_results
+
+
+class FakeSearcher:
+    """Searcher mínimo: cuenta las llamadas y puede fallar a pedido."""
+
+    def __init__(self, rows=None):
+        self.supabase = object()
+        self.rows = rows if rows is not None else [{'auth_user_id': 'u1', 'username': 'juan'}]
+        self.calls = []
+        self.fail = False
+
+    @cached_search
+    def search(self, table, term, limit=10):
+        self.calls.append((table, term, limit))
+        if self.fail:
+            raise RuntimeError('supabase caído')
+        return self.rows[:limit]
+
+    @cached_search(empty=lambda: None)
+    def find(self, identifier):
+        self.calls.append(identifier)
+        if self.fail:
+            raise RuntimeError('supabase caído')
+        return self.rows[0]
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    cache = TTLCache(maxsize=2, ttl=60)
+    monkeypatch.setattr(search_cache, 'search_cache', cache)
+    return cache
+
+
+def test_positional_and_keyword_arguments_share_an_entry():
+    searcher = FakeSearcher()
+
+    searcher.search('usuarios', 'jua', 5)
+    searcher.search('usuarios', 'jua', limit=5)
+    searcher.search(table='usuarios', term='jua', limit=5)
+
+    assert searcher.calls == [('usuarios', 'jua', 5)]
+
+
+def test_default_arguments_are_part_of_the_key():
+    searcher = FakeSearcher()
+
+    searcher.search('usuarios', 'jua')
+    searcher.search('usuarios', 'jua', 10)
+
+    assert len(searcher.calls) == 1
+
+
+def test_returns_a_copy_of_the_cached_rows():
+    searcher = FakeSearcher()
+
+    searcher.search('usuarios', 'jua')[0]['username'] = 'modificado'
+
+    assert searcher.search('usuarios', 'jua')[0]['username'] == 'juan'
+
+
+def test_failed_calls_are_not_cached():
+    searcher = FakeSearcher()
+    searcher.fail = True
+
+    assert searcher.search('usuarios', 'jua') == []
+    assert searcher.find('juan') is None
+
+    searcher.fail = False
+    assert searcher.search('usuarios', 'jua') == searcher.rows
+    assert searcher.find('juan') == searcher.rows[0]
+    assert len(searcher.calls) == 4
+
+
+def test_lru_evicts_least_recently_used_entry(fresh_cache):
+    searcher = FakeSearcher()
+
+    searcher.search('usuarios', 'a')
+    searcher.search('usuarios', 'b')
+    searcher.search('usuarios', 'a')  # 'a' pasa a ser la más reciente
+    searcher.search('usuarios', 'c')  # desaloja 'b'
+    searcher.calls.clear()
+
+    searcher.search('usuarios', 'a')
+    searcher.search('usuarios', 'b')
+
+    assert searcher.calls == [('usuarios', 'b', 10)]
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_utils.time, 'time', lambda: now[0])
+    searcher = FakeSearcher()
+
+    searcher.search('usuarios', 'jua')
+    now[0] += 59
+    searcher.search('usuarios', 'jua')
+    now[0] += 2
+    searcher.search('usuarios', 'jua')
+
+    assert len(searcher.calls) == 2
+
+
+def test_invalidation_by_user_in_results():
+    searcher = FakeSearcher()
+    searcher.search('usuarios', 'jua')
+
+    assert invalidate_search_results('usuarios', 'update', auth_user_id='otro') == 0
+    assert invalidate_search_results('usuarios', 'update', auth_user_id='u1') == 1
+
+
+def test_invalidation_by_term_contained_in_new_name():
+    searcher = FakeSearcher(rows=[])
+    searcher.search('usuarios', 'Sot')
+    searcher.search('usuarios', 'xyz')
+    searcher.calls.clear()
+
+    assert invalidate_search_results('usuarios', 'insert', names=['María Soto']) == 1
+
+    searcher.search('usuarios', 'Sot')
+    searcher.search('usuarios', 'xyz')
+    assert searcher.calls == [('usuarios', 'Sot', 10)]
+
+
+def test_invalidation_without_user_or_names_is_a_noop():
+    FakeSearcher().search('usuarios', 'jua')
+
+    assert invalidate_search_results('usuarios', 'update') == 0
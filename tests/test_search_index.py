@@ -0,0 +1,105 @@
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('supabase')
+
+import search_index as search_index_module
+from search_cache import search_cache
+from search_index import SearchIndex, fold_text, highlight, tokenize
+from searcher import Searcher
+
+ROWS = {
+    'info_contacto': [
+        {'auth_user_id': 'u1', 'nombre_completo': 'José Pérez', 'direccion': 'Ulmo'},
+        {'auth_user_id': 'u2', 'nombre_completo': 'Ana Soto',
+         'direccion': 'Camino al ulmo, quillay, maqui, boldo, peumo y canelo'},
+        {'auth_user_id': 'u3', 'nombre_completo': 'Quillay Apícola', 'direccion': 'Cañete'},
+    ],
+}
+
+
+@pytest.fixture
+def tables():
+    return {table: [dict(row) for row in rows] for table, rows in ROWS.items()}
+
+
+@pytest.fixture
+def index(monkeypatch, fake_client, tables):
+    def fetch_rows(table, columns='*', auth_user_id=None):
+        rows = tables.get(table, [])
+        return [dict(r) for r in rows if auth_user_id is None or r['auth_user_id'] == auth_user_id]
+
+    monkeypatch.setattr(search_index_module, 'fetch_rows', fetch_rows)
+    monkeypatch.setattr(search_index_module, 'BACKGROUND_BUILDS', False)
+    search_cache.clear()
+    searcher = Searcher(fake_client(tables=tables))
+    monkeypatch.setattr(searcher, 'get_tables', lambda: list(searcher.search_fields))
+    return SearchIndex(searcher)
+
+
+def ids(results):
+    return [r.id for r in results]
+
+
+def test_fold_and_tokenize_remove_accents():
+    assert fold_text('Cañete PÉREZ') == 'canete perez'
+    assert tokenize('José, Pérez-Soto') == ['jose', 'perez', 'soto']
+
+
+def test_bm25_ranks_short_document_first(index):
+    index.build()
+
+    assert ids(index.search('ulmo'))[:2] == ['u1', 'u2']
+
+
+def test_accent_insensitive_match(index):
+    index.build()
+
+    assert ids(index.search('jose perez')) == ['u1']
+    assert ids(index.search('CANETE')) == ['u3']
+
+
+def test_prefix_expansion_scores_below_exact_match(index):
+    index.build()
+
+    results = index.search('quil')
+    assert set(ids(results)) == {'u2', 'u3'}
+    assert ids(index.search('qu')) == []  # los prefijos necesitan 3 caracteres
+
+    exact = {r.id: r.score for r in index.search('quillay')}
+    prefix = {r.id: r.score for r in results}
+    assert prefix['u3'] < exact['u3']
+
+
+def test_highlight_escapes_html():
+    assert highlight('<b>Ulmo</b> & miel', {'ulmo'}) == '&lt;b&gt;<mark>Ulmo</mark>&lt;/b&gt; &amp; miel'
+
+
+def test_matches_are_highlighted(index):
+    index.build()
+
+    result = index.search('perez')[0]
+    assert result.matches == {'nombre_completo': 'José <mark>Pérez</mark>'}
+
+
+def test_refresh_user_after_rename(index, tables):
+    index.build()
+    tables['info_contacto'][0]['nombre_completo'] = 'Pedro Rojas'
+
+    index.refresh_user('info_contacto', 'u1')
+
+    assert ids(index.search('jose')) == []
+    assert ids(index.search('rojas')) == ['u1']
+
+
+def test_unbuilt_index_falls_back_to_ilike_without_building(index, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError('el request no debe construir el índice')
+
+    monkeypatch.setattr(search_index_module, 'fetch_rows', fail)
+
+    results = index.search('ulmo', limit=5)
+
+    assert index.built_at is None
+    assert results and all(r.score == 0.0 for r in results)
+    assert index.searcher.supabase.requests
@@ -0,0 +1,58 @@
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('supabase')
+
+import searcher as searcher_module
+from searcher import Searcher
+
+USER_ID = '0f8fad5b-d9cb-469f-a165-70867728950e'
+
+PROFILE = {
+    'usuario': {'auth_user_id': USER_ID, 'username': 'apicola'},
+    'info_contacto': {'auth_user_id': USER_ID, 'comuna': 'Pucón'},
+    'ubicaciones': [{'auth_user_id': USER_ID, 'nombre': 'Apiario 1'}],
+    'origenes_botanicos': [{'auth_user_id': USER_ID, 'descripcion_flora': 'Ulmo'}],
+    'solicitudes_apicultor': [],
+}
+
+
+@pytest.fixture(autouse=True)
+def reset_profile_paths(monkeypatch):
+    monkeypatch.setattr(searcher_module, 'PROFILE_EMBEDDING', False)
+    monkeypatch.setattr(Searcher, '_profile_rpc_supported', True)
+    monkeypatch.setattr(Searcher, '_profile_embedding_supported', True)
+
+
+def test_load_profile_makes_exactly_one_request(fake_client):
+    client = fake_client(rpcs={searcher_module.PROFILE_RPC: PROFILE})
+
+    profile = Searcher(client).load_profile(USER_ID)
+
+    assert len(client.requests) == 1
+    assert client.requests[0].target == searcher_module.PROFILE_RPC
+    assert profile.user['username'] == 'apicola'
+    assert profile.contact_info['comuna'] == 'Pucón'
+    assert profile.locations[0]['nombre'] == 'Apiario 1'
+    assert profile.production[0]['descripcion_flora'] == 'Ulmo'
+    assert profile.requests == []
+
+
+def test_load_profile_unknown_user_makes_one_request(fake_client):
+    client = fake_client(rpcs={searcher_module.PROFILE_RPC: None})
+
+    assert Searcher(client).load_profile(USER_ID) is None
+    assert len(client.requests) == 1
+
+
+def test_embedded_select_is_one_request_when_enabled(fake_client, monkeypatch):
+    monkeypatch.setattr(searcher_module, 'PROFILE_EMBEDDING', True)
+    row = dict(PROFILE['usuario'], info_contacto=[PROFILE['info_contacto']], ubicaciones=[],
+               origenes_botanicos=[], solicitudes_apicultor=[])
+    client = fake_client(tables={'usuarios': [row]})
+
+    profile = Searcher(client).load_profile(USER_ID)
+
+    assert len(client.requests) == 1
+    assert client.requests[0].target == 'usuarios'
+    assert profile.contact_info['comuna'] == 'Pucón'
@@ -0,0 +1,68 @@
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight, SingleFlightError
+
+
+def _run_with_waiter(group, key, leader_fn, waiter_fn):
+    """Lanza el líder, espera a que esté en curso y lanza un segundo llamador con la misma clave."""
+    results = {}
+
+    def call(name, fn):
+        try:
+            results[name] = ('ok', group.do(key, fn))
+        except BaseException as e:
+            results[name] = ('error', e)
+
+    leader = threading.Thread(target=call, args=('leader', leader_fn))
+    leader.start()
+    time.sleep(0.05)
+    waiter = threading.Thread(target=call, args=('waiter', waiter_fn))
+    waiter.start()
+    leader.join()
+    waiter.join()
+    return results
+
+
+def test_waiter_gets_fresh_error_chained_to_leader_error():
+    def fail():
+        time.sleep(0.2)
+        raise ValueError('boom')
+
+    results = _run_with_waiter(SingleFlight('test'), 'k', fail, lambda: 'unused')
+
+    leader_error = results['leader'][1]
+    waiter_error = results['waiter'][1]
+    assert isinstance(leader_error, ValueError)
+    assert isinstance(waiter_error, SingleFlightError)
+    assert waiter_error is not leader_error
+    assert waiter_error.__cause__ is leader_error
+
+
+def test_waiter_retries_when_leader_is_interrupted():
+    class Interrupted(BaseException):
+        pass
+
+    def interrupted():
+        time.sleep(0.2)
+        raise Interrupted()
+
+    group = SingleFlight('test')
+    results = _run_with_waiter(group, 'k', interrupted, lambda: 'retried')
+
+    assert isinstance(results['leader'][1], Interrupted)
+    assert results['waiter'] == ('ok', 'retried')
+    assert group.stats()['in_flight'] == 0
+
+
+def test_leader_result_is_shared_as_copy():
+    def load():
+        time.sleep(0.2)
+        return {'rows': [1]}
+
+    results = _run_with_waiter(SingleFlight('test'), 'k', load, lambda: pytest.fail('no debe ejecutarse'))
+
+    assert results['waiter'] == ('ok', {'rows': [1]})
+    assert results['waiter'][1] is not results['leader'][1]
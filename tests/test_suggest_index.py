@@ -0,0 +1,79 @@
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('supabase')
+
+import search_index as search_index_module
+import suggest_index as suggest_index_module
+from suggest_index import SuggestIndex
+
+ROWS = {
+    'info_contacto': [
+        {'auth_user_id': 'u1', 'nombre_completo': 'José Pérez'},
+        {'auth_user_id': 'u2', 'nombre_completo': 'Pedro Rojas'},
+        {'auth_user_id': 'u3', 'nombre_completo': 'María Peralta Soto'},
+        {'auth_user_id': 'u4', 'nombre_completo': 'Juan Soto'},
+    ],
+    'usuarios': [
+        {'auth_user_id': 'u1', 'tipo_usuario': 'Apicultor'},
+        {'auth_user_id': 'u2', 'tipo_usuario': 'Comprador'},
+        {'auth_user_id': 'u3', 'tipo_usuario': 'Apicultor'},
+        {'auth_user_id': 'u4', 'tipo_usuario': 'Apicultor'},
+    ],
+}
+
+
+@pytest.fixture
+def rows():
+    return {table: [dict(r) for r in table_rows] for table, table_rows in ROWS.items()}
+
+
+@pytest.fixture
+def index(monkeypatch, rows):
+    def fetch_rows(table, columns='*', auth_user_id=None):
+        return [dict(r) for r in rows[table] if auth_user_id is None or r['auth_user_id'] == auth_user_id]
+
+    monkeypatch.setattr(search_index_module, 'fetch_rows', fetch_rows)
+    monkeypatch.setattr(suggest_index_module, 'fetch_rows', fetch_rows)
+    monkeypatch.setattr(search_index_module, 'BACKGROUND_BUILDS', False)
+    index = SuggestIndex()
+    index.build()
+    return index
+
+
+def names(suggestions):
+    return [s['nombre'] for s in suggestions]
+
+
+def test_one_key_per_starting_word():
+    assert SuggestIndex._name_keys('María Peralta Soto') == ['maria peralta soto', 'peralta soto', 'soto']
+
+
+def test_prefix_walk_matches_any_word_and_ranks_name_start_first(index):
+    # "pe" es inicio de "Pedro" y de palabras intermedias ("Pérez", "Peralta")
+    assert names(index.suggest('pe')) == ['Pedro Rojas', 'José Pérez', 'María Peralta Soto']
+
+
+def test_prefix_walk_stops_at_first_non_matching_key(index):
+    assert names(index.suggest('sot')) == ['Juan Soto', 'María Peralta Soto']
+    assert index.suggest('zz') == []
+
+
+def test_multi_word_prefix_and_accents(index):
+    assert names(index.suggest('JOSE PER')) == ['José Pérez']
+    assert names(index.suggest('peralta s')) == ['María Peralta Soto']
+
+
+def test_suggestion_format_and_limit(index):
+    suggestions = index.suggest('pe', limit=1)
+
+    assert suggestions == [{'id': 'u2', 'nombre': 'Pedro Rojas', 'especialidad': 'Comprador'}]
+
+
+def test_rename_updates_keys(index, rows):
+    rows['info_contacto'][1]['nombre_completo'] = 'Pablo Rojas'
+
+    index.refresh_user('info_contacto', 'u2')
+
+    assert 'Pedro Rojas' not in names(index.suggest('pe'))
+    assert names(index.suggest('pab')) == ['Pablo Rojas']
@@ -0,0 +1,116 @@
+"""
+Precalentamiento (warmup) de instancias serverless de MeliAPP.
+
+Este módulo contiene:
+- Registro de pasos de warmup (register_warmup_step)
+- warmup(): ejecuta los pasos y reporta cuánto tardó cada uno
+
+Una instancia nueva arranca sin nada cargado; el hook de warmup/cron de la
+plataforma llama a /api/warmup (o a warmup() directamente) para pagar esa
+carga antes de que llegue el primer escaneo de QR.
+"""
+
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Pasos registrados, en orden de ejecución: (nombre, función(flask_app) -> detalle)
+_steps: List[Tuple[str, Callable[[Any], Any]]] = []
+
+
+def register_warmup_step(name: str):
+    """
+    Decorador para registrar un paso de warmup.
+
+    La función recibe la app Flask y devuelve un detalle serializable
+    (por ejemplo cuántos elementos cargó). Registrar de nuevo un nombre
+    reemplaza el paso anterior.
+    """
+    def decorator(func: Callable[[Any], Any]):
+        global _steps
+        _steps = [(n, f) for n, f in _steps if n != name]
+        _steps.append((name, func))
+        return func
+    return decorator
+
+
+@register_warmup_step('botanical_catalog')
+def _warm_botanical_catalog(flask_app):
+    """Carga el catálogo de flora del CSV en memoria."""
+    from flora_catalog import flora_catalog
+    return flora_catalog.stats()
+
+
+@register_warmup_step('templates')
+def _warm_templates(flask_app):
+    """Compila todas las plantillas Jinja y las deja en el cache del entorno."""
+    compiled = 0
+    for name in flask_app.jinja_env.list_templates(filter_func=lambda n: n.endswith('.html')):
+        flask_app.jinja_env.get_template(name)
+        compiled += 1
+    return {'compiled': compiled}
+
+
+@register_warmup_step('connections')
+def _warm_connections(flask_app):
+    """Crea el cliente Supabase y abre conexiones del pool HTTP compartido."""
+    from supabase_client import db
+    ok, details = db.check_connectivity()
+    if not ok:
+        raise RuntimeError(details.get('error', 'Supabase no respondió'))
+    return details
+
+
+@register_warmup_step('auth_keys')
+def _warm_auth_keys(flask_app):
+    """
+    Descarga y cachea el JWKS usado para verificar tokens localmente.
+
+    Se omite si el proyecto no publica claves asimétricas (solo HS256) o no
+    hay PyJWT, en vez de reportar un fallo en cada warmup.
+    """
+    from jwt_utils import has_jwks_keys, prefetch_jwks
+    if not has_jwks_keys():
+        return {'skipped': 'sin claves asimétricas en el JWKS'}
+    return {'jwks_keys': prefetch_jwks()}
+
+
+def warmup(flask_app, only: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Ejecuta los pasos de warmup registrados.
+
+    Un paso que falla no detiene a los siguientes; su error queda en el reporte.
+
+    Args:
+        flask_app: Aplicación Flask (para plantillas y contexto)
+        only: Nombres de pasos a ejecutar (por defecto todos)
+
+    Returns:
+        dict: {'success', 'total_ms', 'steps': {nombre: {'ok', 'ms', 'detail'|'error'}}}
+    """
+    report = {}
+    started = time.perf_counter()
+
+    with flask_app.app_context():
+        for name, func in list(_steps):
+            if only and name not in only:
+                continue
+            step_started = time.perf_counter()
+            try:
+                detail = func(flask_app)
+                report[name] = {'ok': True, 'detail': detail}
+            except Exception as e:
+                logger.warning(f"Warmup '{name}' falló: {e}")
+                report[name] = {'ok': False, 'error': str(e)}
+            report[name]['ms'] = round((time.perf_counter() - step_started) * 1000, 1)
+
+    total_ms = round((time.perf_counter() - started) * 1000, 1)
+    logger.info(f"Warmup completado en {total_ms} ms: " +
+                ', '.join(f"{n}={r['ms']}ms" for n, r in report.items()))
+    return {
+        'success': all(r['ok'] for r in report.values()),
+        'total_ms': total_ms,
+        'steps': report
+    }
@@ -74,10 +74,11 @@ def logout():
     
     GET /logout
     
-    Esta ruta web ejecuta session.clear() directamente en el servidor.
+    Esta ruta web cierra la sesión directamente en el servidor vía AuthManager.
     """
     try:
-        session.clear()
+        from auth_manager import AuthManager
+        AuthManager.logout_user()
         logger.info("Sesión cerrada exitosamente (web)")
         return redirect('/')
     except Exception as e: